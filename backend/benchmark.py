@@ -0,0 +1,437 @@
+#!/usr/bin/env python3
+"""
+Benchmark suite for SmartHire 2.0
+
+Generates a deterministic synthetic CV corpus (PDF, DOCX and TXT), zips it and
+screens the archive the way an upload is screened: extract_job_archive, then
+process_jobs_thread (extraction through the text cache, dedup when
+DEDUP_ENABLED is set, the process pool, the database writer and the job-wide
+TF-IDF refinement). Only that run is timed; per-stage figures come from the
+metrics the job records, with exact p50/p95 latency from the raw samples.
+Reports per-stage throughput, latency and the peak RSS of the process tree
+as JSON, and can compare the run against a stored baseline.
+
+Usage:
+    python benchmark.py --size 1k --output bench.json
+    python benchmark.py --size 10k --baseline bench.json --threshold 0.10
+"""
+
+import sys
+import os
+import json
+import time
+import random
+import atexit
+import shutil
+import zipfile
+import argparse
+import platform
+import tempfile
+import threading
+import contextlib
+import multiprocessing
+
+# Benchmarks use their own database so the app's data and text cache are untouched.
+# Pool workers import this module again and must use the same one.
+if 'SMARTHIRE_BENCH_DIR' not in os.environ:
+    os.environ['SMARTHIRE_BENCH_DIR'] = tempfile.mkdtemp(prefix='smarthire-bench-')
+    atexit.register(shutil.rmtree, os.environ['SMARTHIRE_BENCH_DIR'], ignore_errors=True)
+BENCH_DIR = os.environ['SMARTHIRE_BENCH_DIR']
+os.environ['DB_PATH'] = os.path.join(BENCH_DIR, 'bench.db')
+os.environ['UPLOAD_FOLDER'] = os.path.join(BENCH_DIR, 'uploads')
+# Keep raw stage latencies (in pool workers too) so percentiles are exact
+os.environ['SMARTHIRE_METRICS_SAMPLES'] = '1'
+
+# Add src to path
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), 'src'))
+
+import docx
+import numpy as np
+import app as app_module
+from app import (
+    create_screen_jobs,
+    extract_job_archive,
+    process_jobs_thread,
+    get_db_connection,
+    TFIDF_CHUNK_SIZE,
+    SMARTHIRE_WORKERS
+)
+from database import get_job_metrics
+from metrics import pop_samples
+from pdf_engine import PDF_BACKEND
+from skills_master import SKILLS, SKILL_CONTEXT_MAP
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+# Bump when the generated content changes so cached corpora are rebuilt
+CORPUS_VERSION = 1
+
+JOB_DESC = """
+Senior Python Developer
+Required: Python, Django, PostgreSQL, React, Docker, AWS
+Nice to have: Kubernetes, Redis, CI/CD, microservices
+Experience: 5+ years building and operating web services
+"""
+MUST_HAVES = ["python"]
+
+FIRST_NAMES = ["alex", "sam", "jordan", "taylor", "morgan", "casey", "riley", "jamie", "avery", "quinn"]
+LAST_NAMES = ["perera", "silva", "fernando", "smith", "khan", "garcia", "chen", "müller", "okafor", "novak"]
+TITLES = ["software engineer", "backend developer", "full stack developer", "data engineer",
+          "devops engineer", "mobile developer", "qa engineer", "ml engineer"]
+FILLER = ("designed built maintained shipped improved reduced latency for customer facing services "
+          "across teams owned delivery of features mentored junior engineers wrote tests and "
+          "documentation migrated legacy systems collaborated with product and design").split()
+
+# Dictionary skills plus their aliases, so the alias path is exercised too
+SKILL_TERMS = list(SKILLS) + [alias for aliases in SKILL_CONTEXT_MAP.values() for alias in aliases]
+
+FORMATS = ('pdf', 'docx', 'txt')
+PDF_LINES_PER_PAGE = 45
+
+# Reported stages: name -> (histogram the job records, latency per 'file' or per 'chunk')
+STAGES = {
+    "zip_read": ('zip_read_seconds', 'file'),
+    "extract": ('extract_seconds', 'file'),
+    "skill_match": ('skill_match_seconds', 'file'),
+    "dedup": ('dedup_seconds', 'chunk'),
+    "tokenize": ('tokenize_seconds', 'chunk'),
+    "tfidf": ('tfidf_seconds', 'chunk'),
+    "score": ('skill_score_seconds', 'chunk'),
+    "db_write": ('db_write_seconds', 'chunk'),
+}
+COUNTERS = ('text_cache_hits_total', 'duplicates_total', 'files_skipped_total', 'file_errors_total')
+
+
+# --- Synthetic corpus ---
+def parse_size(value):
+    """Accept 1000, 1k, 10k, 100k"""
+    value = value.strip().lower()
+    if value.endswith('k'):
+        return int(float(value[:-1]) * 1000)
+    return int(value)
+
+def synth_resume(rng):
+    """Return the lines of one synthetic resume"""
+    lines = [f"{rng.choice(FIRST_NAMES)} {rng.choice(LAST_NAMES)}".title(), rng.choice(TITLES), "", "summary"]
+    lines += [" ".join(rng.choices(FILLER, k=rng.randint(10, 18))) for _ in range(rng.randint(2, 5))]
+
+    skills = rng.sample(SKILL_TERMS, k=rng.randint(4, 18))
+    lines += ["", "skills", ", ".join(skills), "", "experience"]
+    for _ in range(rng.randint(2, 6)):
+        lines.append(f"{rng.choice(TITLES)} ({rng.randint(2010, 2025)})")
+        for _ in range(rng.randint(3, 10)):
+            words = rng.choices(FILLER, k=rng.randint(8, 16)) + rng.sample(skills, k=min(2, len(skills)))
+            rng.shuffle(words)
+            lines.append("- " + " ".join(words))
+    return lines
+
+def _pdf_string(line):
+    return "(" + line.replace("\\", "\\\\").replace("(", "\\(").replace(")", "\\)") + ")"
+
+def make_pdf(lines):
+    """Minimal multi-page PDF with one Helvetica text block per page"""
+    pages = [lines[i:i + PDF_LINES_PER_PAGE] for i in range(0, len(lines), PDF_LINES_PER_PAGE)] or [[]]
+    objects = [
+        "<< /Type /Catalog /Pages 2 0 R >>",
+        "<< /Type /Pages /Kids [%s] /Count %d >>" % (" ".join(f"{4 + 2 * i} 0 R" for i in range(len(pages))), len(pages)),
+        "<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica /Encoding /WinAnsiEncoding >>",
+    ]
+    for i, page in enumerate(pages):
+        stream = "BT /F1 10 Tf 50 800 Td 16 TL " + " ".join(_pdf_string(line) + " '" for line in page) + " ET"
+        objects.append(f"<< /Type /Page /Parent 2 0 R /MediaBox [0 0 612 842] "
+                       f"/Resources << /Font << /F1 3 0 R >> >> /Contents {5 + 2 * i} 0 R >>")
+        objects.append(f"<< /Length {len(stream.encode('latin-1'))} >>\nstream\n{stream}\nendstream")
+
+    out = b"%PDF-1.4\n"
+    offsets = []
+    for number, body in enumerate(objects, 1):
+        offsets.append(len(out))
+        out += f"{number} 0 obj\n{body}\nendobj\n".encode('latin-1')
+    xref = len(out)
+    out += f"xref\n0 {len(objects) + 1}\n0000000000 65535 f \n".encode()
+    out += b"".join(f"{offset:010d} 00000 n \n".encode() for offset in offsets)
+    out += f"trailer\n<< /Size {len(objects) + 1} /Root 1 0 R >>\nstartxref\n{xref}\n%%EOF\n".encode()
+    return out
+
+def write_resume(path, fmt, lines):
+    if fmt == 'pdf':
+        with open(path, 'wb') as f:
+            f.write(make_pdf(lines))
+    elif fmt == 'docx':
+        document = docx.Document()
+        for line in lines:
+            document.add_paragraph(line)
+        document.save(path)
+    else:
+        with open(path, 'w', encoding='utf-8') as f:
+            f.write("\n".join(lines))
+
+def generate_corpus(corpus_dir, size, seed, formats=FORMATS):
+    """
+    Create (or reuse) `size` resumes in corpus_dir and return their paths
+
+    File i is generated from its own seeded RNG, so a 10k corpus starts with
+    the same files as the 1k corpus and only missing files are written.
+    """
+    os.makedirs(corpus_dir, exist_ok=True)
+    paths = []
+    created = 0
+    for i in range(size):
+        fmt = formats[i % len(formats)]
+        path = os.path.join(corpus_dir, f"cv{i:06d}.{fmt}")
+        if not os.path.exists(path):
+            write_resume(path, fmt, synth_resume(random.Random(f"{seed}:{i}")))
+            created += 1
+        paths.append(path)
+    print(f"Corpus: {size} files in {corpus_dir} ({created} generated)")
+    return paths
+
+def build_archive(paths, zip_path):
+    """Zip the corpus as it would be uploaded (not timed)"""
+    with zipfile.ZipFile(zip_path, 'w', zipfile.ZIP_DEFLATED) as zip_ref:
+        for path in paths:
+            zip_ref.write(path, os.path.basename(path))
+    return zip_path
+
+
+# --- Measurement ---
+# Seconds between resident memory samples of the process tree during a run
+RSS_SAMPLE_SECONDS = 0.05
+# p95 changes smaller than this are timer and scheduling noise, whatever their ratio
+P95_NOISE_MS = 0.1
+
+def percentile_ms(samples, pct):
+    """Exact pct-th percentile of raw latencies (seconds), in milliseconds"""
+    return round(float(np.percentile(samples, pct)) * 1000, 3) if samples else 0.0
+
+def merged_series(series, name):
+    """Count and sum of a metric's series (see database.get_job_metrics) over their labels"""
+    merged = {'count': 0, 'sum': 0.0}
+    for (series_name, _), values in series.items():
+        if series_name == name:
+            merged['count'] += values['count']
+            merged['sum'] += values['sum']
+    return merged
+
+def tree_rss_bytes():
+    """Resident bytes of this process plus its live children (the pool workers), from /proc"""
+    page = os.sysconf('SC_PAGE_SIZE')
+    total = 0
+    for pid in [os.getpid()] + [child.pid for child in multiprocessing.active_children()]:
+        try:
+            with open(f"/proc/{pid}/statm") as f:
+                total += int(f.read().split()[1]) * page
+        except (OSError, ValueError, IndexError):
+            pass  # Exited since it was listed
+    return total
+
+@contextlib.contextmanager
+def peak_rss():
+    """
+    Measure peak resident memory while the block runs; yields a dict that
+    then holds 'mb' and 'scope' (what was measured)
+
+    Where /proc exists the whole process tree is sampled every
+    RSS_SAMPLE_SECONDS, since pool workers hold most of the memory of a
+    --workers run. Elsewhere only this process's ru_maxrss is available.
+    """
+    peak = {'mb': None, 'scope': None}
+    if not os.path.exists(f"/proc/{os.getpid()}/statm"):
+        yield peak
+        if resource is not None:
+            rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+            # ru_maxrss is in bytes on macOS and kilobytes on Linux
+            peak['mb'] = round(rss / (1024 * 1024 if sys.platform == 'darwin' else 1024), 1)
+            peak['scope'] = "main process (ru_maxrss)"
+        return
+
+    stop = threading.Event()
+    highest = [tree_rss_bytes()]
+
+    def sample():
+        while not stop.wait(RSS_SAMPLE_SECONDS):
+            highest[0] = max(highest[0], tree_rss_bytes())
+
+    sampler = threading.Thread(target=sample, daemon=True)
+    sampler.start()
+    try:
+        yield peak
+    finally:
+        stop.set()
+        sampler.join()
+        highest[0] = max(highest[0], tree_rss_bytes())
+        peak['mb'] = round(highest[0] / (1024 * 1024), 1)
+        peak['scope'] = f"process tree (main + pool workers, sampled every {RSS_SAMPLE_SECONDS * 1000:g} ms)"
+
+def stage_summary(items, series, samples):
+    """
+    Throughput in CVs per second spent in the stage, plus exact p50/p95
+    latency (per file, or per chunk for batch stages) from the raw samples
+    """
+    seconds = series['sum']
+    return {
+        "items": items,
+        "seconds": round(seconds, 4),
+        "throughput": round(items / seconds, 1) if seconds > 0 else 0,
+        "p50_ms": percentile_ms(samples, 50),
+        "p95_ms": percentile_ms(samples, 95)
+    }
+
+def run_benchmark(paths, chunk_size=TFIDF_CHUNK_SIZE, workers=SMARTHIRE_WORKERS, streaming=False):
+    """Screen the corpus like an uploaded archive, timing the run and reading the job's stage metrics"""
+    app_module.TFIDF_CHUNK_SIZE = chunk_size
+    app_module.SMARTHIRE_WORKERS = workers
+    zip_path = build_archive(paths, os.path.join(BENCH_DIR, 'corpus.zip'))
+    job_id, = create_screen_jobs([(JOB_DESC, MUST_HAVES, False)], title="Benchmark")
+
+    pop_samples()
+    run_start = time.perf_counter()
+    # The job logs every chunk
+    with open(os.devnull, 'w') as devnull, contextlib.redirect_stdout(devnull), peak_rss() as rss:
+        cv_members = extract_job_archive([job_id], zip_path)
+        process_jobs_thread([(job_id, JOB_DESC, MUST_HAVES, False)], zip_path,
+                            None if streaming else cv_members, streaming)
+    run_seconds = time.perf_counter() - run_start
+    samples = pop_samples()
+
+    with get_db_connection() as conn:
+        series = get_job_metrics(conn, job_id)
+        status, scored = conn.execute(
+            """SELECT status, (SELECT COUNT(*) FROM candidates WHERE job_id=jobs.id AND duplicate_of IS NULL) 
+               FROM jobs WHERE id=?""", (job_id,)).fetchone()
+    if status != 'Completed':
+        raise RuntimeError(f"Benchmark job ended {status}")
+
+    stages = {}
+    for stage, (name, unit) in STAGES.items():
+        stage_series = merged_series(series, name)
+        stages[stage] = stage_summary(int(stage_series['count']) if unit == 'file' else scored, stage_series,
+                                      samples.get(name, []))
+    return {
+        "stages": stages,
+        "counters": {name: int(merged_series(series, name)['count']) for name in COUNTERS},
+        "total": {
+            "items": len(paths),
+            "scored": scored,
+            "seconds": round(run_seconds, 4),
+            "throughput": round(len(paths) / run_seconds, 1) if run_seconds > 0 else 0
+        },
+        "peak_rss_mb": rss['mb'],
+        "rss_scope": rss['scope']
+    }
+
+
+# --- Baseline comparison ---
+def compare_to_baseline(result, baseline, threshold):
+    """
+    Return a list of regressions beyond `threshold` (fraction, e.g. 0.10)
+
+    Throughput may not drop, and p95 latency and peak RSS may not grow, by
+    more than the threshold. p95 latencies within P95_NOISE_MS of the
+    baseline pass, and peak RSS is only compared when both runs measured
+    the same scope (see peak_rss).
+    """
+    regressions = []
+
+    def check(name, current, previous, higher_is_better, noise=0):
+        if not previous or current is None:
+            return
+        change = (current - previous) / previous
+        worse = -change if higher_is_better else change
+        if abs(current - previous) <= noise:
+            worse = min(worse, 0)
+        marker = "REGRESSION" if worse > threshold else "ok"
+        print(f"  {name:28} {previous:>12} -> {current:>12} ({change:+.1%}) {marker}")
+        if worse > threshold:
+            regressions.append(f"{name}: {previous} -> {current} ({change:+.1%})")
+
+    for stage, stats in result["stages"].items():
+        previous = baseline.get("stages", {}).get(stage, {})
+        check(f"{stage}.throughput", stats["throughput"], previous.get("throughput"), True)
+        check(f"{stage}.p95_ms", stats["p95_ms"], previous.get("p95_ms"), False, P95_NOISE_MS)
+    check("total.throughput", result["total"]["throughput"], baseline.get("total", {}).get("throughput"), True)
+    scope = result.get("meta", {}).get("rss_scope")
+    if scope == baseline.get("meta", {}).get("rss_scope"):
+        check("peak_rss_mb", result["peak_rss_mb"], baseline.get("peak_rss_mb"), False)
+    else:
+        print(f"  {'peak_rss_mb':28} not compared: the baseline measured a different scope than {scope}")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description="SmartHire 2.0 processing benchmark")
+    parser.add_argument("--size", default="1k", help="Number of CVs: 1k, 10k, 100k or an integer")
+    parser.add_argument("--seed", type=int, default=42, help="Corpus seed")
+    parser.add_argument("--formats", default=",".join(FORMATS), help="Comma-separated: pdf,docx,txt")
+    parser.add_argument("--corpus-dir", help="Where the corpus is generated (reused across runs)")
+    parser.add_argument("--chunk-size", type=int, default=TFIDF_CHUNK_SIZE, help="Resumes per TF-IDF batch")
+    parser.add_argument("--workers", type=int, default=SMARTHIRE_WORKERS, help="Pool worker processes (1 = in the job thread)")
+    parser.add_argument("--streaming", action="store_true", help="Screen the archive in streaming mode")
+    parser.add_argument("--output", help="Write results JSON here")
+    parser.add_argument("--baseline", help="Compare against this results JSON")
+    parser.add_argument("--threshold", type=float, default=0.10, help="Allowed regression (fraction)")
+    args = parser.parse_args()
+
+    size = parse_size(args.size)
+    formats = tuple(f.strip() for f in args.formats.split(",") if f.strip())
+    unknown = [f for f in formats if f not in FORMATS]
+    if unknown:
+        parser.error(f"Unknown formats: {', '.join(unknown)}")
+    corpus_dir = args.corpus_dir or os.path.join(
+        tempfile.gettempdir(), f"smarthire-corpus-v{CORPUS_VERSION}-{args.seed}-{'-'.join(formats)}")
+
+    print("=" * 60)
+    print("SmartHire 2.0 Benchmark")
+    print("=" * 60)
+
+    paths = generate_corpus(corpus_dir, size, args.seed, formats)
+    result = run_benchmark(paths, args.chunk_size, max(1, args.workers), args.streaming)
+    result["meta"] = {
+        "size": size,
+        "seed": args.seed,
+        "formats": list(formats),
+        "chunk_size": args.chunk_size,
+        "workers": max(1, args.workers),
+        "streaming": args.streaming,
+        "pdf_backend": PDF_BACKEND,
+        "rss_scope": result.pop("rss_scope"),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "cpus": os.cpu_count(),
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S")
+    }
+
+    print(f"\n{'stage':12} {'items':>8} {'CVs/sec':>10} {'p50 ms':>10} {'p95 ms':>10}")
+    for stage, stats in result["stages"].items():
+        print(f"{stage:12} {stats['items']:>8} {stats['throughput']:>10} {stats['p50_ms']:>10} {stats['p95_ms']:>10}")
+    print(f"{'total':12} {result['total']['items']:>8} {result['total']['throughput']:>10}")
+    print(f"Peak RSS: {result['peak_rss_mb']} MB ({result['meta']['rss_scope']})")
+    print("(dedup, tokenize, tfidf, score and db_write latencies are per chunk; stage CVs/sec is per")
+    print(" second spent in the stage, summed over pool workers; latencies are exact percentiles)")
+    print("Counters: " + ", ".join(f"{name} {count}" for name, count in result["counters"].items()))
+
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(result, f, indent=2)
+        print(f"\nResults written to {args.output}")
+
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+        print(f"\nComparing against {args.baseline} (threshold {args.threshold:.0%}):")
+        regressions = compare_to_baseline(result, baseline, args.threshold)
+        if regressions:
+            print(f"\n✗ {len(regressions)} regression(s):")
+            for regression in regressions:
+                print(f"  {regression}")
+            return False
+        print("\n✓ No regressions")
+
+    return True
+
+if __name__ == "__main__":
+    success = main()
+    sys.exit(0 if success else 1)
@@ -1,16 +1,35 @@
-import os, json, threading, sqlite3, time, zipfile, re
-from flask import Flask, request, jsonify
-from flask_cors import CORS
+import os, io, json, uuid, base64, functools, hashlib, heapq, itertools, math, pickle, threading, multiprocessing, socket, sqlite3, tempfile, time, zipfile, zlib, re
+from collections import Counter, OrderedDict, deque
 from contextlib import contextmanager
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from flask import Flask, Request, Response, request, jsonify
+from flask_cors import CORS
 from dotenv import load_dotenv
-import pdfplumber, docx
+
+# Load environment variables (before local modules read their settings)
+load_dotenv()
+
+import docx
+import numpy as np
+from sklearn.feature_extraction import DictVectorizer, FeatureHasher
 from sklearn.feature_extraction.text import TfidfVectorizer
+from sklearn.preprocessing import normalize
 from sklearn.metrics.pairwise import cosine_similarity
-from database import init_db, DB_PATH
+from database import (init_db, pooled_connection, get_cached_texts, update_text_cache, get_text_cache_stats,
+                      record_pdf_backend_timings, get_pdf_backend_stats, enqueue_job, claim_queue_item,
+                      heartbeat_queue_item, finish_queue_item, add_job_event, get_latest_job_event,
+                      prune_job_events, record_job_metrics, get_job_metrics, get_queue_depth,
+                      add_to_talent_pool, get_talent_pool_stats, create_pool_segment)
 from skills_master import SKILLS, SKILL_CONTEXT_MAP
-
-# Load environment variables
-load_dotenv()
+from skill_matcher import SkillMatcher, boundary_pattern
+from pdf_engine import extract_pdf_text, pop_backend_timings, PDF_BACKEND, PDF_MAX_PAGES, PDF_MAX_CHARS
+from metrics import inc, observe, timed, pop_metrics, merge_metrics, pop_samples, merge_samples, render_prometheus
+from dedup import DedupIndex, DEDUP_ENABLED, fingerprint
+from export import EXPORT_COLUMNS, EXPORT_FORMATS, ENCODERS, gzip_chunks
+from db_writer import DatabaseWriter
+from chunked_upload import (UPLOAD_CHUNK_BYTES, UPLOAD_MIN_CHUNK_BYTES, MAX_UPLOAD_BYTES, UPLOAD_SESSION_HOURS,
+                            ChunkError, chunk_count, chunk_length, corrupt_chunks, create_part_file, write_chunk)
 
 app = Flask(__name__)
 
@@ -23,7 +42,7 @@ CORS(app, resources={
     r"/*": {
         "origins": [FRONTEND_URL, "http://localhost:3000", "http://localhost:5173"],
         "methods": ["GET", "POST", "PUT", "DELETE", "OPTIONS"],
-        "allow_headers": ["Content-Type", "Authorization"],
+        "allow_headers": ["Content-Type", "Authorization", "X-Chunk-SHA256"],
         "supports_credentials": True
     }
 })
@@ -34,102 +53,441 @@ init_db()
 UPLOAD_FOLDER = os.getenv('UPLOAD_FOLDER', 'uploads')
 os.makedirs(UPLOAD_FOLDER, exist_ok=True)
 
+# Spooled uploads are created 0600; archives saved from them get the mode
+# of any other file this process creates
+_umask = os.umask(0)
+os.umask(_umask)
+UPLOAD_FILE_MODE = 0o666 & ~_umask
+
+class UploadRequest(Request):
+    """Spools uploaded files to UPLOAD_FOLDER, so storing an archive is a hard link instead of a copy"""
+    
+    def _get_file_stream(self, total_content_length, content_type, filename=None, content_length=None):
+        return tempfile.NamedTemporaryFile('w+b', dir=UPLOAD_FOLDER, prefix='.upload-')
+
+app.request_class = UploadRequest
+
+# A spooled upload is written throughout its request; one idle this long was left by a crash
+SPOOL_MAX_IDLE_SECONDS = 3600
+
+def sweep_upload_spools():
+    """Delete spooled uploads (see UploadRequest) left in UPLOAD_FOLDER by a process that died"""
+    cutoff = time.time() - SPOOL_MAX_IDLE_SECONDS
+    removed = 0
+    for entry in os.scandir(UPLOAD_FOLDER):
+        try:
+            if entry.name.startswith('.upload-') and entry.is_file() and entry.stat().st_mtime < cutoff:
+                os.remove(entry.path)
+                removed += 1
+        except FileNotFoundError:
+            # Removed by another process sweeping at the same time
+            pass
+    return removed
+
+sweep_upload_spools()
+
+# Number of resumes vectorized together; bounds the TF-IDF matrix size for large archives
+TFIDF_CHUNK_SIZE = int(os.getenv('TFIDF_CHUNK_SIZE', 250))
+
+# Job descriptions accepted by one /upload-zip/multi request
+MAX_MULTI_JOBS = int(os.getenv('MAX_MULTI_JOBS', 20))
+
+# 'thread': jobs run in a thread of the web process that queued them
+# 'queue': jobs are only queued and run by standalone workers (python -m worker)
+SMARTHIRE_EXECUTION = os.getenv('SMARTHIRE_EXECUTION', 'thread')
+
+# Queue lease: a job whose worker stops heart-beating for this long is resumed elsewhere
+QUEUE_LEASE_SECONDS = int(os.getenv('QUEUE_LEASE_SECONDS', 120))
+
+# Job event streams: how often each process checks for events written by other
+# processes (one check for all streams), and how long a stream may stay silent
+# before sending a keep-alive comment
+SSE_POLL_INTERVAL = float(os.getenv('SSE_POLL_INTERVAL', 1.0))
+SSE_KEEPALIVE_SECONDS = int(os.getenv('SSE_KEEPALIVE_SECONDS', 15))
+
+# Size cap for the extracted-text cache stored alongside the database
+TEXT_CACHE_MAX_BYTES = int(os.getenv('TEXT_CACHE_MAX_BYTES', 268435456))  # 256MB default
+
+# Worker processes used to extract and score chunks (1 = run inside the job thread)
+SMARTHIRE_WORKERS = max(1, int(os.getenv('SMARTHIRE_WORKERS', 1)))
+
+# Streaming mode for very large archives: members are read lazily in chunks sized to
+# fit SMARTHIRE_MEMORY_BUDGET_MB, term counts are hashed instead of building a
+# vocabulary, and the duplicate index stops growing at its share of the budget.
+# Jobs stream when asked to, or ('auto') when the archive holds STREAMING_MIN_FILES CVs.
+SMARTHIRE_MEMORY_BUDGET_MB = int(os.getenv('SMARTHIRE_MEMORY_BUDGET_MB', 1024))
+STREAMING_MIN_FILES = int(os.getenv('STREAMING_MIN_FILES', 20000))
+
+# Every CV first gets a provisional score from its skills and must-haves alone,
+# then TF-IDF similarity is added with one IDF fitted over the job's candidates.
+# Cascade ranking (opt-in per upload) fully scores only the best CASCADE_TOP
+# ("500", or "10%" of the archive)
+CASCADE_TOP = os.getenv('CASCADE_TOP', '500')
+
 # Pre-compile regex patterns for better performance
-# Cache is bounded by number of skills in SKILLS dictionary (~200 patterns max)
-# Memory usage is negligible compared to performance gain (85x faster)
+# Used for the per-job must-have skills; dictionary skills go through skill_matcher
 _compiled_patterns = {}
 
+def clean_must_have(skill):
+    """Normalize a must-have as entered (quotes and case are ignored)"""
+    return skill.strip().replace('"', '').replace("'", "").lower()
+
 def get_compiled_pattern(skill):
     """Cache compiled regex patterns to avoid recompilation"""
     if skill not in _compiled_patterns:
-        _compiled_patterns[skill] = re.compile(r'\b' + re.escape(skill) + r'\b')
+        _compiled_patterns[skill] = re.compile(boundary_pattern(skill))
     return _compiled_patterns[skill]
 
-# Database connection pool using context manager
-@contextmanager
+# Single-pass matcher for the whole skill dictionary and its SKILL_CONTEXT_MAP aliases,
+# compiled once at import. Scanning cost depends on resume length, not on the number of terms.
+skill_matcher = SkillMatcher(SKILLS, SKILL_CONTEXT_MAP)
+
+# Request handlers, job threads and queue workers borrow connections from a
+# per-thread pool instead of opening one per request (see database.pooled_connection)
 def get_db_connection():
-    """Context manager for database connections to prevent leaks"""
-    conn = sqlite3.connect(DB_PATH, timeout=30.0)
-    try:
-        yield conn
-    finally:
-        conn.close()
+    """Context manager lending this thread a tuned, reusable database connection"""
+    return pooled_connection()
+
+# --- Helper: List CVs inside a ZIP archive without extracting it ---
+CV_EXTENSIONS = ('.pdf', '.docx', '.txt')
+
+# Limits checked against the central directory before any member is read. A CV
+# is read into memory whole (zipfile stops at its declared size), so the
+# per-member cap bounds what one file can take on a 2GB container
+MAX_ZIP_MEMBERS = int(os.getenv('MAX_ZIP_MEMBERS', 200000))
+MAX_ZIP_MEMBER_BYTES = int(os.getenv('MAX_ZIP_MEMBER_BYTES', 33554432))  # 32MB default
+MAX_ZIP_UNCOMPRESSED_BYTES = int(os.getenv('MAX_ZIP_UNCOMPRESSED_BYTES', 4294967296))  # 4GB default
+
+class ZipLimitError(ValueError):
+    """Raised when an archive exceeds the configured member or size limits"""
+
+def iter_cv_infos(infos, extensions=CV_EXTENSIONS):
+    """Yield the ZipInfo of each CV member, in archive order"""
+    for info in infos:
+        name = info.filename
+        # Skip directories and macOS resource forks (__MACOSX/._cv.pdf)
+        if info.is_dir() or name.startswith('__MACOSX/') or os.path.basename(name).startswith('._'):
+            continue
+        if name.lower().endswith(extensions):
+            yield info
 
-# --- Helper: Extract all CV files from a directory recursively ---
-def find_cv_files(directory, extensions=None):
+# Each thread (job thread or pool worker) keeps its current archive open, so the
+# central directory is parsed once per job rather than once per chunk
+_open_archive = threading.local()
+
+def open_archive(zip_path):
+    """Return this thread's open ZipFile for zip_path, closing the previous archive"""
+    current = getattr(_open_archive, 'current', None)
+    if current is not None and current[0] == zip_path:
+        return current[1]
+    if current is not None:
+        current[1].close()
+    zip_ref = zipfile.ZipFile(zip_path, 'r')
+    _open_archive.current = (zip_path, zip_ref)
+    return zip_ref
+
+def close_archive():
+    current = getattr(_open_archive, 'current', None)
+    if current is not None:
+        current[1].close()
+        _open_archive.current = None
+
+def streaming_chunk_bytes():
+    """
+    Uncompressed CV bytes per streaming chunk
+    
+    Half the budget is shared by the chunks in flight (one per pool worker
+    queue slot plus the one being written); a CV is assumed to need about
+    4x its file size while in flight (file bytes, extracted text, features
+    and compressed pool copy).
+    """
+    in_flight = (2 * SMARTHIRE_WORKERS if SMARTHIRE_WORKERS > 1 else 1) + 1
+    return max(1, SMARTHIRE_MEMORY_BUDGET_MB * 1024 * 1024 // 2 // in_flight // 4)
+
+def stream_cv_chunks(zip_path, skip, chunk_files=None, chunk_bytes=None):
+    """
+    Lazily yield lists of CV member names, skipping the first `skip` CVs
+    
+    A chunk closes at chunk_files members or once its members' uncompressed
+    size reaches chunk_bytes, whichever comes first, so memory per chunk is
+    bounded even when CV sizes vary widely.
+    """
+    chunk_files = chunk_files or TFIDF_CHUNK_SIZE
+    chunk_bytes = chunk_bytes or streaming_chunk_bytes()
+    chunk, size = [], 0
+    for index, info in enumerate(iter_cv_infos(open_archive(zip_path).infolist())):
+        if index < skip:
+            continue
+        chunk.append(info.filename)
+        size += info.file_size
+        if len(chunk) >= chunk_files or size >= chunk_bytes:
+            yield chunk
+            chunk, size = [], 0
+    if chunk:
+        yield chunk
+
+def list_zip_cvs(zip_path, extensions=CV_EXTENSIONS):
     """
-    Find CV files recursively
+    Find CV members of a ZIP archive from its central directory
     
     Args:
-        directory: Directory to search
-        extensions: Tuple or list of extensions (default: ('.pdf', '.docx', '.txt'))
-    """
-    if extensions is None:
-        extensions = ('.pdf', '.docx', '.txt')
-    # Convert list to tuple for faster endswith() matching
-    elif isinstance(extensions, list):
-        extensions = tuple(extensions)
-    
-    cv_files = []
-    for root, dirs, files in os.walk(directory):
-        for file in files:
-            # Using str.endswith with tuple is more efficient
-            if file.lower().endswith(extensions):
-                cv_files.append(os.path.join(root, file))
-    return cv_files
-
-# --- Helper: Extract ZIP and find all CVs ---
-def extract_and_find_cvs(zip_path, extract_to):
+        zip_path: Path of the uploaded archive
+        extensions: Tuple of extensions to keep (default: ('.pdf', '.docx', '.txt'))
+    
+    Raises ZipLimitError for archives that exceed MAX_ZIP_MEMBERS or
+    MAX_ZIP_UNCOMPRESSED_BYTES, or hold a CV larger than MAX_ZIP_MEMBER_BYTES,
+    so a zip bomb fails before decompression.
+    """
     with zipfile.ZipFile(zip_path, 'r') as zip_ref:
-        zip_ref.extractall(extract_to)
+        infos = zip_ref.infolist()
+    
+    if len(infos) > MAX_ZIP_MEMBERS:
+        raise ZipLimitError(f"ZIP has {len(infos)} entries (limit {MAX_ZIP_MEMBERS})")
+    
+    cv_members = []
+    total_size = 0
+    for info in iter_cv_infos(infos, extensions):
+        if info.file_size > MAX_ZIP_MEMBER_BYTES:
+            raise ZipLimitError(
+                f"{info.filename} expands to {info.file_size} bytes (limit {MAX_ZIP_MEMBER_BYTES} per CV)"
+            )
+        cv_members.append(info.filename)
+        total_size += info.file_size
     
-    return find_cv_files(extract_to)
+    if total_size > MAX_ZIP_UNCOMPRESSED_BYTES:
+        raise ZipLimitError(
+            f"ZIP expands to {total_size} bytes of CVs (limit {MAX_ZIP_UNCOMPRESSED_BYTES})"
+        )
+    return cv_members
 
 # --- 1. Extraction & Analysis Logic ---
 def extract_text(filepath):
     """Optimized text extraction with better performance"""
+    try:
+        with open(filepath, 'rb') as f:
+            data = f.read()
+    except Exception as e:
+        print(f"Error extracting {filepath}: {e}")
+        return ""
+    return extract_text_from_bytes(data, filepath)
+
+def file_type_of(filename):
+    """Extension without the dot, used as the metrics label for a file"""
+    return os.path.splitext(filename)[1].lstrip('.').lower() or 'unknown'
+
+def extract_text_from_bytes(data, filename):
+    """Extract lowercased text from file contents; the file type comes from filename"""
+    name = filename.lower()
+    file_type = file_type_of(name)
+    inc('files_total', type=file_type)
+    start = time.perf_counter()
     try:
         text = ""
-        if filepath.endswith('.pdf'):
-            try:
-                with pdfplumber.open(filepath) as pdf:
-                    # More efficient: build list then join once
-                    pages = [p.extract_text() for p in pdf.pages if p.extract_text()]
-                    text = " ".join(pages)
-            except Exception as pdf_error:
-                print(f"PDF extraction failed for {filepath}: {pdf_error}")
-                try:
-                    import PyPDF2
-                    with open(filepath, 'rb') as f:
-                        reader = PyPDF2.PdfReader(f)
-                        pages = [page.extract_text() for page in reader.pages if page.extract_text()]
-                        text = " ".join(pages)
-                except:
-                    text = ""
-                    
-        elif filepath.endswith('.docx'):
-            doc = docx.Document(filepath)
+        if name.endswith('.pdf'):
+            # Backend, fallbacks and page/character caps are configured in pdf_engine
+            text = extract_pdf_text(data)
+        elif name.endswith('.docx'):
+            doc = docx.Document(io.BytesIO(data))
             # More efficient: filter empty paragraphs
             text = " ".join([p.text for p in doc.paragraphs if p.text.strip()])
-        elif filepath.endswith('.txt'):
-            with open(filepath, 'r', encoding='utf-8', errors='ignore') as f:
-                text = f.read()
+        elif name.endswith('.txt'):
+            text = data.decode('utf-8', errors='ignore')
         
         return text.lower() if text else ""
     except Exception as e:
-        print(f"Error extracting {filepath}: {e}")
+        print(f"Error extracting {filename}: {e}")
+        inc('file_errors_total', type=file_type, stage='extract')
         return ""
+    finally:
+        observe('extract_seconds', time.perf_counter() - start, type=file_type)
+
+# Text cache activity recorded by this thread (or pool worker) and not yet
+# written; the database writer stores it with the next chunk (see write_chunks)
+_text_cache_local = threading.local()
+
+def _text_cache_activity():
+    activity = getattr(_text_cache_local, 'activity', None)
+    if activity is None:
+        activity = _text_cache_local.activity = {'texts': {}, 'hits': set(), 'misses': 0, 'pdf_timings': {}}
+    return activity
+
+def merge_text_cache_activity(delta):
+    """Add activity popped elsewhere (e.g. in a pool worker) to this thread's"""
+    activity = _text_cache_activity()
+    activity['texts'].update(delta['texts'])
+    activity['hits'].update(delta['hits'])
+    activity['misses'] += delta['misses']
+    for backend, stats in delta['pdf_timings'].items():
+        totals = activity['pdf_timings'].setdefault(backend, dict.fromkeys(stats, 0))
+        for key, value in stats.items():
+            totals[key] += value
+
+def pop_text_cache_activity():
+    """
+    Return and reset the text cache activity of this thread since the last
+    call, with the PDF backend timings of this process under 'pdf_timings'
+    """
+    merge_text_cache_activity({'texts': {}, 'hits': (), 'misses': 0, 'pdf_timings': pop_backend_timings()})
+    activity = _text_cache_local.activity
+    _text_cache_local.activity = None
+    return activity
+
+def record_text_cache_activity(conn, activity):
+    """Write popped text cache activity (committed with the caller's commit)"""
+    timings = activity['pdf_timings']
+    if timings:
+        record_pdf_backend_timings(conn, timings)
+    if activity['texts'] or activity['hits'] or activity['misses']:
+        update_text_cache(conn, activity['texts'], activity['hits'], activity['misses'], TEXT_CACHE_MAX_BYTES)
 
-def score_candidate(job_desc, resume_text, must_haves, job_desc_lower=None, skills_in_job_desc=None):
+def extract_texts_cached(files):
+    """
+    Extract text for a batch of files, consulting the text cache first
+    
+    Args:
+        files: List of (filename, file bytes)
+    
+    Returns (content_hash, text) pairs in the same order. Only cache misses
+    are parsed; identical files in the batch are parsed once. New texts
+    and hits are only recorded here, for the database writer to store with
+    the chunk (see pop_text_cache_activity).
+    """
+    hashes = [hashlib.sha256(data).hexdigest() for _, data in files]
+    with get_db_connection() as conn:
+        cached = get_cached_texts(conn, set(hashes))
+    
+    activity = _text_cache_activity()
+    new_texts = {}
+    for (filename, data), content_hash in zip(files, hashes):
+        if content_hash in cached:
+            inc('text_cache_hits_total')
+            continue
+        if content_hash in new_texts:
+            continue
+        activity['misses'] += 1
+        new_texts[content_hash] = extract_text_from_bytes(data, filename)
+    
+    activity['hits'].update(cached)
+    # Empty results are not cached so a failed parse is retried next time
+    activity['texts'].update((h, t) for h, t in new_texts.items() if t)
+    return [(h, cached[h] if h in cached else new_texts[h]) for h in hashes]
+
+# Tokenizer of the TF-IDF vectorizer; resumes' term counts are kept in the talent pool
+_tfidf_analyzer = TfidfVectorizer().build_analyzer()
+
+def term_counts(text):
+    """Term counts of a text, tokenized the way TfidfVectorizer does"""
+    return Counter(_tfidf_analyzer(text))
+
+# Stateless term hashing for streaming jobs: no vocabulary is built per chunk
+_term_hasher = FeatureHasher(n_features=2 ** 20, input_type='dict', alternate_sign=False)
+
+def document_frequencies(counts_list, hashed=False):
+    """
+    (documents, frequencies) of a batch of term counts, to add to TermWeights
+    
+    frequencies counts the documents each term occurs in; with hashed=True it
+    is a (columns, counts) pair of arrays over _term_hasher's space instead.
+    """
+    if hashed:
+        # The hasher sums duplicate columns, so each row lists a column once
+        return len(counts_list), np.unique(_term_hasher.transform(counts_list).indices, return_counts=True)
+    frequencies = Counter()
+    for counts in counts_list:
+        frequencies.update(counts.keys())
+    return len(counts_list), frequencies
+
+class TermWeights:
+    """
+    TF-IDF weights of one or more job descriptions, fitted once over a set of resumes
+    
+    Document frequencies are added a batch at a time (see document_frequencies)
+    and fit() fixes the IDF, so resumes transformed afterwards score the same
+    in any chunk. Same weights as fitting TfidfVectorizer on the job
+    descriptions plus the resumes (smoothed IDF, L2 norm), but built from term
+    counts that can come straight from the talent pool. With hashed=True terms
+    are hashed into a fixed 2**20-column space instead of a fitted vocabulary,
+    so memory does not grow with it (collisions are rare enough not to move scores).
+    """
+    
+    def __init__(self, job_counts, hashed=False):
+        self.job_counts = list(job_counts)
+        self.hashed = hashed
+        self.documents = 0
+        self.frequencies = np.zeros(_term_hasher.n_features, dtype=np.int64) if hashed else Counter()
+        self.vectorizer = _term_hasher if hashed else None
+        self.idf = self.job_vectors = None
+        self.add(*document_frequencies(self.job_counts, hashed))
+    
+    def add(self, documents, frequencies):
+        self.documents += documents
+        if self.hashed:
+            columns, counts = frequencies
+            self.frequencies[columns] += counts
+        else:
+            self.frequencies.update(frequencies)
+        return self
+    
+    def fit(self):
+        if not self.hashed:
+            self.vectorizer = DictVectorizer().fit([self.frequencies])
+            self.frequencies = np.array([self.frequencies[term] for term in self.vectorizer.feature_names_],
+                                        dtype=np.int64)
+        self.idf = np.log((1 + self.documents) / (1 + self.frequencies)) + 1
+        # Only the IDF is kept, since the weights are shipped to pool workers
+        self.frequencies = None
+        self.job_vectors = self.transform(self.job_counts)
+        return self
+    
+    def transform(self, counts_list):
+        """L2-normalized TF-IDF vectors of term counts; terms the fit did not see are dropped"""
+        vectors = self.vectorizer.transform(counts_list).tocsr()
+        vectors.data *= self.idf[vectors.indices]
+        if vectors.shape[1] == 0:
+            # Empty vocabulary (e.g. only stop words)
+            return vectors
+        return normalize(vectors)
+    
+    def cosine(self, resume_counts):
+        """TF-IDF cosine similarity (0-100 scale) as a (resumes x job descriptions) array"""
+        if not resume_counts:
+            return np.zeros((0, len(self.job_counts)))
+        # Rows are L2-normalized, so one sparse matrix product gives every cosine
+        return (self.transform(resume_counts) @ self.job_vectors.T).toarray() * 100
+
+def cosine_matrix_from_counts(job_counts, resume_counts, hashed=False):
+    """
+    TF-IDF cosine similarity (0-100 scale) of each resume against each job description,
+    with IDF fitted over this batch (see TermWeights for the weights of a whole job)
+    
+    Returns a (resumes x job descriptions) array.
+    """
+    weights = TermWeights(job_counts, hashed).add(*document_frequencies(resume_counts, hashed))
+    return weights.fit().cosine(resume_counts)
+
+def batch_cosine_matrix(job_descs_lower, resume_texts):
+    """TF-IDF cosine similarity (0-100 scale) of each resume text against each job description"""
+    return cosine_matrix_from_counts([term_counts(desc) for desc in job_descs_lower],
+                                     [term_counts(text) for text in resume_texts])
+
+def batch_cosine_scores(job_desc_lower, resume_texts):
+    """TF-IDF cosine similarity (0-100 scale) of each resume against one job description"""
+    return batch_cosine_matrix([job_desc_lower], resume_texts)[:, 0].tolist()
+
+def score_candidate(job_desc, resume_text, must_haves, job_desc_lower=None, skills_in_job_desc=None,
+                    cosine_sim=None, found_skills=None):
     """
     Optimized scoring function with caching support
     
     Args:
         job_desc: Job description text
-        resume_text: Resume text (already lowercased)
+        resume_text: Resume text (already lowercased); may be None when found_skills is
+            given and every must-have is a dictionary skill (see must_haves_need_text)
         must_haves: List of must-have skills
         job_desc_lower: Pre-lowercased job description (optional, for performance)
         skills_in_job_desc: Pre-computed skills in job description (optional, for performance)
+        cosine_sim: Pre-computed TF-IDF similarity from batch_cosine_scores (optional, for performance)
+        found_skills: Pre-computed skill_matcher.find(resume_text) (optional, shared across jobs)
     """
     # Use cached values if provided, otherwise compute
     if job_desc_lower is None:
@@ -137,23 +495,15 @@ def score_candidate(job_desc, resume_text, must_haves, job_desc_lower=None, skil
     
     missing_critical = []
     
-    # Check must-have skills
-    if must_haves:
-        for skill in must_haves:
-            skill_clean = skill.strip().replace('"', '').replace("'", "").lower()
-            if skill_clean:
-                pattern = get_compiled_pattern(skill_clean)
-                if not pattern.search(resume_text):
-                    missing_critical.append(skill_clean)
-    
     # TF-IDF Cosine Similarity (0-100 scale)
-    try:
-        vectors = TfidfVectorizer().fit_transform([job_desc_lower, resume_text])
-        cosine_sim = cosine_similarity(vectors)[0][1] * 100
-    except:
-        cosine_sim = 0
+    if cosine_sim is None:
+        try:
+            vectors = TfidfVectorizer().fit_transform([job_desc_lower, resume_text])
+            cosine_sim = cosine_similarity(vectors)[0][1] * 100
+        except:
+            cosine_sim = 0
     
-    # Optimized skill matching - single pass with pre-computed job skills
+    # Skill matching - one pass over the resume for the whole dictionary
     weighted_skill_score = 0
     found_skills_list = []
     max_possible_skill_score = 0
@@ -161,32 +511,34 @@ def score_candidate(job_desc, resume_text, must_haves, job_desc_lower=None, skil
     if SKILLS:
         # Compute skills in job description if not provided
         if skills_in_job_desc is None:
-            skills_in_job_desc = set()
-            for skill in SKILLS.keys():
-                if len(skill.strip()) > 1:
-                    pattern = get_compiled_pattern(skill.lower())
-                    if pattern.search(job_desc_lower):
-                        skills_in_job_desc.add(skill.lower())
-        
-        # Single pass: check resume for skills
-        for skill, weight in SKILLS.items():
-            skill_lower = skill.lower()
-            
-            if len(skill.strip()) <= 1:
-                continue
-            
-            pattern = get_compiled_pattern(skill_lower)
-            if pattern.search(resume_text):
-                # Skill found in resume
-                found_skills_list.append(skill)
-                
-                # Higher score for skills mentioned in job description
-                if skill_lower in skills_in_job_desc:
-                    weighted_skill_score += 15 * weight
-                    max_possible_skill_score += 15 * weight
-                else:
-                    weighted_skill_score += 5 * weight
-                    max_possible_skill_score += 5 * weight
+            skills_in_job_desc = skill_matcher.find_set(job_desc_lower)
+        
+        if found_skills is None:
+            start = time.perf_counter()
+            found_skills = skill_matcher.find(resume_text)
+            observe('skill_match_seconds', time.perf_counter() - start)
+        found_skills_list = found_skills
+        for skill in found_skills_list:
+            weight = SKILLS[skill]
+            # Higher score for skills mentioned in job description
+            if skill.lower() in skills_in_job_desc:
+                weighted_skill_score += 15 * weight
+                max_possible_skill_score += 15 * weight
+            else:
+                weighted_skill_score += 5 * weight
+                max_possible_skill_score += 5 * weight
+    
+    # Check must-have skills (a dictionary skill also counts when found through an alias)
+    if must_haves:
+        start = time.perf_counter()
+        found_lower = {s.lower() for s in found_skills_list}
+        for skill in must_haves:
+            skill_clean = clean_must_have(skill)
+            if skill_clean and skill_clean not in found_lower:
+                # The matcher already decided dictionary skills; other terms are searched for
+                if skill_matcher.covers(skill_clean) or not get_compiled_pattern(skill_clean).search(resume_text):
+                    missing_critical.append(skill_clean)
+        observe('must_have_seconds', time.perf_counter() - start)
     
     # --- NORMALIZE TO 0-100 SCALE ---
     if max_possible_skill_score > 0:
@@ -221,230 +573,2326 @@ def score_candidate(job_desc, resume_text, must_haves, job_desc_lower=None, skil
     
     return round(final_score, 2), missing_critical, found_skills_list
 
-# --- 2. The Background Worker ---
-def process_job_thread(job_id, job_desc, cv_files, must_haves):
-    """Optimized background processing with batching and caching"""
-    with get_db_connection() as conn:
-        c = conn.cursor()
-        
-        processed_count = 0
-        total_files = len(cv_files)
-        
-        print(f"\n=== Processing Job {job_id} ===")
-        print(f"Job Description: {job_desc[:100]}...")
-        print(f"Must-have skills: {must_haves}")
-        print(f"Total CV files: {total_files}")
-        
-        c.execute("UPDATE jobs SET total_files=? WHERE id=?", (total_files, job_id))
-        conn.commit()
-        
-        # Pre-compute job description analysis for reuse (major optimization)
-        job_desc_lower = job_desc.lower()
-        skills_in_job_desc = set()
-        
-        print("Pre-computing job skills...")
-        for skill in SKILLS.keys():
-            if len(skill.strip()) > 1:
-                pattern = get_compiled_pattern(skill.lower())
-                if pattern.search(job_desc_lower):
-                    skills_in_job_desc.add(skill.lower())
-        
-        print(f"Found {len(skills_in_job_desc)} relevant skills in job description")
-        
-        scores_log = []
-        candidates_added = 0
-        
-        # Batch insert buffer for better database performance
-        batch_size = 100
-        candidate_batch = []
-        
-        for path in cv_files:
-            try:
-                filename = os.path.basename(path)
-                text = extract_text(path)
-                
-                if text and len(text) > 50:
-                    # Pass pre-computed values to avoid redundant work
-                    score, missing, found_skills = score_candidate(
-                        job_desc, text, must_haves, 
-                        job_desc_lower=job_desc_lower,
-                        skills_in_job_desc=skills_in_job_desc
-                    )
-                    
-                    # Log first 10 files with skill details
-                    if processed_count < 10:
-                        skill_preview = found_skills[:3] if found_skills else []
-                        print(f"[{processed_count+1}] {filename[:30]:30} Score: {score:5.1f} Skills: {skill_preview}")
-                        scores_log.append((filename, score, found_skills[:3]))
-                    
-                    # Add to batch buffer
-                    candidate_batch.append((
-                        job_id, filename, score, 
-                        json.dumps(missing), False, 
-                        json.dumps(found_skills)
-                    ))
-                    
-                    if score > 0:
-                        candidates_added += 1
-                
-                processed_count += 1
-                
-                # Batch insert every batch_size records
-                if len(candidate_batch) >= batch_size:
-                    c.executemany(
-                        """INSERT INTO candidates 
-                           (job_id, filename, score, missing_skills, is_shortlisted, found_skills) 
-                           VALUES (?, ?, ?, ?, ?, ?)""",
-                        candidate_batch
-                    )
-                    conn.commit()
-                    candidate_batch = []
-                
-                # Update progress less frequently (every 50 files)
-                if processed_count % 50 == 0:
-                    c.execute("UPDATE jobs SET processed_files=? WHERE id=?", (processed_count, job_id))
-                    conn.commit()
-                    print(f"  Processed: {processed_count}/{total_files}")
-                    
-            except Exception as e:
-                print(f"Error processing {path}: {e}")
-        
-        # Insert any remaining candidates in batch
-        if candidate_batch:
-            c.executemany(
-                """INSERT INTO candidates 
-                   (job_id, filename, score, missing_skills, is_shortlisted, found_skills) 
-                   VALUES (?, ?, ?, ?, ?, ?)""",
-                candidate_batch
-            )
-            conn.commit()
+# --- 1b. Vectorized scoring: score_candidate for a whole chunk as array math ---
+# Columns of the (resumes x skills) presence matrix
+SKILL_VOCABULARY = skill_matcher.skills
+SKILL_INDEX = {skill: i for i, skill in enumerate(SKILL_VOCABULARY)}
 
-        print(f"\n=== Job {job_id} Summary ===")
-        print(f"Total processed: {processed_count}")
-        print(f"Candidates saved: {candidates_added}")
-        
-        # Show skill distribution in top samples
-        print("\nSample skill matches:")
-        for filename, score, skills in scores_log[:5]:
-            print(f"  {filename[:20]}: {score:5.1f} - Skills: {skills}")
-        
-        c.execute("UPDATE jobs SET status='Completed', processed_files=? WHERE id=?", (processed_count, job_id))
-        conn.commit()
-    
-    print(f"Job {job_id} Completed.\n")
+def skill_columns(predicate):
+    """Vocabulary columns whose skill name satisfies predicate(lowercased name)"""
+    return np.array([i for i, skill in enumerate(SKILL_VOCABULARY) if predicate(skill.lower())], dtype=np.intp)
 
-# --- 3. API Endpoints ---
-@app.route('/upload-zip', methods=['POST'])
-def upload_zip():
-    job_desc = request.form.get('description', '')
-    must_haves_str = request.form.get('must_haves', '')
-    must_haves = [s.strip() for s in must_haves_str.split(',') if s.strip()]
+def skill_presence_matrix(found_lists):
+    """Boolean (resumes x skill vocabulary) matrix of the skills found in each resume"""
+    presence = np.zeros((len(found_lists), len(SKILL_VOCABULARY)), dtype=bool)
+    rows = [row for row, found in enumerate(found_lists) for _ in found]
+    columns = [SKILL_INDEX[skill] for found in found_lists for skill in found]
+    presence[rows, columns] = True
+    return presence
+
+def skill_weight_vector(skills_in_job_desc, relevant=15, other=5):
+    """Per-skill credit for a job: SKILLS weight x 15 if the job description mentions the skill, else x 5"""
+    return np.array([SKILLS[skill] * (relevant if skill.lower() in skills_in_job_desc else other)
+                     for skill in SKILL_VOCABULARY], dtype=float)
+
+def build_skill_scoring(job_desc_lower, must_haves, skills_in_job_desc):
+    """Vectors and column sets score_skill_batch needs for one job"""
+    weights = skill_weight_vector(skills_in_job_desc)
+    return {
+        # score_candidate credits a found skill's weight to both the weighted
+        # and the max-possible score; other weightings only swap these vectors
+        'skill_weights': weights,
+        'skill_max_weights': weights,
+        # Dictionary must-haves are checked on their columns, others on the text
+        'must_have_columns': [
+            (skill_clean, skill_columns(skill_clean.__eq__) if skill_matcher.covers(skill_clean) else None)
+            for skill_clean in (clean_must_have(skill) for skill in must_haves) if skill_clean
+        ],
+        'react_columns': skill_columns("react".__eq__) if "react" in job_desc_lower else None,
+        'full_stack_columns': skill_columns(lambda skill: "full stack" in skill) if "full stack" in job_desc_lower else None,
+    }
+
+def score_skill_batch(job, presence, cosine, texts):
+    """
+    score_candidate for a batch of resumes, as a few array operations
     
-    if 'zip_file' not in request.files:
-        return jsonify({"error": "No ZIP file uploaded"}), 400
+    Args:
+        job: Job context (see build_job_context)
+        presence: (resumes x skills) matrix from skill_presence_matrix
+        cosine: TF-IDF similarity (0-100) of each resume to the job
+        texts: Resume texts, only searched for must-haves that are not dictionary skills
     
-    zip_file = request.files['zip_file']
-    if zip_file.filename == '':
-        return jsonify({"error": "No selected file"}), 400
+    Returns a (score, missing) pair per resume, equal to score_candidate's.
+    """
+    n = len(presence)
+    weighted = presence @ job['skill_weights']
+    max_possible = presence @ job['skill_max_weights']
+    normalized_skill = np.divide(weighted, max_possible, out=np.zeros(n), where=max_possible > 0) * 50
+    base = cosine * 0.5 + normalized_skill
     
-    if not zip_file.filename.endswith('.zip'):
-        return jsonify({"error": "File must be a ZIP archive"}), 400
+    missing = [[] for _ in range(n)]
+    missing_count = np.zeros(n, dtype=int)
+    for skill_clean, columns in job['must_have_columns']:
+        if columns is not None:
+            absent = ~presence[:, columns].any(axis=1)
+        else:
+            pattern = get_compiled_pattern(skill_clean)
+            absent = np.array([pattern.search(text) is None for text in texts], dtype=bool)
+        for row in np.flatnonzero(absent):
+            missing[row].append(skill_clean)
+        missing_count += absent
+    
+    # STRONG penalty for missing must-haves: each one reduces the score by 80%
+    final = base * 0.2 ** missing_count
+    if job['react_columns'] is not None:
+        final = final + 10 * presence[:, job['react_columns']].any(axis=1)
+    if job['full_stack_columns'] is not None:
+        final = final + 5 * presence[:, job['full_stack_columns']].any(axis=1)
+    final = np.clip(final, 0, 100)
+    
+    return [(round(float(score), 2), row_missing) for score, row_missing in zip(final, missing)]
 
-    # Create Job in DB using context manager
-    with get_db_connection() as conn:
-        c = conn.cursor()
-        c.execute("INSERT INTO jobs (title, description, status, total_files) VALUES (?, ?, ?, ?)",
-                  ("Bulk Screen", job_desc, "Processing", 0))
-        job_id = c.lastrowid
-        conn.commit()
+# --- 2. Chunk Processing (job thread or pool worker process) ---
+# Chunk contexts a pool worker has loaded, most recent last. Concurrent jobs
+# share the pool, so a worker keeps a few instead of reloading on every switch
+_worker_contexts = OrderedDict()
+WORKER_CONTEXT_CACHE = 8
 
-    # Save ZIP
-    job_dir = os.path.join(UPLOAD_FOLDER, str(job_id))
-    os.makedirs(job_dir, exist_ok=True)
+def _load_worker_context(key, path):
+    """The chunk context iter_chunk_results saved at path, read once per worker"""
+    context = _worker_contexts.get(key)
+    if context is None:
+        with open(path, 'rb') as f:
+            context = _worker_contexts[key] = pickle.load(f)
+        while len(_worker_contexts) > WORKER_CONTEXT_CACHE:
+            _worker_contexts.popitem(last=False)
+    _worker_contexts.move_to_end(key)
+    return context
+
+def _run_chunk_in_worker(chunk_fn, chunk, context_key, context_path):
+    # Metrics, raw latencies and text cache activity recorded in this process travel back with the result
+    result = chunk_fn(chunk, _load_worker_context(context_key, context_path))
+    return result, pop_metrics(), pop_text_cache_activity(), pop_samples()
+
+def must_haves_need_text(must_haves):
+    """True if a must-have is not a dictionary skill, so checking it needs the resume text"""
+    return any(not skill_matcher.covers(clean_must_have(skill)) for skill in must_haves)
+
+def must_have_patterns(must_haves):
+    """
+    (must-have, terms, regex) triples accepting a resume exactly when
+    score_candidate would: a dictionary skill by any of its terms and aliases,
+    anything else by the term itself
+    """
+    patterns = []
+    for skill in must_haves:
+        skill_clean = clean_must_have(skill)
+        if not skill_clean:
+            continue
+        terms = skill_matcher.terms_for(skill_clean) if skill_matcher.covers(skill_clean) else [skill_clean]
+        patterns.append((skill_clean, terms, re.compile('|'.join(boundary_pattern(term) for term in terms))))
+    return patterns
+
+def build_job_context(job_desc, must_haves, strict=False, **extra):
+    """
+    Pre-compute job description analysis shared by every chunk of a job
     
-    zip_path = os.path.join(job_dir, "cv_archive.zip")
-    zip_file.save(zip_path)
+    strict: reject resumes missing a must-have before scoring them (see strict_rejections)
+    """
+    job_desc_lower = job_desc.lower()
+    context = {
+        'job_desc': job_desc,
+        'job_desc_lower': job_desc_lower,
+        'job_counts': term_counts(job_desc_lower),
+        'must_haves': must_haves,
+        'must_haves_need_text': must_haves_need_text(must_haves),
+        'skills_in_job_desc': skill_matcher.find_set(job_desc_lower),
+        'strict_patterns': must_have_patterns(must_haves) if strict else [],
+    }
+    context.update(build_skill_scoring(job_desc_lower, must_haves, context['skills_in_job_desc']))
+    context.update(extra)
+    return context
+
+def dedup_index_limit():
+    """Representatives a streaming job's dedup index may hold: a quarter of the budget at ~2KB each"""
+    return SMARTHIRE_MEMORY_BUDGET_MB * 1024 * 1024 // 4 // 2048
+
+def dedup_index(streaming=False):
+    """
+    Duplicate index of one job run (None if dedup is disabled), see link_duplicates
     
-    # Extract and find CVs
-    extract_dir = os.path.join(job_dir, "extracted")
-    cv_files = extract_and_find_cvs(zip_path, extract_dir)
+    A streaming job's index stops growing at its share of SMARTHIRE_MEMORY_BUDGET_MB.
+    """
+    if not DEDUP_ENABLED:
+        return None
+    return DedupIndex(max_size=dedup_index_limit() if streaming else None)
+
+def restore_dedup_index(conn, dedup, job_id, version):
+    """
+    Index the representatives an interrupted run already stored for a job, in
+    archive order, so copies in the chunks still to score link to them as they
+    would have without the interruption
+    """
+    if dedup is None:
+        return
+    rows = conn.execute("""SELECT cand.content_hash, tp.fingerprint 
+                           FROM candidates cand JOIN talent_pool tp ON tp.content_hash = cand.content_hash 
+                           WHERE cand.job_id=? AND cand.version=? AND cand.duplicate_of IS NULL 
+                                 AND tp.fingerprint IS NOT NULL 
+                           ORDER BY cand.id""", (job_id, version))
+    for content_hash, print_bytes in rows:
+        dedup.check_fingerprint(content_hash, print_bytes)
+
+def link_duplicates(job_results, fingerprints, dedup):
+    """
+    Take the resumes repeating one seen earlier in the job out of a chunk's results
     
-    if not cv_files:
-        return jsonify({"error": "No CV files found in ZIP"}), 400
+    Runs in the job thread on each chunk in order, whether it was scored there
+    or by a pool worker, so every copy is linked to the first one in the
+    archive and pool and thread mode give the same results. Workers only
+    compute the fingerprints, the costly part. Returns (job_results,
+    duplicates), duplicates being (filename, content_hash, representative
+    content_hash) triples.
     
-    print(f"Found {len(cv_files)} CV files in ZIP archive")
+    Resumes without a fingerprint (every job rejected them, so they score 0
+    anyway) are kept and not indexed.
+    """
+    if dedup is None:
+        return job_results, []
+    keep, duplicates = [], []
+    for (filename, content_hash, *_), print_bytes in zip(job_results[0], fingerprints):
+        match = dedup.check_fingerprint(content_hash, print_bytes) if print_bytes is not None else None
+        keep.append(match is None)
+        if match:
+            duplicates.append((filename, content_hash, match[0]))
+            inc('duplicates_total', kind=match[1])
+    return [list(itertools.compress(results, keep)) for results in job_results], duplicates
+
+def fully_scored(context):
+    """True if every job of a chunk context holds its TF-IDF weights, so scores include similarity"""
+    return all(job.get('weights') is not None for job in context['jobs'])
+
+def build_chunk_context(job_contexts, streaming=False, cascade=False, **extra):
+    """
+    Context for chunk functions: the jobs scored together and how
     
-    # Start processing
-    t = threading.Thread(target=process_job_thread, args=(job_id, job_desc, cv_files, must_haves))
-    t.daemon = True  # Allow thread to exit when main exits
-    t.start()
+    Scores are provisional, with a similarity of 0, unless every job context
+    holds its job-wide TF-IDF 'weights' (see refine_scores).
+    streaming: hash term counts (see stream_cv_chunks)
+    cascade: phase 1 of a cascade; skip term counting too, since only the
+    cascade's best candidates are fully scored
+    """
+    context = {
+        'jobs': job_contexts,
+        # Fingerprint resumes for link_duplicates
+        'dedup': DEDUP_ENABLED,
+        'hashed': streaming,
+        'cascade': cascade,
+    }
+    context.update(extra)
+    return context
 
-    return jsonify({
-        "message": "Started processing ZIP file", 
-        "job_id": job_id,
-        "total_cvs_found": len(cv_files)
-    })
+def pool_entry(filename, content_hash, text=None, found_skills=None, counts=None, print_bytes=None):
+    """Talent pool row (see add_to_talent_pool) for the features known so far"""
+    return (
+        content_hash, filename,
+        zlib.compress(text.encode('utf-8')) if text is not None else None,
+        json.dumps(found_skills) if found_skills is not None else None,
+        zlib.compress(json.dumps(counts).encode('utf-8')) if counts is not None else None,
+        print_bytes
+    )
 
-@app.route('/debug/job/<job_id>', methods=['GET'])
-def debug_job(job_id):
-    """Debug endpoint to see ALL candidates"""
-    with get_db_connection() as conn:
-        conn.row_factory = sqlite3.Row
-        c = conn.cursor()
+def strict_rejections(jobs, text, found_skills=None):
+    """
+    Per job, the must-haves a resume lacks if the job is strict and rejects
+    it, else None (score it normally)
+    
+    The verdict is the one score_candidate would reach, but it is taken before
+    scoring: from found_skills when known (talent pool), otherwise by
+    searching the raw text for each must-have's terms, which costs far less
+    than the full skill scan and TF-IDF.
+    """
+    rejections = []
+    found_lower = {s.lower() for s in found_skills} if found_skills is not None else None
+    for job in jobs:
+        if not job['strict_patterns']:
+            rejections.append(None)
+            continue
+        start = time.perf_counter()
+        missing = []
+        for skill_clean, terms, pattern in job['strict_patterns']:
+            if found_lower is not None and skill_matcher.covers(skill_clean):
+                present = skill_clean in found_lower
+            else:
+                # A substring test rules most resumes out far faster than the boundary regex
+                present = any(term in text for term in terms) and pattern.search(text) is not None
+            if not present:
+                missing.append(skill_clean)
+        observe('must_have_seconds', time.perf_counter() - start)
+        rejections.append(missing or None)
+    return rejections
+
+def text_features(chunk_texts, context):
+    """
+    Compute the features scoring uses for extracted resumes
+    
+    Args:
+        chunk_texts: List of (filename, content_hash, text)
+        context: Chunk context from build_chunk_context
+    
+    Returns (features, pool_entries, fingerprints): features is a list of
+    (filename, content_hash, text, found_skills, term_counts, rejections)
+    (see strict_rejections; found_skills and term_counts are None when every
+    job rejected the resume, term_counts also in phase 1 of a cascade);
+    pool_entries stores every resume in the talent pool (rejected resumes
+    without scoring features); fingerprints holds each resume's fingerprint()
+    for link_duplicates (None if dedup is disabled or every job rejected it).
+    """
+    features, pool_entries, fingerprints = [], [], []
+    tokenize_seconds = dedup_seconds = 0.0
+    for filename, content_hash, text in chunk_texts:
+        rejections = strict_rejections(context['jobs'], text)
+        if all(rejections):
+            # Rejected by every job: skip the fingerprint, skill scan and term counting
+            inc('must_have_short_circuits_total')
+            features.append((filename, content_hash, text, None, None, rejections))
+            pool_entries.append(pool_entry(filename, content_hash, text))
+            fingerprints.append(None)
+            continue
         
-        # Get job info
-        c.execute("SELECT * FROM jobs WHERE id=?", (job_id,))
-        job = c.fetchone()
-        job_dict = dict(job) if job else {}
+        print_bytes = None
+        if context.get('dedup'):
+            start = time.perf_counter()
+            print_bytes = fingerprint(text)
+            dedup_seconds += time.perf_counter() - start
+        fingerprints.append(print_bytes)
         
-        # Get ALL candidates
-        c.execute("SELECT * FROM candidates WHERE job_id=? ORDER BY score DESC", (job_id,))
-        candidates = [dict(row) for row in c.fetchall()]
+        # Skill hits depend only on the resume, so they are found once for all jobs
+        start = time.perf_counter()
+        found = skill_matcher.find(text)
+        observe('skill_match_seconds', time.perf_counter() - start)
+        counts = None
+        if not context.get('cascade'):
+            start = time.perf_counter()
+            counts = term_counts(text)
+            tokenize_seconds += time.perf_counter() - start
+        
+        features.append((filename, content_hash, text, found, counts, rejections))
+        pool_entries.append(pool_entry(filename, content_hash, text, found, counts, print_bytes))
+    if features:
+        observe('tokenize_seconds', tokenize_seconds)
+        if context.get('dedup'):
+            observe('dedup_seconds', dedup_seconds)
+    return features, pool_entries, fingerprints
+
+def score_feature_chunk(features, context):
+    """
+    Score featurized resumes (see text_features) against every job in the context
     
-    return jsonify({
-        "job": job_dict,
-        "total_candidates": len(candidates),
-        "candidates": candidates[:50],  # First 50
-        "top_5": candidates[:5]
-    })
+    Returns, per job, a list of (filename, content_hash, score, missing,
+    found_skills). Resumes a strict job rejected get a score of 0 and
+    found_skills None (they were not scanned). Without job-wide weights
+    (phase 1, see refine_scores) the similarity term is 0, so each score is
+    a provisional lower bound of the full one.
+    """
+    jobs = context['jobs']
+    # Resumes some job scores (the rest were rejected by every job)
+    scored = [feature for feature in features if feature[3] is not None]
+    cosine_matrix = np.zeros((len(scored), len(jobs)))
+    if fully_scored(context):
+        with timed('tfidf_seconds'):
+            counts = [feature[4] for feature in scored]
+            for index, job in enumerate(jobs):
+                cosine_matrix[:, index] = job['weights'].cosine(counts)[:, 0]
+    
+    job_results = []
+    with timed('skill_score_seconds'):
+        presence = skill_presence_matrix([feature[3] for feature in scored])
+        for index, job in enumerate(jobs):
+            # Rows this job scores; a strict job skips the ones it rejected
+            rows = np.array([row for row, feature in enumerate(scored) if not feature[5][index]], dtype=np.intp)
+            scores = iter(score_skill_batch(job, presence[rows], cosine_matrix[rows, index],
+                                            [scored[row][2] for row in rows]))
+            results = []
+            for filename, content_hash, _, found, _, rejections in features:
+                if rejections[index]:
+                    results.append((filename, content_hash, 0.0, rejections[index], None))
+                else:
+                    score, missing = next(scores)
+                    results.append((filename, content_hash, score, missing, found))
+            job_results.append(results)
+    return job_results
 
-@app.route('/shortlist/<job_id>', methods=['GET'])
-def get_shortlist(job_id):
-    with get_db_connection() as conn:
-        conn.row_factory = sqlite3.Row
-        c = conn.cursor()
-        
-        c.execute("SELECT status, processed_files, total_files FROM jobs WHERE id=?", (job_id,))
-        job = c.fetchone()
-        # Get top 5 with score > 0
-        c.execute("SELECT * FROM candidates WHERE job_id=? AND score > 0 ORDER BY score DESC LIMIT 5", (job_id,))
-        candidates = [dict(row) for row in c.fetchall()]
+def score_text_chunk(chunk_texts, context):
+    """
+    Score one chunk of extracted resumes against every job in the context
+    
+    Args:
+        chunk_texts: List of (filename, content_hash, text)
+        context: Chunk context from build_chunk_context
+    
+    Returns (job_results, fingerprints) as described in score_feature_chunk and
+    text_features.
+    """
+    features, _, fingerprints = text_features(chunk_texts, context)
+    return score_feature_chunk(features, context), fingerprints
 
-    return jsonify({
-        "status": job['status'] if job else 'Unknown',
-        "progress": f"{job['processed_files']}/{job['total_files']}" if job else "0/0",
-        "top_5": candidates
-    })
+def process_cv_chunk(members, context):
+    """
+    Extract and score one chunk of CVs read straight from the job's ZIP archive
+    
+    Args:
+        members: ZIP member names in this chunk
+        context: Job context with zip_path
+    
+    Returns (job_results, pool_entries, fingerprints): score_feature_chunk
+    results for the usable files, the talent pool rows to store for them
+    and their fingerprints (see text_features).
+    """
+    files = []
+    zip_ref = open_archive(context['zip_path'])
+    for member in members:
+        try:
+            # zipfile stops at the declared size and checks the CRC
+            with timed('zip_read_seconds'):
+                files.append((os.path.basename(member), zip_ref.read(member)))
+        except Exception as e:
+            print(f"Error processing {member}: {e}")
+            inc('file_errors_total', type=file_type_of(member), stage='zip')
+    
+    chunk_texts = []
+    for (filename, _), (content_hash, text) in zip(files, extract_texts_cached(files)):
+        if text and len(text) > 50:
+            chunk_texts.append((filename, content_hash, text))
+        else:
+            inc('files_skipped_total', type=file_type_of(filename))
+    
+    # Features and compression happen here so the work is spread across pool workers
+    features, pool_entries, fingerprints = text_features(chunk_texts, context)
+    return score_feature_chunk(features, context), pool_entries, fingerprints
 
-@app.route('/job-status/<job_id>', methods=['GET'])
-def get_job_status(job_id):
-    with get_db_connection() as conn:
-        conn.row_factory = sqlite3.Row
-        c = conn.cursor()
-        
-        c.execute("SELECT status, processed_files, total_files FROM jobs WHERE id=?", (job_id,))
-        job = c.fetchone()
+# SELECT list of talent pool rows for score_pool_chunk (tp = talent_pool). The
+# compressed text is only read when a must-have needs it or features are missing.
+POOL_FEATURE_COLUMNS = """CASE WHEN :needs_text OR tp.skills IS NULL OR tp.terms IS NULL 
+                                    OR (:dedup AND tp.fingerprint IS NULL) THEN tp.text END, 
+                               tp.skills, tp.terms, tp.fingerprint"""
+
+def pool_feature_params(context):
+    """Named parameters POOL_FEATURE_COLUMNS needs for a chunk context"""
+    return {
+        'needs_text': any(job['must_haves_need_text'] for job in context['jobs']),
+        'dedup': bool(context.get('dedup'))
+    }
+
+def score_pool_chunk(rows, context):
+    """
+    Score CVs from the talent pool using their stored features
     
-    if job:
-        return jsonify({
-            "status": job['status'],
-            "processed": job['processed_files'],
+    rows are (filename, content_hash, text, skills, terms, fingerprint) as
+    selected with POOL_FEATURE_COLUMNS. Features missing from the pool are
+    computed from the text (term counts only when the context has TF-IDF
+    weights). Returns (job_results, pool_entries, fingerprints) like
+    process_cv_chunk, where pool_entries hold the computed features to store back.
+    """
+    weighted = fully_scored(context)
+    features, pool_entries, fingerprints = [], [], []
+    dedup_seconds = 0.0
+    for filename, content_hash, packed_text, skills, terms, print_bytes in rows:
+        text = zlib.decompress(packed_text).decode('utf-8') if packed_text is not None else None
+        backfill = {}
+        
+        found = json.loads(skills) if skills is not None else None
+        rejections = strict_rejections(context['jobs'], text, found)
+        if all(rejections):
+            # Rejected by every job: stored term counts are not even decompressed
+            inc('must_have_short_circuits_total')
+            features.append((filename, content_hash, text, None, None, rejections))
+            fingerprints.append(None)
+            continue
+        
+        if context.get('dedup') and print_bytes is None:
+            start = time.perf_counter()
+            print_bytes = backfill['print_bytes'] = fingerprint(text)
+            dedup_seconds += time.perf_counter() - start
+        fingerprints.append(print_bytes if context.get('dedup') else None)
+        
+        if found is None:
+            start = time.perf_counter()
+            found = backfill['found_skills'] = skill_matcher.find(text)
+            observe('skill_match_seconds', time.perf_counter() - start)
+        counts = None
+        if weighted and terms is not None:
+            counts = json.loads(zlib.decompress(terms))
+        elif weighted:
+            counts = backfill['counts'] = term_counts(text)
+        
+        features.append((filename, content_hash, text, found, counts, rejections))
+        if backfill:
+            pool_entries.append(pool_entry(filename, content_hash, **backfill))
+    if dedup_seconds:
+        observe('dedup_seconds', dedup_seconds)
+    return score_feature_chunk(features, context), pool_entries, fingerprints
+
+def score_candidate_chunk(rows, context):
+    """score_pool_chunk for candidates' rows: (candidate id, *score_pool_chunk row)"""
+    return score_pool_chunk([row[1:] for row in rows], context)
+
+def candidate_document_frequencies(rows, context):
+    """document_frequencies of candidates' rows (see score_candidate_chunk), counting terms missing from the pool"""
+    with timed('tfidf_seconds'):
+        counts = [json.loads(zlib.decompress(terms)) if terms is not None
+                  else term_counts(zlib.decompress(packed_text).decode('utf-8'))
+                  for _, _, _, packed_text, _, terms, _ in rows]
+        return document_frequencies(counts, context['hashed'])
+
+def _pool_mp_context():
+    # Jobs run in threads, and forking a threaded process can deadlock the child
+    # on locks held by other threads; forkserver/spawn start from a clean process
+    if 'forkserver' not in multiprocessing.get_all_start_methods():
+        return multiprocessing.get_context('spawn')
+    context = multiprocessing.get_context('forkserver')
+    # Import this module once in the fork server so workers fork with it loaded
+    context.set_forkserver_preload([__name__])
+    return context
+
+# Pool of SMARTHIRE_WORKERS processes shared by every job, started on first use
+_chunk_executor = None
+_chunk_executor_lock = threading.Lock()
+
+def chunk_executor():
+    global _chunk_executor
+    with _chunk_executor_lock:
+        if _chunk_executor is None:
+            _chunk_executor = ProcessPoolExecutor(max_workers=SMARTHIRE_WORKERS, mp_context=_pool_mp_context())
+        return _chunk_executor
+
+def _discard_chunk_executor(executor):
+    """Drop a pool whose worker died, so the next job starts a fresh one"""
+    global _chunk_executor
+    with _chunk_executor_lock:
+        if _chunk_executor is executor:
+            _chunk_executor = None
+    executor.shutdown(wait=False, cancel_futures=True)
+
+def iter_chunk_results(chunk_fn, chunks, context):
+    """
+    Yield (chunk, chunk_fn(chunk, context)) in chunk order, fanning out to a process pool if configured
+    
+    The pool lives as long as the process. The context is pickled to a
+    temporary file once per call, and each worker loads it on its first
+    task instead of receiving it with every chunk. chunks may be a lazy
+    iterable: at most two chunks per pool worker are submitted ahead of the
+    caller, so results never pile up in memory while the caller writes earlier ones.
+    """
+    if SMARTHIRE_WORKERS > 1 and not (isinstance(chunks, list) and len(chunks) <= 1):
+        executor = chunk_executor()
+        with tempfile.NamedTemporaryFile('wb', prefix='smarthire-context-', suffix='.pkl', delete=False) as f:
+            pickle.dump(context, f, protocol=pickle.HIGHEST_PROTOCOL)
+        context_key = os.path.basename(f.name)
+        pending = deque()
+        
+        def next_result():
+            chunk, future = pending.popleft()
+            result, worker_metrics, worker_cache_activity, worker_samples = future.result()
+            merge_metrics(worker_metrics)
+            merge_text_cache_activity(worker_cache_activity)
+            merge_samples(worker_samples)
+            return chunk, result
+        
+        try:
+            for chunk in chunks:
+                pending.append((chunk, executor.submit(_run_chunk_in_worker, chunk_fn, chunk, context_key, f.name)))
+                if len(pending) >= 2 * SMARTHIRE_WORKERS:
+                    yield next_result()
+            while pending:
+                yield next_result()
+        except BrokenProcessPool:
+            _discard_chunk_executor(executor)
+            raise
+        finally:
+            # A caller that stops early leaves nothing queued behind it
+            for _, future in pending:
+                future.cancel()
+            for _, future in pending:
+                if not future.cancelled():
+                    future.exception()
+            os.unlink(f.name)
+    else:
+        for chunk in chunks:
+            yield chunk, chunk_fn(chunk, context)
+
+# --- 3. The Background Worker ---
+def progress_percentage(processed, total):
+    return round((processed / total) * 100, 1) if total > 0 else 0
+
+def top_candidates(conn, job_id, version, limit=5):
+    """Highest-scoring candidates (score > 0) of one result version, duplicates excluded"""
+    c = conn.cursor()
+    c.row_factory = sqlite3.Row
+    c.execute("""SELECT * FROM candidates WHERE job_id=? AND version=? AND score > 0 AND duplicate_of IS NULL
+                 ORDER BY score DESC, id DESC LIMIT ?""", (job_id, version, limit))
+    return [dict(row) for row in c.fetchall()]
+
+def job_snapshot(conn, job_id):
+    """Status, progress and current shortlist of a job, as sent in job events"""
+    job = conn.execute("""SELECT status, processed_files, total_files, result_version, short_circuited, 
+                                 cascade_top, cascade_refined, phase, error FROM jobs WHERE id=?""", (job_id,)).fetchone()
+    if not job:
+        return None
+    status, processed, total, version, short_circuited, cascade_top, cascade_refined, phase, error = job
+    snapshot = {
+        "status": status,
+        "processed": processed,
+        "total": total,
+        "percentage": progress_percentage(processed, total),
+        "short_circuited": short_circuited or 0,
+        "version": version,
+        "top_5": top_candidates(conn, job_id, version)
+    }
+    snapshot.update(job_stage(status, phase, error))
+    if cascade_top is not None:
+        snapshot["cascade"] = cascade_status(cascade_top, cascade_refined)
+    return snapshot
+
+def job_stage(status, phase, error):
+    """Fields reported with a job's status: its phase while processing, and why it failed"""
+    stage = {}
+    if status == 'Processing' and phase:
+        stage["phase"] = phase
+    if status == 'Failed' and error:
+        stage["error"] = error
+    return stage
+
+def cascade_status(cascade_top, cascade_refined):
+    """Cascade progress reported with a job: candidates to fully score, and how many are done"""
+    return {"top": cascade_top, "refined": cascade_refined or 0}
+
+class JobEventSignal:
+    """
+    Newest event of one job streamed in this process, shared by all its streams
+    
+    The process's event poller (see _poll_job_events) is the only reader of
+    the job's events; streams wait here for it to publish a newer one.
+    """
+    
+    def __init__(self):
+        self.cond = threading.Condition()
+        self.latest = None  # (id, event, data)
+        self.streams = 0
+        # The poller queries the job on its next pass whatever data_version says
+        self.stale = True
+    
+    def publish(self, latest):
+        with self.cond:
+            self.latest = latest
+            self.cond.notify_all()
+    
+    def wait_newer(self, after_id, timeout):
+        """The newest event after `after_id`, waiting up to timeout for one; None if there is none yet"""
+        with self.cond:
+            self.cond.wait_for(lambda: self.latest is not None and self.latest[0] > after_id, timeout)
+            latest = self.latest
+        return latest if latest is not None and latest[0] > after_id else None
+
+# Signals of the jobs streamed in this process, while they have a stream
+_job_event_signals = {}
+_job_event_signals_lock = threading.Lock()
+# Set to run a poller pass right away instead of at the next SSE_POLL_INTERVAL
+_job_events_wake = threading.Event()
+_job_events_poller = None
+# Jobs whose events this thread recorded since it last notified
+_job_events_local = threading.local()
+
+def _poll_job_events():
+    """
+    Publish the new events of the jobs streamed in this process to their signals
+    
+    One query per watched job and pass, however many streams it has. A pass
+    runs when this process commits events (notify_job_events) and otherwise
+    every SSE_POLL_INTERVAL seconds, when it only queries if PRAGMA
+    data_version shows another process (e.g. a queue worker) has committed.
+    """
+    data_version = None
+    with get_db_connection() as conn:
+        while True:
+            _job_events_wake.wait(SSE_POLL_INTERVAL)
+            _job_events_wake.clear()
+            with _job_event_signals_lock:
+                signals = list(_job_event_signals.items())
+            if not signals:
+                continue
+            try:
+                version = conn.execute("PRAGMA data_version").fetchone()[0]
+                changed, data_version = version != data_version, version
+                for job_id, signal in signals:
+                    if not (changed or signal.stale):
+                        continue
+                    signal.stale = False
+                    newest = get_latest_job_event(conn, job_id, signal.latest[0] if signal.latest else 0)
+                    if newest:
+                        signal.publish(newest)
+            except sqlite3.Error as e:
+                print(f"Polling job events failed: {e}")
+
+@contextmanager
+def watch_job_events(job_id):
+    """The JobEventSignal of a job, kept while the caller streams its events"""
+    global _job_events_poller
+    with _job_event_signals_lock:
+        signal = _job_event_signals.get(job_id)
+        if signal is None:
+            signal = _job_event_signals[job_id] = JobEventSignal()
+            if _job_events_poller is None or not _job_events_poller.is_alive():
+                _job_events_poller = threading.Thread(target=_poll_job_events, name='job-events-poller', daemon=True)
+                _job_events_poller.start()
+            _job_events_wake.set()
+        signal.streams += 1
+    try:
+        yield signal
+    finally:
+        with _job_event_signals_lock:
+            signal.streams -= 1
+            if not signal.streams:
+                del _job_event_signals[job_id]
+
+def publish_job_event(conn, job_id, event, data):
+    """add_job_event, noting the job so notify_job_events wakes its streams after the commit"""
+    pending = getattr(_job_events_local, 'job_ids', None)
+    if pending is None:
+        pending = _job_events_local.job_ids = set()
+    pending.add(job_id)
+    return add_job_event(conn, job_id, event, data)
+
+def notify_job_events():
+    """Have the poller fetch the events this thread published for watched jobs; call after committing them"""
+    job_ids = getattr(_job_events_local, 'job_ids', None)
+    if not job_ids:
+        return
+    _job_events_local.job_ids = set()
+    with _job_event_signals_lock:
+        signals = [_job_event_signals[job_id] for job_id in job_ids if job_id in _job_event_signals]
+    for signal in signals:
+        signal.stale = True
+    if signals:
+        _job_events_wake.set()
+
+# Chunk results, progress and job completion are written by this process's one
+# writer thread, so concurrent jobs share commits instead of contending for the lock
+db_writer = DatabaseWriter(on_commit=notify_job_events)
+
+def finish_job_events(conn, job_id, event='complete'):
+    """Publish the final snapshot of a run and drop its intermediate events (caller commits)"""
+    event_id = publish_job_event(conn, job_id, event, job_snapshot(conn, job_id))
+    prune_job_events(conn, job_id, event_id)
+
+class JobProgress:
+    """Running top-5 and throughput of one job run, published as progress events"""
+    
+    def __init__(self, conn, job_id, version, processed, total, phase=None):
+        self.job_id = job_id
+        self.version = version
+        self.total = total
+        # Stage of an upload's processing (see jobs.phase); while a cascade is
+        # Refining, processed/total count its top candidates
+        self.phase = phase
+        self.started_at = time.time()
+        self.started_from = processed
+        # A resumed run starts from the candidates it already stored
+        self.top = top_candidates(conn, job_id, version)
+    
+    def add(self, results):
+        rows = [{
+            "job_id": self.job_id, "filename": filename, "score": score,
+            "missing_skills": json.dumps(missing), "found_skills": json.dumps(found_skills),
+            "version": self.version
+        } for filename, _, score, missing, found_skills in results if score > 0]
+        self.top = heapq.nlargest(5, self.top + rows, key=lambda row: row['score'])
+    
+    def publish(self, conn, processed):
+        """Record a progress event (committed with the caller's chunk commit)"""
+        elapsed = time.time() - self.started_at
+        # Counted by store_chunk_results in the same transaction
+        short_circuited, = conn.execute("SELECT short_circuited FROM jobs WHERE id=?", (self.job_id,)).fetchone()
+        data = {
+            "status": "Processing",
+            "processed": processed,
+            "total": self.total,
+            "percentage": progress_percentage(processed, self.total),
+            "throughput": round((processed - self.started_from) / elapsed, 1) if elapsed > 0 else 0,
+            "short_circuited": short_circuited or 0,
+            "version": self.version,
+            "top_5": self.top
+        }
+        if self.phase:
+            data["phase"] = self.phase
+        publish_job_event(conn, self.job_id, 'progress', data)
+
+def store_chunk_results(c, job_id, version, results, pool_entries, scores_log, duplicates=(), provisional=False):
+    """
+    Insert one chunk of scored candidates (and their talent pool rows)
+    
+    Returns how many scored above 0. Rejections of a strict job (found_skills
+    None) are counted in jobs.short_circuited. provisional marks the scores
+    of phase 1 (see refine_scores); rejections are final and stored with
+    provisional NULL.
+    """
+    candidate_batch = []
+    candidates_added = 0
+    for filename, content_hash, score, missing, found_skills in results:
+        # Log first 10 files with skill details
+        if len(scores_log) < 10:
+            skill_preview = found_skills[:3] if found_skills else []
+            print(f"[{len(scores_log)+1}] {filename[:30]:30} Score: {score:5.1f} Skills: {skill_preview}")
+            scores_log.append((filename, score, skill_preview))
+        
+        candidate_batch.append((
+            job_id, filename, score, 
+            json.dumps(missing), False, 
+            json.dumps(found_skills or []), content_hash, version,
+            int(provisional) if found_skills is not None else None
+        ))
+        
+        if score > 0:
+            candidates_added += 1
+    
+    if pool_entries:
+        add_to_talent_pool(c, pool_entries)
+    short_circuited = sum(1 for *_, found_skills in results if found_skills is None)
+    if short_circuited:
+        c.execute("UPDATE jobs SET short_circuited = short_circuited + ? WHERE id=?", (short_circuited, job_id))
+    if candidate_batch:
+        c.executemany(
+            """INSERT INTO candidates 
+               (job_id, filename, score, missing_skills, is_shortlisted, found_skills, content_hash, version, provisional) 
+               VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)""",
+            candidate_batch
+        )
+    if duplicates:
+        # Linked to the representative (inserted above or in an earlier chunk) and
+        # sharing its score, so it only counts once in shortlists
+        c.executemany(
+            """INSERT INTO candidates 
+               (job_id, filename, score, missing_skills, is_shortlisted, found_skills, content_hash, version, duplicate_of, 
+                provisional) 
+               SELECT job_id, ?, score, missing_skills, is_shortlisted, found_skills, ?, version, id, provisional 
+               FROM candidates WHERE job_id=? AND version=? AND content_hash=? AND duplicate_of IS NULL LIMIT 1""",
+            [(filename, content_hash, job_id, version, rep_hash) for filename, content_hash, rep_hash in duplicates]
+        )
+    return candidates_added
+
+def write_job_chunk(conn, job_ids, progresses, processed, job_results, pool_entries, duplicates, series, scores_log,
+                    provisional=False):
+    """
+    Database writer task for one scored chunk of one or more jobs
+    
+    Candidates, talent pool rows, the processed_files checkpoint, progress
+    events and metrics land in the same transaction, so a resumed job never
+    stores a chunk twice. Returns how many candidates each job added.
+    """
+    c = conn.cursor()
+    # Talent pool rows are shared, so they are stored with the first job only
+    added = [store_chunk_results(c, job_id, progress.version, results, pool_entries if index == 0 else None,
+                                 scores_log, duplicates, provisional)
+             for index, (job_id, progress, results) in enumerate(zip(job_ids, progresses, job_results))]
+    c.execute(f"UPDATE jobs SET processed_files=? WHERE id IN ({','.join('?' * len(job_ids))})",
+              [processed] + list(job_ids))
+    for progress in progresses:
+        progress.publish(conn, processed)
+    # Work shared by the jobs is recorded under the first one
+    record_job_metrics(conn, job_ids[0], series)
+    return added
+
+def write_chunks(job_ids, progresses, chunk_results, scores_log, task=write_job_chunk, **task_args):
+    """
+    Hand (processed_count, job_results, pool_entries, duplicates) chunks to the database writer
+    
+    task (write_job_chunk, or write_refined_chunk for phase 2) is
+    called with each chunk and task_args, plus the arguments of a chunk's
+    optional fifth element (a dict) for that chunk only. The text cache
+    activity of the chunk is written in the same transaction. One chunk is in flight at a time:
+    the next is scored while the writer commits the previous one, and
+    progress.add() never races its publish(). Returns the candidates added per job.
+    """
+    candidates_added = dict.fromkeys(job_ids, 0)
+    
+    def write(conn, text_cache_activity, **args):
+        record_text_cache_activity(conn, text_cache_activity)
+        return task(conn, **args)
+    
+    def collect(future):
+        added, seconds = future.result()
+        observe('db_write_seconds', seconds)
+        for job_id, count in zip(job_ids, added):
+            candidates_added[job_id] += count
+    
+    pending = None
+    try:
+        for processed, job_results, pool_entries, duplicates, *chunk_args in chunk_results:
+            if pending is not None:
+                collect(pending)
+                pending = None
+            for progress, results in zip(progresses, job_results):
+                progress.add(results)
+            pending = db_writer.submit(functools.partial(
+                write, text_cache_activity=pop_text_cache_activity(), job_ids=job_ids, progresses=progresses, processed=processed,
+                job_results=job_results, pool_entries=pool_entries, duplicates=duplicates,
+                series=pop_metrics(), scores_log=scores_log, **task_args, **dict(*chunk_args)))
+        if pending is not None:
+            collect(pending)
+            pending = None
+    finally:
+        # Let an in-flight chunk land before the job's outcome is recorded
+        if pending is not None:
+            pending.exception()
+    return candidates_added
+
+# --- Cascade ranking ---
+def parse_cascade_top(value):
+    """Validate a cascade size: a count ("500") or a share of the archive ("10%"); raises ValueError"""
+    value = str(value).strip()
+    if value.endswith('%'):
+        percent = float(value[:-1])
+        if not 0 < percent <= 100:
+            raise ValueError("cascade_top percentage must be between 0 and 100")
+    elif int(value) < 1:
+        raise ValueError("cascade_top must be at least 1")
+    return value
+
+def cascade_limit(spec, total_files):
+    """Number of candidates a cascade fully scores out of total_files"""
+    if spec.endswith('%'):
+        return min(total_files, math.ceil(total_files * float(spec[:-1]) / 100))
+    return min(total_files, int(spec))
+
+def write_refined_chunk(conn, job_ids, progresses, processed, job_results, pool_entries, duplicates, series,
+                        scores_log, candidate_ids):
+    """
+    Database writer task for one chunk of phase 2 (see write_chunks and refine_scores)
+    
+    Full scores replace the provisional ones of the candidates (candidate_ids,
+    in the order of the results) and of their duplicates, together with the
+    job's refined count and a progress event.
+    """
+    (job_id,), (progress,), (results,) = job_ids, progresses, job_results
+    if pool_entries:
+        add_to_talent_pool(conn, pool_entries)
+    updates = [(score, json.dumps(missing), json.dumps(found_skills or []), candidate_id)
+               for (_, _, score, missing, found_skills), candidate_id in zip(results, candidate_ids)]
+    conn.executemany("UPDATE candidates SET score=?, missing_skills=?, found_skills=?, provisional=0 WHERE id=?",
+                     updates)
+    conn.executemany("UPDATE candidates SET score=?, missing_skills=?, found_skills=?, provisional=0 WHERE duplicate_of=?",
+                     updates)
+    conn.execute("UPDATE jobs SET cascade_refined=? WHERE id=?", (processed, job_id))
+    # Refined candidates replace their provisional entries in the running top 5
+    progress.top = top_candidates(conn, job_id, progress.version)
+    progress.publish(conn, processed)
+    record_job_metrics(conn, job_id, series)
+    return [sum(1 for result in results if result[2] > 0)]
+
+def candidate_feature_chunks(conn, job_id, version, condition, params):
+    """
+    Rows for score_candidate_chunk of a result version's representative
+    candidates matching condition, in id order and chunks of TFIDF_CHUNK_SIZE
+    
+    Keyset-paginated, so the rows are never all in memory and candidates the
+    writer updates meanwhile are neither skipped nor repeated.
+    """
+    after = 0
+    while True:
+        rows = conn.execute(f"""SELECT cand.id, cand.filename, cand.content_hash, {POOL_FEATURE_COLUMNS}
+                                FROM candidates cand JOIN talent_pool tp ON tp.content_hash = cand.content_hash
+                                WHERE cand.job_id=:job_id AND cand.version=:version AND cand.duplicate_of IS NULL 
+                                      AND {condition} AND cand.id > :after
+                                ORDER BY cand.id LIMIT :limit""",
+                            dict(params, job_id=job_id, version=version, after=after, limit=TFIDF_CHUNK_SIZE)).fetchall()
+        if not rows:
+            return
+        after = rows[-1][0]
+        yield rows
+
+def refine_scores(conn, job_id, version, job, limit=None, hashed=False):
+    """
+    Phase 2 of a screening: fully score a job's provisional candidates with one job-wide IDF
+    
+    Phase 1 stores every candidate with a provisional score (similarity 0).
+    Document frequencies are then counted over the term counts of all the
+    candidates phase 2 scores (plus those an interrupted run already refined)
+    and the job description, and the candidates are scored chunk by chunk
+    with that one fit, so a resume scores the same whichever chunk it lands in.
+    Strict rejections (provisional NULL) are final and left out.
+    
+    limit: cascade size. Only the `limit` best provisional candidates are
+    refined, ranked by provisional score, ties broken by the weight of the
+    job's skills they have; their term counts are computed now and stored
+    back. Since the similarity term only adds to a score, refined candidates
+    rank above every candidate left provisional.
+    hashed: hash term counts (streaming jobs, see TermWeights)
+    
+    Resumable: jobs.cascade_refined counts the candidates already refined.
+    """
+    refined = conn.execute("SELECT COALESCE(cascade_refined, 0) FROM jobs WHERE id=?", (job_id,)).fetchone()[0]
+    # Candidates were deduplicated in phase 1
+    context = build_chunk_context([job], streaming=hashed)
+    context['dedup'] = False
+    params = pool_feature_params(context)
+    # Counting terms needs the text only where the pool has no term counts
+    count_params = dict(params, needs_text=False)
+    
+    if limit is None:
+        pending = conn.execute("""SELECT COUNT(*) FROM candidates 
+                                  WHERE job_id=? AND version=? AND provisional=1 AND duplicate_of IS NULL""",
+                               (job_id, version)).fetchone()[0]
+        total = refined + pending
+        
+        def feature_chunks(params):
+            return candidate_feature_chunks(conn, job_id, version, "cand.provisional = 1", params)
+        
+        frequency_chunks = candidate_feature_chunks(conn, job_id, version, "cand.provisional IS NOT NULL", count_params)
+    else:
+        rows = conn.execute("""SELECT id, content_hash, score, found_skills FROM candidates 
+                               WHERE job_id=? AND version=? AND provisional=1 AND duplicate_of IS NULL""",
+                            (job_id, version)).fetchall()
+        
+        def rank(row):
+            relevance = sum(SKILLS[skill] for skill in json.loads(row[3] or '[]')
+                            if skill.lower() in job['skills_in_job_desc'])
+            return row[2], relevance
+        
+        picked = [row[0] for row in heapq.nlargest(max(0, limit - refined), rows, key=rank)]
+        pending, total = len(picked), limit
+        
+        def feature_chunks(params):
+            for i in range(0, len(picked), TFIDF_CHUNK_SIZE):
+                ids = {f"id{n}": candidate_id for n, candidate_id in enumerate(picked[i:i + TFIDF_CHUNK_SIZE])}
+                yield conn.execute(f"""SELECT cand.id, cand.filename, cand.content_hash, {POOL_FEATURE_COLUMNS}
+                                       FROM candidates cand JOIN talent_pool tp ON tp.content_hash = cand.content_hash
+                                       WHERE cand.id IN ({", ".join(":" + name for name in ids)})""",
+                                   dict(params, **ids)).fetchall()
+        
+        frequency_chunks = itertools.chain(
+            candidate_feature_chunks(conn, job_id, version, "cand.provisional = 0", count_params),
+            feature_chunks(count_params))
+    
+    if not pending:
+        return
+    print(f"Refining {pending} provisional candidates of job {job_id}")
+    progress = JobProgress(conn, job_id, version, refined, total, phase='Refining')
+    
+    def start(conn):
+        conn.execute("UPDATE jobs SET phase='Refining' WHERE id=?", (job_id,))
+        progress.publish(conn, refined)
+    db_writer.run(start)
+    
+    weights = TermWeights([job['job_counts']], hashed)
+    for _, frequencies in iter_chunk_results(candidate_document_frequencies, frequency_chunks, context):
+        weights.add(*frequencies)
+    context['jobs'] = [dict(job, weights=weights.fit())]
+    
+    def scored_chunks():
+        processed = refined
+        for chunk, (job_results, pool_entries, _) in iter_chunk_results(score_candidate_chunk,
+                                                                        feature_chunks(params), context):
+            processed += len(chunk)
+            # Every row gets a result, in row order
+            yield processed, job_results, pool_entries, [], {'candidate_ids': [row[0] for row in chunk]}
+    
+    write_chunks([job_id], [progress], scored_chunks(), [], task=write_refined_chunk)
+
+def process_job_thread(job_id, job_desc, zip_path, cv_members, must_haves, strict=False, streaming=False,
+                       cascade_top=None):
+    """Screen one job's CV archive (see process_jobs_thread)"""
+    process_jobs_thread([(job_id, job_desc, must_haves, strict)], zip_path, cv_members, streaming, cascade_top)
+
+def process_jobs_thread(jobs, zip_path, cv_members=None, streaming=False, cascade_top=None):
+    """
+    Optimized background processing with batching and caching
+    
+    jobs is a list of (job_id, description, must_haves, strict) screened against the
+    same archive: every CV is read, extracted, deduplicated, skill-scanned and
+    term-counted once, and gets a provisional score (similarity 0) for every
+    description. refine_scores then fits one TF-IDF per job over all its
+    candidates and adds their similarity.
+    
+    streaming: read members lazily in chunks bounded by SMARTHIRE_MEMORY_BUDGET_MB
+    (cv_members may then be None) and hash term counts; see stream_cv_chunks.
+    
+    cascade_top: skip term counting in phase 1 and fully score only the best
+    cascade_top of each job (see CASCADE_TOP).
+    
+    Resumable: candidates and processed_files are committed together per chunk,
+    so a restarted job skips the members that were already stored.
+    """
+    job_ids = [job[0] for job in jobs]
+    placeholders = ",".join("?" * len(job_ids))
+    
+    with get_db_connection() as conn:
+        c = conn.cursor()
+        
+        # All jobs of an archive are committed together, so they share one checkpoint
+        c.execute(f"SELECT MIN(COALESCE(processed_files, 0)) FROM jobs WHERE id IN ({placeholders})", job_ids)
+        processed_count = c.fetchone()[0] or 0
+        if cv_members is None:
+            total_files = sum(1 for _ in iter_cv_infos(open_archive(zip_path).infolist()))
+        else:
+            total_files = len(cv_members)
+        # Drop metrics left on this thread by earlier work; the rest belong to these jobs
+        pop_metrics()
+        
+        for job_id, job_desc, must_haves, strict in jobs:
+            print(f"\n=== Processing Job {job_id} ===")
+            print(f"Job Description: {job_desc[:100]}...")
+            print(f"Must-have skills: {must_haves}" + (" (strict)" if strict else ""))
+        print(f"Total CV files: {total_files}" + (" (streaming)" if streaming else ""))
+        if processed_count:
+            print(f"Resuming after {processed_count} already processed files")
+        
+        cascade = cascade_limit(cascade_top, total_files) if cascade_top else None
+        if cascade is not None:
+            print(f"Cascade: provisional scores for all, full scoring for the top {cascade}")
+        progresses = [JobProgress(conn, job_id, 1, processed_count, total_files, phase='Scoring') for job_id in job_ids]
+        
+        def start(conn):
+            conn.execute(f"""UPDATE jobs SET total_files=?, cascade_top=?, status='Processing', phase='Scoring' 
+                             WHERE id IN ({placeholders})""",
+                         [total_files, cascade] + job_ids)
+            for progress in progresses:
+                progress.publish(conn, processed_count)
+        db_writer.run(start)
+        
+        # Pre-compute job description analysis for reuse (major optimization)
+        print("Pre-computing job skills...")
+        context = build_chunk_context([build_job_context(job_desc, must_haves, strict)
+                                       for _, job_desc, must_haves, strict in jobs],
+                                      streaming=streaming, cascade=cascade is not None, zip_path=zip_path)
+        
+        for job_id, job_context in zip(job_ids, context['jobs']):
+            print(f"Found {len(job_context['skills_in_job_desc'])} relevant skills in job {job_id} description")
+        
+        scores_log = []
+        dedup = dedup_index(streaming)
+        if processed_count:
+            # Representatives are linked per archive, so the first job's stand for all
+            restore_dedup_index(conn, dedup, job_ids[0], 1)
+        duplicates_linked = 0
+        
+        # Files are scored in chunks: one batch insert per chunk
+        if streaming:
+            chunks = stream_cv_chunks(zip_path, processed_count)
+        else:
+            chunks = [cv_members[i:i + TFIDF_CHUNK_SIZE] for i in range(processed_count, total_files, TFIDF_CHUNK_SIZE)]
+        
+        def scored_chunks():
+            nonlocal processed_count, duplicates_linked
+            for chunk, (job_results, pool_entries, fingerprints) in iter_chunk_results(process_cv_chunk, chunks, context):
+                job_results, duplicates = link_duplicates(job_results, fingerprints, dedup)
+                processed_count += len(chunk)
+                duplicates_linked += len(duplicates)
+                print(f"  Processed: {processed_count}/{total_files}")
+                yield processed_count, job_results, pool_entries, duplicates
+        
+        candidates_added = write_chunks(job_ids, progresses, scored_chunks(), scores_log, provisional=True)
+        
+        for job_id, job_context in zip(job_ids, context['jobs']):
+            refine_scores(conn, job_id, 1, job_context, cascade, hashed=streaming)
+
+        c.execute(f"SELECT id, short_circuited FROM jobs WHERE id IN ({placeholders})", job_ids)
+        short_circuited = dict(c.fetchall())
+        for job_id in job_ids:
+            print(f"\n=== Job {job_id} Summary ===")
+            print(f"Total processed: {processed_count}")
+            print(f"Candidates saved: {candidates_added[job_id]}")
+            print(f"Rejected by strict must-haves: {short_circuited[job_id] or 0}")
+        print(f"Duplicates linked: {duplicates_linked}")
+        
+        # Show skill distribution in top samples
+        print("\nSample skill matches:")
+        for filename, score, skills in scores_log[:5]:
+            print(f"  {filename[:20]}: {score:5.1f} - Skills: {skills}")
+        
+        series = pop_metrics()
+        
+        def finish(conn):
+            conn.execute(f"UPDATE jobs SET status='Completed', processed_files=? WHERE id IN ({placeholders})",
+                         [processed_count] + job_ids)
+            record_job_metrics(conn, job_ids[0], series)
+            for job_id in job_ids:
+                finish_job_events(conn, job_id)
+        db_writer.run(finish)
+    
+    for job_id in job_ids:
+        print(f"Job {job_id} Completed.\n")
+
+def score_stored_rows(conn, job_id, version, rows, context, processed_count):
+    """
+    Score talent pool rows (see score_pool_chunk) into a job's result version
+    
+    Candidates, features filled in from the pool text, processed_files and the
+    progress event are committed together per chunk by the database writer,
+    starting after the processed_count rows already stored by an interrupted
+    run. Scores are provisional until refine_scores adds the similarity.
+    """
+    total = len(rows)
+    progress = JobProgress(conn, job_id, version, processed_count, total)
+    
+    def start(conn):
+        conn.execute("UPDATE jobs SET total_files=? WHERE id=?", (total, job_id))
+        progress.publish(conn, processed_count)
+    db_writer.run(start)
+    
+    chunks = [rows[i:i + TFIDF_CHUNK_SIZE] for i in range(processed_count, total, TFIDF_CHUNK_SIZE)]
+    
+    dedup = dedup_index()
+    if processed_count:
+        restore_dedup_index(conn, dedup, job_id, version)
+    
+    def scored_chunks():
+        processed = processed_count
+        for chunk, (job_results, pool_entries, fingerprints) in iter_chunk_results(score_pool_chunk, chunks, context):
+            job_results, duplicates = link_duplicates(job_results, fingerprints, dedup)
+            processed += len(chunk)
+            yield processed, job_results, pool_entries, duplicates
+    
+    write_chunks([job_id], [progress], scored_chunks(), [], provisional=True)
+    refine_scores(conn, job_id, version, context['jobs'][0])
+
+def rescore_job_thread(job_id, job_desc, must_haves, from_version, to_version, strict=False):
+    """Re-score a job's resumes from their talent pool features against a new description and must-haves"""
+    try:
+        with get_db_connection() as conn:
+            c = conn.cursor()
+            context = build_chunk_context([build_job_context(job_desc, must_haves, strict)])
+        
+            c.execute(f"""SELECT cand.filename, cand.content_hash, {POOL_FEATURE_COLUMNS}
+                          FROM candidates cand JOIN talent_pool tp ON tp.content_hash = cand.content_hash
+                          WHERE cand.job_id=:job_id AND cand.version=:version
+                          ORDER BY cand.id""",
+                      dict(pool_feature_params(context), job_id=job_id, version=from_version))
+            rows = c.fetchall()
+            
+            # processed_files was reset when the rescore was queued; non-zero means resume
+            c.execute("SELECT processed_files FROM jobs WHERE id=?", (job_id,))
+            processed_count = c.fetchone()[0] or 0
+            pop_metrics()
+        
+            print(f"\n=== Rescoring Job {job_id} (version {from_version} -> {to_version}) ===")
+            print(f"Retained resumes: {len(rows)}")
+        
+            score_stored_rows(conn, job_id, to_version, rows, context, processed_count)
+            series = pop_metrics()
+        
+            def finish(conn):
+                # Switch /shortlist to the new version only once it is complete
+                conn.execute("""UPDATE jobs SET status='Completed', description=?, must_haves=?, strict_must_haves=?, 
+                                       result_version=? 
+                                WHERE id=?""", (job_desc, json.dumps(must_haves), int(strict), to_version, job_id))
+                record_job_metrics(conn, job_id, series)
+                finish_job_events(conn, job_id)
+            db_writer.run(finish)
+    except Exception as e:
+        # Keep serving the previous version; the job can be rescored again
+        print(f"Rescoring job {job_id} failed: {e}")
+        
+        def restore(conn):
+            conn.execute("UPDATE jobs SET status='Completed' WHERE id=?", (job_id,))
+            finish_job_events(conn, job_id)
+        db_writer.run(restore)
+        return
+    
+    print(f"Job {job_id} rescored as version {to_version}.\n")
+
+def screen_pool_thread(job_id, job_desc, must_haves, segment_id, max_pool_id, strict=False):
+    """
+    Screen the talent pool, or a saved segment of it, for a new job
+    
+    A pure scoring pass over stored features: nothing is re-uploaded or
+    re-extracted. CVs added to the pool after the job was queued (id above
+    max_pool_id) are left out, so a resumed run sees the same rows.
+    """
+    with get_db_connection() as conn:
+        c = conn.cursor()
+        context = build_chunk_context([build_job_context(job_desc, must_haves, strict)])
+        
+        c.execute(f"""SELECT tp.filename, tp.content_hash, {POOL_FEATURE_COLUMNS}
+                      FROM talent_pool tp
+                      WHERE tp.id <= :max_pool_id AND (:segment_id IS NULL OR tp.content_hash IN 
+                            (SELECT content_hash FROM pool_segment_members WHERE segment_id = :segment_id))
+                      ORDER BY tp.id""",
+                  dict(pool_feature_params(context), max_pool_id=max_pool_id, segment_id=segment_id))
+        rows = c.fetchall()
+        
+        c.execute("SELECT COALESCE(processed_files, 0) FROM jobs WHERE id=?", (job_id,))
+        processed_count = c.fetchone()[0]
+        pop_metrics()
+        
+        print(f"\n=== Screening Talent Pool for Job {job_id} ===")
+        print(f"Pool CVs: {len(rows)}" + (f" (segment {segment_id})" if segment_id else ""))
+        
+        db_writer.run(lambda conn: conn.execute("UPDATE jobs SET status='Processing' WHERE id=?", (job_id,)))
+        score_stored_rows(conn, job_id, 1, rows, context, processed_count)
+        series = pop_metrics()
+        
+        def finish(conn):
+            conn.execute("UPDATE jobs SET status='Completed' WHERE id=?", (job_id,))
+            record_job_metrics(conn, job_id, series)
+            finish_job_events(conn, job_id)
+        db_writer.run(finish)
+    
+    print(f"Job {job_id} Completed.\n")
+
+# --- 4. Job Queue Execution ---
+def _heartbeat_loop(queue_id, worker_id, stop):
+    """Keep the queue lease alive while the job runs"""
+    while not stop.wait(QUEUE_LEASE_SECONDS / 3):
+        try:
+            with get_db_connection() as conn:
+                if not heartbeat_queue_item(conn, queue_id, worker_id, QUEUE_LEASE_SECONDS):
+                    print(f"Lost lease on queue entry {queue_id}")
+                    return
+        except sqlite3.Error as e:
+            print(f"Heartbeat failed for queue entry {queue_id}: {e}")
+
+def queued_jobs(item):
+    """Jobs a queue entry runs: a multi-job screening lists them in its payload"""
+    payload = item['payload']
+    return payload.get('jobs') or [{'job_id': item['job_id'], 'description': payload.get('description'),
+                                    'must_haves': payload.get('must_haves'), 'strict': payload.get('strict')}]
+
+def run_queue_item(item, worker_id):
+    """Run a claimed queue entry to completion and record the outcome"""
+    payload = item['payload']
+    stop = threading.Event()
+    heartbeat = threading.Thread(target=_heartbeat_loop, args=(item['id'], worker_id, stop), daemon=True)
+    heartbeat.start()
+    try:
+        if item['kind'] == 'rescore':
+            rescore_job_thread(item['job_id'], payload['description'], payload['must_haves'],
+                               payload['from_version'], payload['to_version'], payload.get('strict', False))
+        elif item['kind'] == 'pool':
+            screen_pool_thread(item['job_id'], payload['description'], payload['must_haves'],
+                               payload.get('segment_id'), payload['max_pool_id'], payload.get('strict', False))
+        else:
+            # Member order is stable, so a resumed job lines up with its checkpoint.
+            # Streaming jobs then walk the central directory lazily instead of keeping the list
+            cv_members = extract_job_archive([job['job_id'] for job in queued_jobs(item)], payload['zip_path'])
+            streaming = resolve_streaming(payload.get('streaming'), len(cv_members))
+            try:
+                process_jobs_thread([(job['job_id'], job['description'], job['must_haves'], bool(job.get('strict')))
+                                     for job in queued_jobs(item)],
+                                    payload['zip_path'], None if streaming else cv_members, streaming,
+                                    payload.get('cascade_top'))
+            finally:
+                close_archive()
+        status, error = 'done', None
+    except Exception as e:
+        print(f"Job {item['job_id']} failed: {e}")
+        for job in queued_jobs(item):
+            mark_job_failed(job['job_id'], str(e))
+        status, error = 'failed', str(e)
+    finally:
+        stop.set()
+    
+    with get_db_connection() as conn:
+        finish_queue_item(conn, item['id'], worker_id, status, error)
+
+def _run_in_thread(queue_id):
+    worker_id = f"{socket.gethostname()}:{os.getpid()}:{threading.get_ident()}"
+    with get_db_connection() as conn:
+        item = claim_queue_item(conn, worker_id, QUEUE_LEASE_SECONDS, queue_id=queue_id)
+    if item:
+        run_queue_item(item, worker_id)
+
+def submit_job(job_id, kind, payload):
+    """Persist a job in the queue and, in thread mode, start running it right away"""
+    with get_db_connection() as conn:
+        queue_id = enqueue_job(conn, job_id, kind, payload)
+    
+    if SMARTHIRE_EXECUTION == 'thread':
+        t = threading.Thread(target=_run_in_thread, args=(queue_id,))
+        t.daemon = True  # Allow thread to exit when main exits
+        t.start()
+    return queue_id
+
+def flush_job_metrics(job_id):
+    """Store the metrics this thread recorded for a job outside the job's own chunk commits"""
+    with get_db_connection() as conn:
+        record_job_metrics(conn, job_id, pop_metrics())
+        conn.commit()
+
+def mark_job_failed(job_id, error=None):
+    with get_db_connection() as conn:
+        conn.execute("UPDATE jobs SET status='Failed', error=? WHERE id=?", (error, job_id))
+        finish_job_events(conn, job_id, 'failed')
+        conn.commit()
+    notify_job_events()
+
+# --- 5. API Endpoints ---
+def parse_flag(value):
+    """Accept booleans from JSON or form fields ("true", "1", "on", ...)"""
+    return str(value).strip().lower() in ('1', 'true', 'yes', 'on')
+
+def parse_must_haves(value):
+    """Accept must-haves as a comma-separated string or a JSON list"""
+    if isinstance(value, str):
+        value = value.split(',')
+    return [str(s).strip() for s in (value or []) if str(s).strip()]
+
+def validate_zip_upload():
+    """Return the uploaded ZIP file, or an error message if the request lacks a usable one"""
+    if 'zip_file' not in request.files:
+        return None, "No ZIP file uploaded"
+    
+    zip_file = request.files['zip_file']
+    if zip_file.filename == '':
+        return None, "No selected file"
+    
+    if not zip_file.filename.endswith('.zip'):
+        return None, "File must be a ZIP archive"
+    return zip_file, None
+
+def resolve_streaming(value, total_files):
+    """Streaming mode for an upload: 'true'/'false', or 'auto' (default) to stream archives of STREAMING_MIN_FILES CVs or more"""
+    if value is None or str(value).strip().lower() in ('', 'auto'):
+        return total_files >= STREAMING_MIN_FILES
+    return parse_flag(value)
+
+def resolve_cascade_top(form):
+    """Cascade size requested by an upload form (cascade, cascade_top), or None to fully score every CV"""
+    if not parse_flag(form.get('cascade', 'false')):
+        return None
+    return parse_cascade_top(form.get('cascade_top') or CASCADE_TOP)
+
+def parse_screen_jobs(value):
+    """
+    Jobs of a multi-job screening as (description, must_haves, strict), from a JSON list
+    (or its text) of {"description": ..., "must_haves": ..., "strict_must_haves": ...};
+    raises ValueError with a client-facing message
+    """
+    if not isinstance(value, list):
+        try:
+            value = json.loads(value or '[]')
+        except ValueError:
+            raise ValueError("jobs must be a JSON list")
+    if not isinstance(value, list) or not value or not all(isinstance(job, dict) for job in value):
+        raise ValueError("jobs must be a non-empty JSON list of objects")
+    if len(value) > MAX_MULTI_JOBS:
+        raise ValueError(f"At most {MAX_MULTI_JOBS} job descriptions per upload")
+    return [(str(job.get('description') or ''), parse_must_haves(job.get('must_haves')),
+             parse_flag(job.get('strict_must_haves', False))) for job in value]
+
+def create_screen_jobs(jobs, title="Bulk Screen", total_files=0):
+    """Insert a queued job per (description, must_haves, strict) and return their ids"""
+    with get_db_connection() as conn:
+        c = conn.cursor()
+        job_ids = []
+        for job_desc, must_haves, strict in jobs:
+            c.execute("""INSERT INTO jobs (title, description, status, total_files, must_haves, strict_must_haves) 
+                         VALUES (?, ?, ?, ?, ?, ?)""",
+                      (title, job_desc, "Queued", total_files, json.dumps(must_haves), int(strict)))
+            job_ids.append(c.lastrowid)
+        conn.commit()
+    return job_ids
+
+def submit_screen_jobs(job_ids, jobs, zip_path, streaming, cascade_top):
+    """Queue the screening of one archive for several jobs"""
+    # One queue entry runs the whole batch, so the archive is only read once
+    submit_job(job_ids[0], 'screen', {
+        'zip_path': zip_path,
+        'streaming': streaming,
+        'cascade_top': cascade_top,
+        'jobs': [{'job_id': job_id, 'description': job_desc, 'must_haves': must_haves, 'strict': strict}
+                 for job_id, (job_desc, must_haves, strict) in zip(job_ids, jobs)]
+    })
+
+def save_upload(zip_file, job_ids):
+    """
+    Store an uploaded ZIP under the first job's folder and return its path
+    
+    The upload was spooled to UPLOAD_FOLDER (see UploadRequest), so this is
+    a hard link, however large the archive, given the usual file mode;
+    the file is copied only if that fails. Only the end of the file is read here, to check it is a ZIP:
+    its members are listed by the worker (see extract_job_archive). Raises
+    ValueError with a client-facing message (and marks the jobs failed)
+    for files that are not ZIP archives.
+    """
+    # Members are read from the archive directly, nothing is extracted to disk
+    job_dir = os.path.join(UPLOAD_FOLDER, str(job_ids[0]))
+    os.makedirs(job_dir, exist_ok=True)
+    
+    zip_path = os.path.join(job_dir, "cv_archive.zip")
+    try:
+        zip_file.stream.flush()
+        os.link(zip_file.stream.name, zip_path)
+    except (AttributeError, OSError):
+        zip_file.save(zip_path)
+    else:
+        os.chmod(zip_path, UPLOAD_FILE_MODE)
+    
+    if not zipfile.is_zipfile(zip_path):
+        for job_id in job_ids:
+            mark_job_failed(job_id, "Invalid ZIP archive")
+        raise ValueError("Invalid ZIP archive")
+    return zip_path
+
+def extract_job_archive(job_ids, zip_path):
+    """
+    First stage of screening an upload: list the CVs of its archive
+    
+    The jobs are Processing in phase Extracting meanwhile. Raises ValueError
+    for an archive that is corrupt, exceeds the ZIP limits or holds no CVs.
+    """
+    def start(conn):
+        conn.execute(f"UPDATE jobs SET status='Processing', phase='Extracting' WHERE id IN ({','.join('?' * len(job_ids))})",
+                     job_ids)
+        for job_id in job_ids:
+            publish_job_event(conn, job_id, 'progress', job_snapshot(conn, job_id))
+    db_writer.run(start)
+    
+    # Find CVs from the central directory
+    pop_metrics()
+    try:
+        with timed('zip_list_seconds'):
+            cv_members = list_zip_cvs(zip_path)
+    except (zipfile.BadZipFile, ZipLimitError) as e:
+        raise ValueError(f"Invalid ZIP archive: {e}")
+    finally:
+        flush_job_metrics(job_ids[0])
+    
+    if not cv_members:
+        raise ValueError("No CV files found in ZIP")
+    
+    print(f"Found {len(cv_members)} CV files in ZIP archive")
+    return cv_members
+
+@app.route('/upload-zip', methods=['POST'])
+def upload_zip():
+    job_desc = request.form.get('description', '')
+    must_haves = parse_must_haves(request.form.get('must_haves', ''))
+    # Strict: resumes missing a must-have are rejected before any scoring work
+    strict = parse_flag(request.form.get('strict_must_haves', 'false'))
+    try:
+        cascade_top = resolve_cascade_top(request.form)
+    except ValueError as e:
+        return jsonify({"error": f"Invalid cascade_top: {e}"}), 400
+    
+    zip_file, error = validate_zip_upload()
+    if error:
+        return jsonify({"error": error}), 400
+
+    # Create Job in DB
+    job_id, = create_screen_jobs([(job_desc, must_haves, strict)])
+    
+    try:
+        zip_path = save_upload(zip_file, [job_id])
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    
+    # Queue processing (survives restarts; see SMARTHIRE_EXECUTION). Listing the
+    # archive is the job's first stage, so the response does not wait on its size
+    submit_job(job_id, 'screen', {
+        'zip_path': zip_path,
+        'description': job_desc,
+        'must_haves': must_haves,
+        'strict': strict,
+        'streaming': request.form.get('streaming'),
+        'cascade_top': cascade_top
+    })
+
+    return jsonify({
+        "message": "ZIP file received, processing queued", 
+        "job_id": job_id,
+        "status": "Queued",
+        "cascade_top": cascade_top
+    }), 202
+
+@app.route('/upload-zip/multi', methods=['POST'])
+def upload_zip_multi():
+    """
+    Screen one CV archive against several job descriptions in a single pass
+    
+    Form fields: zip_file, streaming, cascade, cascade_top, and jobs as a JSON list of
+    {"description": ..., "must_haves": [...] or "a, b", "strict_must_haves": bool}. Each description
+    gets its own job (results, progress events, rescoring); the archive is
+    read, extracted and skill-scanned once for all of them.
+    """
+    try:
+        jobs = parse_screen_jobs(request.form.get('jobs'))
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    try:
+        cascade_top = resolve_cascade_top(request.form)
+    except ValueError as e:
+        return jsonify({"error": f"Invalid cascade_top: {e}"}), 400
+    
+    zip_file, error = validate_zip_upload()
+    if error:
+        return jsonify({"error": error}), 400
+    
+    job_ids = create_screen_jobs(jobs)
+    
+    try:
+        zip_path = save_upload(zip_file, job_ids)
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    
+    submit_screen_jobs(job_ids, jobs, zip_path, request.form.get('streaming'), cascade_top)
+    
+    return jsonify({
+        "message": f"ZIP file received, processing queued against {len(job_ids)} job descriptions",
+        "job_ids": job_ids,
+        "status": "Queued",
+        "cascade_top": cascade_top
+    }), 202
+
+# --- Chunked uploads: an archive sent as numbered, checksummed chunks that can be retried ---
+def upload_part_path(upload_id):
+    return os.path.join(UPLOAD_FOLDER, 'sessions', f"{upload_id}.part")
+
+def get_upload_session(conn, upload_id):
+    conn.row_factory = sqlite3.Row
+    return conn.execute("SELECT * FROM upload_sessions WHERE id=?", (upload_id,)).fetchone()
+
+def upload_session_state(conn, session):
+    """A session as returned by the /uploads endpoints: the chunks received and those still missing"""
+    received = [row[0] for row in conn.execute(
+        "SELECT chunk_index FROM upload_chunks WHERE upload_id=? ORDER BY chunk_index", (session['id'],))]
+    received_set = set(received)
+    return {
+        "upload_id": session['id'],
+        "filename": session['filename'],
+        "size": session['size'],
+        "chunk_size": session['chunk_size'],
+        "total_chunks": session['total_chunks'],
+        "status": session['status'],
+        "received": received,
+        "missing": [index for index in range(session['total_chunks']) if index not in received_set],
+        "job_ids": json.loads(session['job_ids']) if session['job_ids'] else None
+    }
+
+def delete_upload_session(conn, upload_id):
+    """Drop a session and its partial file (caller commits)"""
+    conn.execute("DELETE FROM upload_chunks WHERE upload_id=?", (upload_id,))
+    conn.execute("DELETE FROM upload_sessions WHERE id=?", (upload_id,))
+    try:
+        os.remove(upload_part_path(upload_id))
+    except FileNotFoundError:
+        pass
+
+def expire_upload_sessions(conn):
+    """
+    Delete sessions idle for UPLOAD_SESSION_HOURS (caller commits): abandoned
+    uploads with their partial file, and finalized ones, which were only
+    kept so a retried finalize finds its jobs
+    """
+    cutoff = time.time() - UPLOAD_SESSION_HOURS * 3600
+    for upload_id, in conn.execute("SELECT id FROM upload_sessions WHERE updated_at < ?", (cutoff,)).fetchall():
+        delete_upload_session(conn, upload_id)
+
+@app.route('/uploads', methods=['POST'])
+def create_upload():
+    """
+    Start a resumable upload of a CV archive
+    
+    JSON or form fields: filename (a .zip), size in bytes, and optionally
+    chunk_size (default UPLOAD_CHUNK_BYTES). Chunk i then covers bytes
+    [i * chunk_size, (i + 1) * chunk_size) of the archive.
+    """
+    data = request.get_json(silent=True) or request.form
+    filename = str(data.get('filename') or '')
+    if not filename.endswith('.zip'):
+        return jsonify({"error": "File must be a ZIP archive"}), 400
+    try:
+        size = int(data.get('size'))
+        chunk_size = int(data.get('chunk_size') or UPLOAD_CHUNK_BYTES)
+    except (TypeError, ValueError):
+        return jsonify({"error": "size and chunk_size must be integers"}), 400
+    if not 0 < size <= MAX_UPLOAD_BYTES:
+        return jsonify({"error": f"size must be between 1 and {MAX_UPLOAD_BYTES} bytes"}), 400
+    max_chunk = app.config['MAX_CONTENT_LENGTH'] or UPLOAD_CHUNK_BYTES
+    if not UPLOAD_MIN_CHUNK_BYTES <= chunk_size <= max_chunk:
+        return jsonify({"error": f"chunk_size must be between {UPLOAD_MIN_CHUNK_BYTES} and {max_chunk} bytes"}), 400
+    
+    upload_id = uuid.uuid4().hex
+    create_part_file(upload_part_path(upload_id), size)
+    now = time.time()
+    with get_db_connection() as conn:
+        expire_upload_sessions(conn)
+        conn.execute("""INSERT INTO upload_sessions (id, filename, size, chunk_size, total_chunks, created_at, updated_at) 
+                        VALUES (?, ?, ?, ?, ?, ?, ?)""",
+                     (upload_id, filename, size, chunk_size, chunk_count(size, chunk_size), now, now))
+        conn.commit()
+        return jsonify(upload_session_state(conn, get_upload_session(conn, upload_id))), 201
+
+@app.route('/uploads/<upload_id>', methods=['GET'])
+def upload_status(upload_id):
+    """Which chunks of an upload have arrived, so an interrupted client sends only the rest"""
+    with get_db_connection() as conn:
+        session = get_upload_session(conn, upload_id)
+        if not session:
+            return jsonify({"error": "Upload not found"}), 404
+        return jsonify(upload_session_state(conn, session))
+
+@app.route('/uploads/<upload_id>', methods=['DELETE'])
+def abort_upload(upload_id):
+    """Abandon an unfinished upload and delete what was received"""
+    with get_db_connection() as conn:
+        session = get_upload_session(conn, upload_id)
+        if not session:
+            return jsonify({"error": "Upload not found"}), 404
+        if session['status'] != 'open':
+            return jsonify({"error": f"Upload is {session['status']}"}), 409
+        delete_upload_session(conn, upload_id)
+        conn.commit()
+    return jsonify({"message": "Upload deleted", "upload_id": upload_id})
+
+@app.route('/uploads/<upload_id>/chunks/<int:index>', methods=['PUT'])
+def put_upload_chunk(upload_id, index):
+    """
+    Store chunk `index` of an upload: the raw request body, with its SHA-256
+    (hex) in the X-Chunk-SHA256 header
+    
+    The body goes straight to its place in the part file, a piece at a
+    time. Sending a chunk again (e.g. after a timeout) rewrites it; the
+    chunk counts as missing until the new bytes match their checksum.
+    """
+    checksum = request.headers.get('X-Chunk-SHA256', '').strip()
+    if not checksum:
+        return jsonify({"error": "X-Chunk-SHA256 header required"}), 400
+    
+    with get_db_connection() as conn:
+        session = get_upload_session(conn, upload_id)
+    if not session:
+        return jsonify({"error": "Upload not found"}), 404
+    if session['status'] != 'open':
+        return jsonify({"error": f"Upload is {session['status']}"}), 409
+    if not 0 <= index < session['total_chunks']:
+        return jsonify({"error": f"Chunk index must be between 0 and {session['total_chunks'] - 1}"}), 400
+    length = chunk_length(session['size'], session['chunk_size'], index)
+    if request.content_length != length:
+        return jsonify({"error": f"Chunk {index} must be {length} bytes"}), 400
+    
+    # Forgotten before its bytes are overwritten, so a bad resend cannot leave
+    # a chunk recorded as received over bytes that no longer match
+    with get_db_connection() as conn:
+        conn.execute("DELETE FROM upload_chunks WHERE upload_id=? AND chunk_index=?", (upload_id, index))
+        conn.commit()
+    try:
+        write_chunk(upload_part_path(upload_id), index * session['chunk_size'], request.stream, length, checksum)
+    except ChunkError as e:
+        return jsonify({"error": str(e)}), 400
+    except FileNotFoundError:
+        # Finalized or deleted while this chunk was arriving
+        return jsonify({"error": "Upload is no longer open"}), 409
+    
+    with get_db_connection() as conn:
+        conn.execute("INSERT OR REPLACE INTO upload_chunks (upload_id, chunk_index, sha256) VALUES (?, ?, ?)",
+                     (upload_id, index, checksum.lower()))
+        conn.execute("UPDATE upload_sessions SET updated_at=? WHERE id=?", (time.time(), upload_id))
+        conn.commit()
+        received, = conn.execute("SELECT COUNT(*) FROM upload_chunks WHERE upload_id=?", (upload_id,)).fetchone()
+    return jsonify({"upload_id": upload_id, "index": index, "received": received,
+                    "total_chunks": session['total_chunks']})
+
+@app.route('/uploads/<upload_id>/finalize', methods=['POST'])
+def finalize_upload(upload_id):
+    """
+    Screen a completely received upload
+    
+    JSON or form fields as for /upload-zip (description, must_haves, ...),
+    or jobs as for /upload-zip/multi. Every chunk is checked against its
+    checksum again; chunks whose bytes changed since they arrived (e.g.
+    overwritten by a concurrent resend) are reported missing. The archive
+    is then moved, not copied, to its job's folder and queued like an
+    /upload-zip archive. Finalizing again returns the jobs already created,
+    so a lost response can be retried; a finalize that fails leaves the
+    upload open with its archive.
+    """
+    data = request.get_json(silent=True) or request.form
+    multi = 'jobs' in data
+    try:
+        if multi:
+            jobs = parse_screen_jobs(data.get('jobs'))
+        else:
+            jobs = [(str(data.get('description') or ''), parse_must_haves(data.get('must_haves', '')),
+                     parse_flag(data.get('strict_must_haves', False)))]
+        cascade_top = resolve_cascade_top(data)
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    
+    with get_db_connection() as conn:
+        session = get_upload_session(conn, upload_id)
+        if not session:
+            return jsonify({"error": "Upload not found"}), 404
+        if session['status'] == 'finalized':
+            job_ids = json.loads(session['job_ids'])
+            return jsonify({"message": "Upload already finalized", "upload_id": upload_id,
+                            **({"job_ids": job_ids} if multi else {"job_id": job_ids[0]})})
+        state = upload_session_state(conn, session)
+        if state['missing']:
+            return jsonify({"error": f"{len(state['missing'])} chunks missing", "missing": state['missing']}), 409
+        # Claimed before any job exists, so concurrent finalize calls create the jobs once
+        claimed = conn.execute("UPDATE upload_sessions SET status='finalizing', updated_at=? WHERE id=? AND status='open'",
+                               (time.time(), upload_id)).rowcount
+        conn.commit()
+        hashes = dict(conn.execute("SELECT chunk_index, sha256 FROM upload_chunks WHERE upload_id=?", (upload_id,)))
+    if not claimed:
+        return jsonify({"error": "Upload is being finalized"}), 409
+    
+    def reopen(corrupt=()):
+        with get_db_connection() as conn:
+            conn.executemany("DELETE FROM upload_chunks WHERE upload_id=? AND chunk_index=?",
+                             [(upload_id, index) for index in corrupt])
+            conn.execute("UPDATE upload_sessions SET status='open', updated_at=? WHERE id=?", (time.time(), upload_id))
+            conn.commit()
+    
+    part_path = upload_part_path(upload_id)
+    try:
+        corrupt = corrupt_chunks(part_path, session['chunk_size'], hashes)
+    except Exception:
+        reopen()
+        raise
+    if corrupt:
+        reopen(corrupt)
+        return jsonify({"error": f"{len(corrupt)} chunks changed since they were received, send them again",
+                        "missing": corrupt}), 409
+    if not zipfile.is_zipfile(part_path):
+        reopen()
+        return jsonify({"error": "Invalid ZIP archive"}), 400
+    
+    job_ids, moved = [], False
+    try:
+        job_ids = create_screen_jobs(jobs)
+        job_dir = os.path.join(UPLOAD_FOLDER, str(job_ids[0]))
+        os.makedirs(job_dir, exist_ok=True)
+        zip_path = os.path.join(job_dir, "cv_archive.zip")
+        os.replace(part_path, zip_path)
+        moved = True
+        submit_screen_jobs(job_ids, jobs, zip_path, data.get('streaming'), cascade_top)
+    except Exception:
+        # Back to open with the archive in place, so the client can finalize again
+        if moved:
+            os.replace(zip_path, part_path)
+        for job_id in job_ids:
+            mark_job_failed(job_id, "Upload could not be finalized")
+        reopen()
+        raise
+    
+    with get_db_connection() as conn:
+        conn.execute("UPDATE upload_sessions SET status='finalized', job_ids=?, updated_at=? WHERE id=?",
+                     (json.dumps(job_ids), time.time(), upload_id))
+        conn.commit()
+    
+    return jsonify({
+        "message": "Upload complete, processing queued",
+        "upload_id": upload_id,
+        **({"job_ids": job_ids} if multi else {"job_id": job_ids[0]}),
+        "status": "Queued",
+        "cascade_top": cascade_top
+    }), 202
+
+@app.route('/jobs/<int:job_id>/rescore', methods=['POST'])
+def rescore_job(job_id):
+    """Re-score an existing job with a new description and/or must-haves, without re-extracting"""
+    data = request.get_json(silent=True) or request.form
+    
+    with get_db_connection() as conn:
+        conn.row_factory = sqlite3.Row
+        c = conn.cursor()
+        
+        c.execute("SELECT status, description, must_haves, strict_must_haves, result_version FROM jobs WHERE id=?",
+                  (job_id,))
+        job = c.fetchone()
+        if not job:
+            return jsonify({"error": "Job not found"}), 404
+        if job['status'] != 'Completed':
+            return jsonify({"error": f"Job is {job['status']}, only completed jobs can be rescored"}), 409
+        
+        job_desc = data.get('description') or job['description']
+        if 'must_haves' in data:
+            must_haves = parse_must_haves(data.get('must_haves'))
+        else:
+            must_haves = json.loads(job['must_haves'] or '[]')
+        if 'strict_must_haves' in data:
+            strict = parse_flag(data.get('strict_must_haves'))
+        else:
+            strict = bool(job['strict_must_haves'])
+        
+        # Claimed only if still Completed, so concurrent requests (a double-click) queue one rescore.
+        # A rescore fully scores every stored CV, so no cascade applies to the new version
+        claimed = c.execute("""UPDATE jobs SET status='Processing', processed_files=0, short_circuited=0, 
+                               cascade_top=NULL, cascade_refined=0, phase=NULL WHERE id=? AND status='Completed'""",
+                            (job_id,)).rowcount
+        if not claimed:
+            conn.rollback()
+            return jsonify({"error": "Job is already being rescored"}), 409
+        
+        # Past the highest version on record, so rows left by an interrupted rescore are never reused.
+        # Read after the claim, under its write lock
+        c.execute("SELECT COALESCE(MAX(version), 0) FROM candidates WHERE job_id=?", (job_id,))
+        to_version = max(c.fetchone()[0], job['result_version']) + 1
+        # Supersedes the previous run's 'complete' event until a worker picks the job up
+        publish_job_event(conn, job_id, 'progress', job_snapshot(conn, job_id))
+        conn.commit()
+    notify_job_events()
+    
+    submit_job(job_id, 'rescore', {
+        'description': job_desc,
+        'must_haves': must_haves,
+        'from_version': job['result_version'],
+        'to_version': to_version,
+        'strict': strict
+    })
+    
+    return jsonify({
+        "message": "Started rescoring job",
+        "job_id": job_id,
+        "version": to_version
+    }), 202
+
+@app.route('/pool', methods=['GET'])
+def talent_pool():
+    """Talent pool size, feature coverage and saved segments"""
+    with get_db_connection() as conn:
+        return jsonify(get_talent_pool_stats(conn))
+
+@app.route('/pool/segments', methods=['POST'])
+def create_segment():
+    """
+    Save a subset of the talent pool to screen later
+    
+    JSON body: name, plus any of job_ids (CVs screened by those jobs),
+    content_hashes (explicit CVs) and skills (keep only CVs with all of them).
+    Without job_ids or content_hashes the subset starts from the whole pool.
+    """
+    data = request.get_json(silent=True) or {}
+    name = str(data.get('name') or '').strip()
+    if not name:
+        return jsonify({"error": "Segment name is required"}), 400
+    job_ids = [int(job_id) for job_id in data.get('job_ids') or []]
+    content_hashes = [str(h) for h in data.get('content_hashes') or []]
+    required = {skill.lower() for skill in parse_must_haves(data.get('skills'))}
+    
+    with get_db_connection() as conn:
+        c = conn.cursor()
+        if job_ids or content_hashes:
+            c.execute("CREATE TEMP TABLE IF NOT EXISTS segment_sources (content_hash TEXT PRIMARY KEY)")
+            c.execute("DELETE FROM segment_sources")
+            if job_ids:
+                c.execute(f"""INSERT OR IGNORE INTO segment_sources 
+                              SELECT content_hash FROM candidates 
+                              WHERE job_id IN ({",".join("?" * len(job_ids))}) AND content_hash IS NOT NULL""",
+                          job_ids)
+            c.executemany("INSERT OR IGNORE INTO segment_sources VALUES (?)", [(h,) for h in content_hashes])
+            source = "JOIN segment_sources src ON src.content_hash = tp.content_hash"
+        else:
+            source = ""
+        c.execute(f"""SELECT tp.content_hash, tp.skills, CASE WHEN tp.skills IS NULL THEN tp.text END 
+                      FROM talent_pool tp {source} ORDER BY tp.id""")
+        
+        members = []
+        for content_hash, skills, packed_text in c.fetchall():
+            if required:
+                if skills is not None:
+                    found = json.loads(skills)
+                else:
+                    found = skill_matcher.find(zlib.decompress(packed_text).decode('utf-8'))
+                if not required <= {skill.lower() for skill in found}:
+                    continue
+            members.append(content_hash)
+        
+        segment_id = create_pool_segment(conn, name, members)
+        conn.commit()
+    
+    return jsonify({"segment_id": segment_id, "name": name, "size": len(members)})
+
+@app.route('/pool/screen', methods=['POST'])
+def screen_pool():
+    """
+    Screen the whole talent pool, or a saved segment, for a new job description
+    
+    Body (JSON or form): description, must_haves, optional segment_id and
+    strict_must_haves.
+    Scores stored features only, so no archive is uploaded or re-extracted.
+    """
+    data = request.get_json(silent=True) or request.form
+    job_desc = data.get('description', '')
+    must_haves = parse_must_haves(data.get('must_haves', ''))
+    strict = parse_flag(data.get('strict_must_haves', False))
+    segment_id = data.get('segment_id')
+    segment_id = int(segment_id) if segment_id not in (None, '') else None
+    
+    with get_db_connection() as conn:
+        c = conn.cursor()
+        if segment_id is not None:
+            c.execute("SELECT 1 FROM pool_segments WHERE id=?", (segment_id,))
+            if not c.fetchone():
+                return jsonify({"error": "Segment not found"}), 404
+        c.execute("""SELECT COALESCE(MAX(tp.id), 0), COUNT(*) FROM talent_pool tp 
+                     WHERE :segment_id IS NULL OR tp.content_hash IN 
+                           (SELECT content_hash FROM pool_segment_members WHERE segment_id = :segment_id)""",
+                  {'segment_id': segment_id})
+        max_pool_id, pool_size = c.fetchone()
+    
+    if not pool_size:
+        return jsonify({"error": "No CVs in the talent pool to screen"}), 400
+    
+    job_id, = create_screen_jobs([(job_desc, must_haves, strict)], title="Talent Pool Screen", total_files=pool_size)
+    submit_job(job_id, 'pool', {
+        'description': job_desc,
+        'must_haves': must_haves,
+        'segment_id': segment_id,
+        'max_pool_id': max_pool_id,
+        'strict': strict
+    })
+    
+    return jsonify({
+        "message": "Started screening the talent pool",
+        "job_id": job_id,
+        "total_cvs_found": pool_size
+    }), 202
+
+@app.route('/debug/job/<job_id>', methods=['GET'])
+def debug_job(job_id):
+    """Debug endpoint to see ALL candidates"""
+    with get_db_connection() as conn:
+        conn.row_factory = sqlite3.Row
+        c = conn.cursor()
+        
+        # Get job info
+        c.execute("SELECT * FROM jobs WHERE id=?", (job_id,))
+        job = c.fetchone()
+        job_dict = dict(job) if job else {}
+        
+        # Count all candidates of the current result version, but only load the first 50
+        # (use /jobs/<job_id>/candidates to page through the rest, /jobs/<job_id>/export for all)
+        version = job_dict.get('result_version', 1)
+        c.execute("SELECT COUNT(*) FROM candidates WHERE job_id=? AND version=?", (job_id, version))
+        total_candidates = c.fetchone()[0]
+        c.execute("SELECT * FROM candidates WHERE job_id=? AND version=? ORDER BY score DESC, id DESC LIMIT 50",
+                  (job_id, version))
+        candidates = [dict(row) for row in c.fetchall()]
+    
+    return jsonify({
+        "job": job_dict,
+        "total_candidates": total_candidates,
+        "candidates": candidates,  # First 50
+        "top_5": candidates[:5]
+    })
+
+# Columns that /jobs/<job_id>/candidates can return (id and score are always included)
+CANDIDATE_FIELDS = ('id', 'filename', 'score', 'missing_skills', 'found_skills', 'is_shortlisted',
+                    'content_hash', 'version', 'duplicate_of', 'provisional')
+CANDIDATES_PAGE_LIMIT = 500
+
+def encode_cursor(score, candidate_id):
+    return base64.urlsafe_b64encode(json.dumps([score, candidate_id]).encode()).decode()
+
+def decode_cursor(cursor):
+    """Return (score, id) of the last row of the previous page; raises ValueError if malformed"""
+    try:
+        score, candidate_id = json.loads(base64.urlsafe_b64decode(cursor.encode()))
+        return float(score), int(candidate_id)
+    except Exception as e:
+        raise ValueError(f"Invalid cursor: {cursor}") from e
+
+@app.route('/jobs/<int:job_id>/candidates', methods=['GET'])
+def list_candidates(job_id):
+    """
+    Page through a job's candidates by descending score
+    
+    Keyset pagination on (score, id): each page is one range scan of
+    idx_candidates_job_score starting after the cursor, so every page costs
+    the same however deep it is.
+    
+    Query params: limit (default 50, max 500), cursor (next_cursor of the
+    previous page), min_score, version, fields (comma-separated columns),
+    include_duplicates (duplicates of another candidate are skipped by default)
+    """
+    limit = min(max(request.args.get('limit', 50, type=int), 1), CANDIDATES_PAGE_LIMIT)
+    min_score = request.args.get('min_score', type=float)
+    
+    fields = request.args.get('fields')
+    if fields:
+        requested = [f.strip() for f in fields.split(',') if f.strip()]
+        unknown = [f for f in requested if f not in CANDIDATE_FIELDS]
+        if unknown:
+            return jsonify({"error": f"Unknown fields: {', '.join(unknown)}"}), 400
+        columns = ['id', 'score'] + [f for f in requested if f not in ('id', 'score')]
+    else:
+        columns = list(CANDIDATE_FIELDS)
+    
+    with get_db_connection() as conn:
+        conn.row_factory = sqlite3.Row
+        c = conn.cursor()
+        
+        c.execute("SELECT result_version FROM jobs WHERE id=?", (job_id,))
+        job = c.fetchone()
+        if not job:
+            return jsonify({"error": "Job not found"}), 404
+        version = request.args.get('version', type=int) or job['result_version']
+        
+        query = f"SELECT {', '.join(columns)} FROM candidates WHERE job_id=? AND version=?"
+        params = [job_id, version]
+        if min_score is not None:
+            query += " AND score >= ?"
+            params.append(min_score)
+        if request.args.get('include_duplicates', 'false').lower() != 'true':
+            query += " AND duplicate_of IS NULL"
+        if request.args.get('cursor'):
+            try:
+                params.extend(decode_cursor(request.args['cursor']))
+            except ValueError as e:
+                return jsonify({"error": str(e)}), 400
+            query += " AND (score, id) < (?, ?)"
+        # One extra row tells whether another page exists
+        query += " ORDER BY score DESC, id DESC LIMIT ?"
+        params.append(limit + 1)
+        
+        c.execute(query, params)
+        rows = [dict(row) for row in c.fetchall()]
+    
+    next_cursor = None
+    if len(rows) > limit:
+        rows = rows[:limit]
+        next_cursor = encode_cursor(rows[-1]['score'], rows[-1]['id'])
+    
+    return jsonify({
+        "job_id": job_id,
+        "version": version,
+        "candidates": rows,
+        "next_cursor": next_cursor
+    })
+
+EXPORT_BATCH_SIZE = int(os.getenv('EXPORT_BATCH_SIZE', 1000))
+
+def iter_candidate_batches(job_id, version, min_score=None, include_duplicates=True):
+    """
+    Yield a job's candidate rows (EXPORT_COLUMNS order) in batches, by descending score
+    
+    Each batch is its own keyset query on idx_candidates_job_score, so no read
+    transaction stays open while a slow client downloads the export.
+    """
+    query = f"SELECT {', '.join(EXPORT_COLUMNS)} FROM candidates WHERE job_id=? AND version=?"
+    params = [job_id, version]
+    if min_score is not None:
+        query += " AND score >= ?"
+        params.append(min_score)
+    if not include_duplicates:
+        query += " AND duplicate_of IS NULL"
+    cursor = None
+    while True:
+        with get_db_connection() as conn:
+            if cursor is None:
+                rows = conn.execute(query + " ORDER BY score DESC, id DESC LIMIT ?",
+                                    params + [EXPORT_BATCH_SIZE]).fetchall()
+            else:
+                rows = conn.execute(query + " AND (score, id) < (?, ?) ORDER BY score DESC, id DESC LIMIT ?",
+                                    params + list(cursor) + [EXPORT_BATCH_SIZE]).fetchall()
+        if not rows:
+            return
+        yield rows
+        if len(rows) < EXPORT_BATCH_SIZE:
+            return
+        cursor = (rows[-1][EXPORT_COLUMNS.index('score')], rows[-1][0])
+
+@app.route('/jobs/<int:job_id>/export', methods=['GET'])
+def export_candidates(job_id):
+    """
+    Stream every candidate of a job as NDJSON, CSV or Parquet
+    
+    Rows are read and encoded one batch at a time, so memory stays flat
+    however large the job is. missing_skills and found_skills are exported
+    as lists (NDJSON, Parquet) or "; "-joined strings (CSV).
+    
+    Query params: format (ndjson, csv or parquet; default ndjson), gzip
+    (compress NDJSON/CSV; Parquet is always zstd-compressed internally),
+    version, min_score, include_duplicates (default true)
+    """
+    export_format = request.args.get('format', 'ndjson').lower()
+    if export_format not in EXPORT_FORMATS:
+        return jsonify({"error": f"format must be one of: {', '.join(EXPORT_FORMATS)}"}), 400
+    if export_format == 'parquet':
+        try:
+            import pyarrow  # noqa: F401
+        except ImportError:
+            return jsonify({"error": "Parquet export requires pyarrow"}), 501
+    compress = parse_flag(request.args.get('gzip', 'false')) and export_format != 'parquet'
+    
+    with get_db_connection() as conn:
+        job = conn.execute("SELECT result_version FROM jobs WHERE id=?", (job_id,)).fetchone()
+    if not job:
+        return jsonify({"error": "Job not found"}), 404
+    version = request.args.get('version', type=int) or job[0]
+    
+    batches = iter_candidate_batches(job_id, version, request.args.get('min_score', type=float),
+                                     parse_flag(request.args.get('include_duplicates', 'true')))
+    chunks = ENCODERS[export_format](batches)
+    mimetype, extension = EXPORT_FORMATS[export_format]
+    filename = f"job_{job_id}_v{version}.{extension}"
+    if compress:
+        chunks = gzip_chunks(chunks)
+        mimetype, filename = 'application/gzip', filename + '.gz'
+    
+    return Response(chunks, mimetype=mimetype,
+                    headers={'Content-Disposition': f'attachment; filename="{filename}"',
+                             'X-Accel-Buffering': 'no'})
+
+@app.route('/shortlist/<job_id>', methods=['GET'])
+def get_shortlist(job_id):
+    with get_db_connection() as conn:
+        conn.row_factory = sqlite3.Row
+        c = conn.cursor()
+        
+        c.execute("SELECT status, processed_files, total_files, result_version FROM jobs WHERE id=?", (job_id,))
+        job = c.fetchone()
+        # Serve the latest complete result version unless an older one is requested
+        version = request.args.get('version', type=int) or (job['result_version'] if job else 1)
+        # Get top 5 with score > 0
+        candidates = top_candidates(conn, job_id, version)
+
+    return jsonify({
+        "status": job['status'] if job else 'Unknown',
+        "progress": f"{job['processed_files']}/{job['total_files']}" if job else "0/0",
+        "version": version,
+        "top_5": candidates
+    })
+
+@app.route('/job-status/<job_id>', methods=['GET'])
+def get_job_status(job_id):
+    with get_db_connection() as conn:
+        conn.row_factory = sqlite3.Row
+        c = conn.cursor()
+        
+        c.execute("""SELECT status, processed_files, total_files, short_circuited, cascade_top, cascade_refined, 
+                            phase, error FROM jobs WHERE id=?""", (job_id,))
+        job = c.fetchone()
+    
+    if job:
+        status = {
+            "status": job['status'],
+            "processed": job['processed_files'],
             "total": job['total_files'],
-            "percentage": round((job['processed_files'] / job['total_files']) * 100, 1) if job['total_files'] > 0 else 0
-        })
+            "percentage": progress_percentage(job['processed_files'], job['total_files']),
+            "short_circuited": job['short_circuited'] or 0
+        }
+        status.update(job_stage(job['status'], job['phase'], job['error']))
+        if job['cascade_top'] is not None:
+            status["cascade"] = cascade_status(job['cascade_top'], job['cascade_refined'])
+        return jsonify(status)
     else:
         return jsonify({"error": "Job not found"}), 404
 
+def format_sse(event, data, event_id=None):
+    message = f"id: {event_id}\n" if event_id is not None else ""
+    return message + f"event: {event}\ndata: {json.dumps(data)}\n\n"
+
+@app.route('/jobs/<int:job_id>/events', methods=['GET'])
+def job_events(job_id):
+    """
+    Server-Sent Events stream of a job's progress
+    
+    Sends a 'progress' event per committed chunk (processed/total, throughput,
+    current top 5) and ends with 'complete' or 'failed'. Reconnecting clients
+    send Last-Event-ID and only receive the latest newer snapshot.
+    """
+    last_event_id = request.headers.get('Last-Event-ID', type=int) or request.args.get('last_event_id', 0, type=int)
+    
+    with get_db_connection() as conn:
+        snapshot = job_snapshot(conn, job_id)
+        if snapshot is None:
+            return jsonify({"error": "Job not found"}), 404
+        latest = get_latest_job_event(conn, job_id, last_event_id)
+    
+    # The client already saw the final event: 204 tells EventSource to stop reconnecting
+    if last_event_id and latest is None and snapshot['status'] in ('Completed', 'Failed'):
+        return Response(status=204)
+    
+    def stream():
+        last_sent = last_event_id
+        if latest is None and not last_event_id:
+            # Queued, or finished before events were recorded: start from the current state
+            event = {'Completed': 'complete', 'Failed': 'failed'}.get(snapshot['status'], 'progress')
+            yield format_sse(event, snapshot)
+            if event != 'progress':
+                return
+        
+        if latest:
+            last_sent, event, data = latest
+            yield format_sse(event, data, last_sent)
+            if event in ('complete', 'failed'):
+                return
+        
+        idle_since = time.time()
+        # Events come from the process's poller, which queries once for all of the job's streams
+        with watch_job_events(job_id) as signal:
+            while True:
+                newest = signal.wait_newer(last_sent, max(0, idle_since + SSE_KEEPALIVE_SECONDS - time.time()))
+                if newest:
+                    last_sent, event, data = newest
+                    yield format_sse(event, data, last_sent)
+                    if event in ('complete', 'failed'):
+                        return
+                    idle_since = time.time()
+                elif time.time() - idle_since >= SSE_KEEPALIVE_SECONDS:
+                    # Comment line: keeps proxies from timing out and detects closed clients
+                    yield ": keep-alive\n\n"
+                    idle_since = time.time()
+    
+    return Response(stream(), mimetype='text/event-stream',
+                    headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'})
+
+@app.route('/metrics', methods=['GET'])
+def prometheus_metrics():
+    """Prometheus scrape endpoint: stage latency histograms and file counters over all jobs, plus queue gauges"""
+    with get_db_connection() as conn:
+        series = get_job_metrics(conn)
+        queue_depth = get_queue_depth(conn)
+        jobs_by_status = dict(conn.execute("SELECT status, COUNT(*) FROM jobs GROUP BY status").fetchall())
+    
+    gauges = [
+        ("queue_entries", "Job queue entries by status",
+         {(("status", status),): count for status, count in queue_depth.items()}),
+        ("jobs_in_flight", "Jobs currently being processed",
+         {(): jobs_by_status.get('Processing', 0)}),
+        ("jobs", "Jobs by status",
+         {(("status", status),): count for status, count in jobs_by_status.items()}),
+    ]
+    return Response(render_prometheus(series, gauges), mimetype='text/plain; version=0.0.4')
+
+@app.route('/jobs/<int:job_id>/metrics', methods=['GET'])
+def job_metrics(job_id):
+    """Stored stage timings and counters of one job"""
+    with get_db_connection() as conn:
+        series = get_job_metrics(conn, job_id)
+    
+    metrics = {}
+    for (name, labels), values in sorted(series.items()):
+        entry = {"labels": dict(labels), "count": values['count']}
+        if 'buckets' in values:
+            entry["seconds"] = round(values['sum'], 6)
+            entry["mean_ms"] = round(values['sum'] * 1000 / values['count'], 3) if values['count'] else 0
+        metrics.setdefault(name, []).append(entry)
+    return jsonify({"job_id": job_id, "metrics": metrics})
+
+@app.route('/cache/stats', methods=['GET'])
+def cache_stats():
+    """Extracted-text cache size and hit/miss counters"""
+    with get_db_connection() as conn:
+        stats = get_text_cache_stats(conn)
+    stats["max_bytes"] = TEXT_CACHE_MAX_BYTES
+    return jsonify(stats)
+
+@app.route('/pdf/stats', methods=['GET'])
+def pdf_stats():
+    """Per-backend PDF extraction timings, for picking the fastest accurate backend"""
+    with get_db_connection() as conn:
+        backends = get_pdf_backend_stats(conn)
+    return jsonify({
+        "active_backend": PDF_BACKEND,
+        "max_pages": PDF_MAX_PAGES,
+        "max_chars": PDF_MAX_CHARS,
+        "backends": backends
+    })
+
 @app.route('/health', methods=['GET'])
 def health_check():
     """Health check endpoint for monitoring and container orchestration"""
@@ -458,9 +2906,20 @@ if __name__ == '__main__':
     print("Starting SmartHire 2.0 Server...")
     print("Available endpoints:")
     print("  POST /upload-zip - Upload ZIP with CVs")
+    print("  POST /upload-zip/multi - Screen one ZIP against several job descriptions")
+    print("  POST /jobs/<job_id>/rescore - Rescore a job with a new description")
+    print("  GET /pool - Talent pool size and saved segments")
+    print("  POST /pool/segments - Save a subset of the talent pool")
+    print("  POST /pool/screen - Screen the talent pool for a new job")
     print("  GET /shortlist/<job_id> - Get top 5 candidates")
+    print("  GET /jobs/<job_id>/candidates - Page through candidates by score")
     print("  GET /debug/job/<job_id> - Debug all candidates")
     print("  GET /job-status/<job_id> - Check progress")
+    print("  GET /jobs/<job_id>/events - Live progress (Server-Sent Events)")
+    print("  GET /metrics - Prometheus metrics")
+    print("  GET /jobs/<job_id>/metrics - Stage timings of one job")
+    print("  GET /cache/stats - Extracted-text cache statistics")
+    print("  GET /pdf/stats - PDF backend timings")
     print("  GET /health - Health check")
     print(f"Frontend URL: {FRONTEND_URL}")
     
@@ -0,0 +1,79 @@
+# chunked_upload.py
+import hashlib, math, os
+
+# Resumable uploads (/uploads): an archive is sent as numbered chunks of
+# UPLOAD_CHUNK_BYTES (each one request, so under MAX_CONTENT_LENGTH), written
+# in place into a file preallocated to the archive's size
+UPLOAD_CHUNK_BYTES = int(os.getenv('UPLOAD_CHUNK_BYTES', 8 * 1024 * 1024))
+UPLOAD_MIN_CHUNK_BYTES = 64 * 1024
+MAX_UPLOAD_BYTES = int(os.getenv('MAX_UPLOAD_BYTES', 4 * 1024 ** 3))
+# Sessions idle this long are deleted, unfinished ones with their partial file
+UPLOAD_SESSION_HOURS = float(os.getenv('UPLOAD_SESSION_HOURS', 24))
+
+# Request bodies are copied to disk in pieces of this size
+_COPY_BYTES = 1024 * 1024
+
+
+class ChunkError(ValueError):
+    """A chunk whose bytes do not match its expected length or checksum"""
+
+
+def chunk_count(size, chunk_size):
+    return max(1, math.ceil(size / chunk_size))
+
+def chunk_length(size, chunk_size, index):
+    """Bytes in chunk `index` of a `size`-byte upload (the last one holds the remainder)"""
+    return min(chunk_size, size - index * chunk_size)
+
+def create_part_file(path, size):
+    """Preallocate the file chunks are written into (sparse, so nothing is written yet)"""
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, 'wb') as f:
+        f.truncate(size)
+
+def write_chunk(path, offset, stream, length, sha256):
+    """
+    Copy `length` bytes of a request body into the part file at `offset`
+
+    The body is hashed while it is copied, a piece at a time, and synced
+    to disk before returning, so a chunk recorded as received survives a
+    crash. Raises ChunkError if the body is short or its SHA-256 (hex)
+    differs. The bytes are written before they are checked, so the caller
+    must stop counting the chunk as received until this returns.
+    """
+    digest = hashlib.sha256()
+    remaining = length
+    with open(path, 'r+b') as f:
+        f.seek(offset)
+        while remaining:
+            piece = stream.read(min(_COPY_BYTES, remaining))
+            if not piece:
+                raise ChunkError(f"Chunk ended after {length - remaining} of {length} bytes")
+            digest.update(piece)
+            f.write(piece)
+            remaining -= len(piece)
+        if digest.hexdigest() != sha256.lower():
+            raise ChunkError("Chunk checksum mismatch, send it again")
+        f.flush()
+        os.fsync(f.fileno())
+
+def corrupt_chunks(path, chunk_size, hashes):
+    """
+    Indices of the chunks whose bytes in the part file no longer match the
+    SHA-256 recorded when they arrived (hashes: {index: hex digest})
+    """
+    corrupt = []
+    with open(path, 'rb') as f:
+        for index, sha256 in sorted(hashes.items()):
+            f.seek(index * chunk_size)
+            digest = hashlib.sha256()
+            remaining = chunk_size
+            while remaining:
+                piece = f.read(min(_COPY_BYTES, remaining))
+                if not piece:
+                    break
+                digest.update(piece)
+                remaining -= len(piece)
+            if digest.hexdigest() != sha256:
+                corrupt.append(index)
+    return corrupt
@@ -1,38 +1,570 @@
-import sqlite3
+import os, json, sqlite3, threading, time
+from contextlib import contextmanager
 
-DB_PATH = "smarthire.db"
+DB_PATH = os.getenv('DB_PATH', "smarthire.db")
+
+# Per-connection tuning (the database itself is switched to WAL by init_db)
+SQLITE_CACHE_MB = int(os.getenv('SQLITE_CACHE_MB', 64))  # page cache per connection
+SQLITE_MMAP_MB = int(os.getenv('SQLITE_MMAP_MB', 256))  # memory-mapped reads (0 = off)
+# Idle connections each thread keeps for reuse
+SQLITE_POOL_SIZE = int(os.getenv('SQLITE_POOL_SIZE', 2))
+
+# Queue entries are given up on after this many claims (e.g. repeated worker crashes)
+QUEUE_MAX_ATTEMPTS = int(os.getenv('QUEUE_MAX_ATTEMPTS', 3))
+
+def connect():
+    """Open a tuned connection to DB_PATH"""
+    conn = sqlite3.connect(DB_PATH, timeout=30.0)
+    # In WAL mode NORMAL only syncs at checkpoints: commits survive an app crash,
+    # and the last few can be lost on power failure, never corrupting the file
+    conn.execute("PRAGMA synchronous=NORMAL")
+    conn.execute(f"PRAGMA cache_size=-{SQLITE_CACHE_MB * 1024}")
+    conn.execute(f"PRAGMA mmap_size={SQLITE_MMAP_MB * 1024 * 1024}")
+    conn.execute("PRAGMA temp_store=MEMORY")
+    return conn
+
+# Idle connections per thread (and per database path), reused by pooled_connection()
+_pool = threading.local()
+
+@contextmanager
+def pooled_connection():
+    """
+    Borrow a connection from this thread's pool, returning it on exit
+    
+    Nested borrows get separate connections. On return, an uncommitted
+    transaction is rolled back and row_factory is reset, so the next borrower
+    starts clean; connections beyond SQLITE_POOL_SIZE idle ones are closed.
+    """
+    pools = getattr(_pool, 'pools', None)
+    if pools is None:
+        pools = _pool.pools = {}
+    idle = pools.setdefault(DB_PATH, [])
+    conn = idle.pop() if idle else connect()
+    try:
+        yield conn
+    finally:
+        try:
+            if conn.in_transaction:
+                conn.rollback()
+            conn.row_factory = None
+            reusable = len(idle) < SQLITE_POOL_SIZE
+        except sqlite3.Error:
+            reusable = False
+        if reusable:
+            idle.append(conn)
+        else:
+            conn.close()
+
+def close_pooled_connections():
+    """Close this thread's idle connections (e.g. before the thread exits or DB_PATH changes)"""
+    for idle in getattr(_pool, 'pools', {}).values():
+        while idle:
+            idle.pop().close()
+
+
+# --- Schema migrations ---
+def _add_columns(c, table, columns):
+    """Add the (name, definition) columns a table created by an older release lacks"""
+    existing = {row[1] for row in c.execute(f"PRAGMA table_info({table})")}
+    for column, definition in columns:
+        if column not in existing:
+            c.execute(f"ALTER TABLE {table} ADD COLUMN {column} {definition}")
+
+def _migration_1_base_schema(c):
+    """Schema as of the first versioned release; databases created before versioning are brought up to it"""
+    # Create jobs table
+    c.execute('''CREATE TABLE IF NOT EXISTS jobs 
+                 (id INTEGER PRIMARY KEY AUTOINCREMENT, 
+                  title TEXT, 
+                  description TEXT, 
+                  status TEXT, 
+                  total_files INTEGER DEFAULT 0,
+                  processed_files INTEGER DEFAULT 0)''')
+    
+    # Create candidates table
+    c.execute('''CREATE TABLE IF NOT EXISTS candidates 
+                 (id INTEGER PRIMARY KEY AUTOINCREMENT, 
+                  job_id INTEGER, 
+                  filename TEXT, 
+                  score REAL, 
+                  missing_skills TEXT, 
+                  is_shortlisted BOOLEAN)''')
+    
+    # Columns for rescoring: must-haves and the served result version per job
+    # (plus strict must-have mode and how many resumes it rejected unscored),
+    # skill hits, content hash and result version per candidate; duplicate_of
+    # links a duplicate resume to the candidate that was scored in its place
+    _add_columns(c, "jobs", (
+        ("must_haves", "TEXT"),
+        ("result_version", "INTEGER DEFAULT 1"),
+        ("strict_must_haves", "INTEGER DEFAULT 0"),
+        ("short_circuited", "INTEGER DEFAULT 0"),
+    ))
+    _add_columns(c, "candidates", (
+        ("found_skills", "TEXT"),
+        ("content_hash", "TEXT"),
+        ("version", "INTEGER DEFAULT 1"),
+        ("duplicate_of", "INTEGER"),
+    ))
+    
+    # Shortlists, paginated listings and exports walk a job's results in score
+    # order: a range scan of this index that stops at the LIMIT, however many
+    # candidates other jobs have accumulated
+    c.execute("""CREATE INDEX IF NOT EXISTS idx_candidates_job_score 
+                 ON candidates (job_id, version, score DESC, id DESC)""")
+    # Duplicates are linked to their representative by content hash
+    c.execute("CREATE INDEX IF NOT EXISTS idx_candidates_job_hash ON candidates (job_id, version, content_hash)")
+    
+    # Talent pool: every CV ever screened, stored once per content hash with the
+    # features scoring needs, so rescoring and screening the pool for a new job
+    # never re-extract. text and terms (term counts as JSON) are zlib-compressed,
+    # skills is the JSON list of skill hits, fingerprint is dedup.fingerprint().
+    # Features left NULL (e.g. for duplicates, which are not scored) are filled in
+    # the first time the CV is scored from the pool.
+    c.execute('''CREATE TABLE IF NOT EXISTS talent_pool 
+                 (id INTEGER PRIMARY KEY AUTOINCREMENT, 
+                  content_hash TEXT UNIQUE, 
+                  filename TEXT, 
+                  text BLOB, 
+                  skills TEXT, 
+                  terms BLOB, 
+                  fingerprint BLOB, 
+                  added_at REAL)''')
+    
+    # Superseded by talent_pool: carry retained texts over once
+    c.execute("SELECT 1 FROM sqlite_master WHERE type='table' AND name='resume_texts'")
+    if c.fetchone():
+        c.execute("""INSERT OR IGNORE INTO talent_pool (content_hash, filename, text, added_at) 
+                     SELECT rt.content_hash, 
+                            COALESCE((SELECT filename FROM candidates WHERE content_hash = rt.content_hash LIMIT 1), 
+                                     rt.content_hash), 
+                            rt.text, ? 
+                     FROM resume_texts rt""", (time.time(),))
+        c.execute("DROP TABLE resume_texts")
+    
+    # Saved subsets of the talent pool that a job can be screened against
+    c.execute('''CREATE TABLE IF NOT EXISTS pool_segments 
+                 (id INTEGER PRIMARY KEY AUTOINCREMENT, 
+                  name TEXT, 
+                  created_at REAL)''')
+    c.execute('''CREATE TABLE IF NOT EXISTS pool_segment_members 
+                 (segment_id INTEGER, 
+                  content_hash TEXT, 
+                  PRIMARY KEY (segment_id, content_hash))''')
+    
+    # Extracted CV text keyed by SHA-256 of the file bytes (LRU by last_access)
+    c.execute('''CREATE TABLE IF NOT EXISTS text_cache 
+                 (content_hash TEXT PRIMARY KEY, 
+                  text TEXT, 
+                  size INTEGER, 
+                  last_access REAL)''')
+    c.execute("CREATE INDEX IF NOT EXISTS idx_text_cache_last_access ON text_cache (last_access)")
+    
+    # Single-row counters shared by every process using the cache
+    c.execute('''CREATE TABLE IF NOT EXISTS text_cache_stats 
+                 (id INTEGER PRIMARY KEY CHECK (id = 1), 
+                  hits INTEGER DEFAULT 0, 
+                  misses INTEGER DEFAULT 0, 
+                  evictions INTEGER DEFAULT 0)''')
+    c.execute("INSERT OR IGNORE INTO text_cache_stats (id) VALUES (1)")
+    
+    # Durable job queue: workers claim an entry with a lease and keep it alive
+    # with heartbeats; an entry whose lease expired is claimed again and resumed
+    c.execute('''CREATE TABLE IF NOT EXISTS job_queue 
+                 (id INTEGER PRIMARY KEY AUTOINCREMENT, 
+                  job_id INTEGER, 
+                  kind TEXT, 
+                  payload TEXT, 
+                  status TEXT DEFAULT 'queued', 
+                  attempts INTEGER DEFAULT 0, 
+                  worker_id TEXT, 
+                  lease_expires REAL, 
+                  heartbeat_at REAL, 
+                  created_at REAL, 
+                  finished_at REAL, 
+                  error TEXT)''')
+    c.execute("CREATE INDEX IF NOT EXISTS idx_job_queue_status ON job_queue (status, lease_expires)")
+    
+    # Cumulative PDF extraction timings per backend
+    c.execute('''CREATE TABLE IF NOT EXISTS pdf_backend_stats 
+                 (backend TEXT PRIMARY KEY, 
+                  calls INTEGER DEFAULT 0, 
+                  failures INTEGER DEFAULT 0, 
+                  pages INTEGER DEFAULT 0, 
+                  seconds REAL DEFAULT 0)''')
+    
+    # Progress events streamed by /jobs/<id>/events; the id doubles as the SSE event id
+    c.execute('''CREATE TABLE IF NOT EXISTS job_events 
+                 (id INTEGER PRIMARY KEY AUTOINCREMENT, 
+                  job_id INTEGER, 
+                  event TEXT, 
+                  data TEXT, 
+                  created_at REAL)''')
+    c.execute("CREATE INDEX IF NOT EXISTS idx_job_events_job ON job_events (job_id, id)")
+    
+    # Stage timings and counters per job (metrics.py series); job_id 0 accumulates
+    # the totals of every job, which /metrics serves
+    c.execute('''CREATE TABLE IF NOT EXISTS job_metrics 
+                 (job_id INTEGER, 
+                  name TEXT, 
+                  labels TEXT, 
+                  count REAL DEFAULT 0, 
+                  sum REAL DEFAULT 0, 
+                  buckets TEXT, 
+                  PRIMARY KEY (job_id, name, labels))''')
+
+def _migration_2_cascade(c):
+    """Two-phase ranking: provisional candidates, and how many of a job's best are fully scored"""
+    _add_columns(c, "candidates", (("provisional", "INTEGER DEFAULT 0"),))
+    _add_columns(c, "jobs", (("cascade_top", "INTEGER"), ("cascade_refined", "INTEGER DEFAULT 0")))
+    # Refined scores are copied to the duplicates of each refined candidate
+    c.execute("""CREATE INDEX IF NOT EXISTS idx_candidates_duplicate_of 
+                 ON candidates (duplicate_of) WHERE duplicate_of IS NOT NULL""")
+
+def _migration_3_job_phase(c):
+    """Stage of a processing job (Extracting, Scoring, Refining), and why a failed one failed"""
+    _add_columns(c, "jobs", (("phase", "TEXT"), ("error", "TEXT")))
+
+def _migration_4_upload_sessions(c):
+    """Chunked uploads (/uploads): a session per archive, and the chunks received so far"""
+    c.execute('''CREATE TABLE IF NOT EXISTS upload_sessions 
+                 (id TEXT PRIMARY KEY, 
+                  filename TEXT, 
+                  size INTEGER, 
+                  chunk_size INTEGER, 
+                  total_chunks INTEGER, 
+                  status TEXT DEFAULT 'open', 
+                  job_ids TEXT, 
+                  created_at REAL, 
+                  updated_at REAL)''')
+    c.execute('''CREATE TABLE IF NOT EXISTS upload_chunks 
+                 (upload_id TEXT, 
+                  chunk_index INTEGER, 
+                  sha256 TEXT, 
+                  PRIMARY KEY (upload_id, chunk_index))''')
+
+def _migration_5_text_cache_size(c):
+    """Running entry and byte counts of the text cache, so writes never sum the table"""
+    _add_columns(c, "text_cache_stats", (("entries", "INTEGER DEFAULT 0"), ("bytes", "INTEGER DEFAULT 0")))
+    c.execute("""UPDATE text_cache_stats 
+                 SET entries=(SELECT COUNT(*) FROM text_cache), bytes=(SELECT COALESCE(SUM(size), 0) FROM text_cache) 
+                 WHERE id=1""")
+
+def _migration_6_minhash_rehash(c):
+    """Shingle hashing of dedup.fingerprint() changed; stored fingerprints are recomputed on next use"""
+    c.execute("UPDATE talent_pool SET fingerprint=NULL")
+
+# Applied in order; PRAGMA user_version records how many a database has had.
+# Append new migrations, never edit released ones.
+MIGRATIONS = (
+    _migration_1_base_schema,
+    _migration_2_cascade,
+    _migration_3_job_phase,
+    _migration_4_upload_sessions,
+    _migration_5_text_cache_size,
+    _migration_6_minhash_rehash,
+)
+
+def migrate(conn):
+    """Apply pending MIGRATIONS, each in its own transaction with the version bump"""
+    while True:
+        # The write lock is taken before reading the version, so processes starting
+        # together (web tier and workers) apply each migration exactly once
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            version = conn.execute("PRAGMA user_version").fetchone()[0]
+            if version >= len(MIGRATIONS):
+                conn.commit()
+                return version
+            MIGRATIONS[version](conn.cursor())
+            conn.execute(f"PRAGMA user_version={version + 1}")
+            conn.commit()
+        except Exception:
+            conn.rollback()
+            raise
 
 def init_db():
-    """Initialize database with proper connection handling"""
-    conn = sqlite3.connect(DB_PATH)
+    """Switch the database to WAL and bring its schema up to date"""
+    conn = connect()
     try:
-        c = conn.cursor()
-        
-        # Create jobs table
-        c.execute('''CREATE TABLE IF NOT EXISTS jobs 
-                     (id INTEGER PRIMARY KEY AUTOINCREMENT, 
-                      title TEXT, 
-                      description TEXT, 
-                      status TEXT, 
-                      total_files INTEGER DEFAULT 0,
-                      processed_files INTEGER DEFAULT 0)''')
-        
-        # Create candidates table
-        c.execute('''CREATE TABLE IF NOT EXISTS candidates 
-                     (id INTEGER PRIMARY KEY AUTOINCREMENT, 
-                      job_id INTEGER, 
-                      filename TEXT, 
-                      score REAL, 
-                      missing_skills TEXT, 
-                      is_shortlisted BOOLEAN)''')
+        # Persistent: readers (progress polls, shortlists) no longer wait for job commits
+        conn.execute("PRAGMA journal_mode=WAL")
+        migrate(conn)
+    finally:
+        conn.close()
+
+# --- Talent pool ---
+def add_to_talent_pool(conn, entries):
+    """
+    Add CVs to the talent pool, or fill in features missing for ones already there
+    
+    entries are (content_hash, filename, text, skills, terms, fingerprint) with
+    None for anything not known; stored values are never overwritten.
+    """
+    conn.executemany(
+        """INSERT INTO talent_pool (content_hash, filename, text, skills, terms, fingerprint, added_at) 
+           VALUES (?, ?, ?, ?, ?, ?, ?) 
+           ON CONFLICT (content_hash) DO UPDATE SET 
+               text = COALESCE(talent_pool.text, excluded.text), 
+               skills = COALESCE(talent_pool.skills, excluded.skills), 
+               terms = COALESCE(talent_pool.terms, excluded.terms), 
+               fingerprint = COALESCE(talent_pool.fingerprint, excluded.fingerprint)""",
+        [entry + (time.time(),) for entry in entries]
+    )
+
+def get_talent_pool_stats(conn):
+    """CV count, how many have every feature stored, and stored bytes"""
+    row = conn.execute("""SELECT COUNT(*), 
+                                 COUNT(CASE WHEN skills IS NOT NULL AND terms IS NOT NULL 
+                                            AND fingerprint IS NOT NULL THEN 1 END), 
+                                 COALESCE(SUM(LENGTH(text)), 0), 
+                                 COALESCE(SUM(LENGTH(terms)), 0) 
+                          FROM talent_pool""").fetchone()
+    segments = conn.execute("""SELECT s.id, s.name, s.created_at, COUNT(m.content_hash) 
+                               FROM pool_segments s LEFT JOIN pool_segment_members m ON m.segment_id = s.id 
+                               GROUP BY s.id ORDER BY s.id""").fetchall()
+    return {
+        "cvs": row[0],
+        "with_features": row[1],
+        "text_bytes": row[2],
+        "term_bytes": row[3],
+        "segments": [{"id": seg_id, "name": name, "created_at": created_at, "size": size}
+                     for seg_id, name, created_at, size in segments]
+    }
+
+def create_pool_segment(conn, name, content_hashes):
+    """Save a subset of the talent pool under a name; returns the segment id (not committed)"""
+    c = conn.cursor()
+    c.execute("INSERT INTO pool_segments (name, created_at) VALUES (?, ?)", (name, time.time()))
+    segment_id = c.lastrowid
+    c.executemany("INSERT OR IGNORE INTO pool_segment_members (segment_id, content_hash) VALUES (?, ?)",
+                  [(segment_id, content_hash) for content_hash in content_hashes])
+    return segment_id
+
+# --- Extracted text cache ---
+def get_cached_texts(conn, content_hashes):
+    """Return {content_hash: text} for the hashes present in the cache"""
+    content_hashes = list(content_hashes)
+    found = {}
+    # Stay well below SQLite's bound-parameter limit
+    for i in range(0, len(content_hashes), 500):
+        batch = content_hashes[i:i + 500]
+        placeholders = ",".join("?" * len(batch))
+        rows = conn.execute(
+            f"SELECT content_hash, text FROM text_cache WHERE content_hash IN ({placeholders})", batch
+        ).fetchall()
+        found.update(rows)
+    return found
+
+def update_text_cache(conn, new_texts, hit_hashes, misses, max_bytes):
+    """
+    Record one batch of cache activity (committed with the caller's commit)
+    
+    Args:
+        conn: Open database connection
+        new_texts: {content_hash: text} extracted on cache misses
+        hit_hashes: Hashes served from the cache (their last_access is refreshed)
+        misses: Number of lookups that had to parse the file
+        max_bytes: Size cap; least recently used entries are evicted above it
+    
+    The cache size is kept in text_cache_stats, so the table is only
+    scanned when entries have to be evicted.
+    """
+    now = time.time()
+    c = conn.cursor()
+    added = added_bytes = 0
+    for content_hash, text in new_texts.items():
+        size = len(text.encode('utf-8'))
+        # Another process may have cached the same bytes since the lookup
+        c.execute("INSERT OR IGNORE INTO text_cache (content_hash, text, size, last_access) VALUES (?, ?, ?, ?)",
+                  (content_hash, text, size, now))
+        if c.rowcount:
+            added += 1
+            added_bytes += size
+    c.executemany("UPDATE text_cache SET last_access=? WHERE content_hash=?",
+                  [(now, h) for h in hit_hashes])
+    
+    total_bytes = c.execute("SELECT bytes FROM text_cache_stats WHERE id=1").fetchone()[0] + added_bytes
+    evicted = evicted_bytes = 0
+    if total_bytes > max_bytes:
+        stale = []
+        for content_hash, size in c.execute("SELECT content_hash, size FROM text_cache ORDER BY last_access"):
+            if total_bytes - evicted_bytes <= max_bytes:
+                break
+            stale.append((content_hash,))
+            evicted_bytes += size
+        c.executemany("DELETE FROM text_cache WHERE content_hash=?", stale)
+        evicted = len(stale)
+    
+    c.execute("""UPDATE text_cache_stats 
+                 SET hits=hits+?, misses=misses+?, evictions=evictions+?, entries=entries+?, bytes=bytes+? 
+                 WHERE id=1""",
+              (len(hit_hashes), misses, evicted, added - evicted, added_bytes - evicted_bytes))
+
+def record_pdf_backend_timings(conn, timings):
+    """Add per-backend timing deltas from pdf_engine (committed with the caller's commit)"""
+    c = conn.cursor()
+    for backend, stats in timings.items():
+        c.execute("INSERT OR IGNORE INTO pdf_backend_stats (backend) VALUES (?)", (backend,))
+        c.execute("""UPDATE pdf_backend_stats 
+                     SET calls=calls+?, failures=failures+?, pages=pages+?, seconds=seconds+? 
+                     WHERE backend=?""",
+                  (stats['calls'], stats['failures'], stats['pages'], stats['seconds'], backend))
+
+def get_pdf_backend_stats(conn):
+    """Return cumulative timings per PDF backend"""
+    rows = conn.execute("SELECT backend, calls, failures, pages, seconds FROM pdf_backend_stats ORDER BY backend")
+    return {
+        backend: {
+            "calls": calls,
+            "failures": failures,
+            "pages": pages,
+            "seconds": round(seconds, 3),
+            "ms_per_file": round(seconds * 1000 / calls, 2) if calls else 0,
+            "ms_per_page": round(seconds * 1000 / pages, 2) if pages else 0
+        }
+        for backend, calls, failures, pages, seconds in rows
+    }
+
+def get_text_cache_stats(conn):
+    """Return cache size and hit/miss counters"""
+    entries, total_bytes, hits, misses, evictions = conn.execute(
+        "SELECT entries, bytes, hits, misses, evictions FROM text_cache_stats WHERE id=1"
+    ).fetchone()
+    lookups = hits + misses
+    return {
+        "entries": entries,
+        "bytes": total_bytes,
+        "hits": hits,
+        "misses": misses,
+        "evictions": evictions,
+        "hit_rate": round(hits / lookups, 3) if lookups else 0
+    }
+
+
+# --- Job queue ---
+def enqueue_job(conn, job_id, kind, payload):
+    """Add a job to the queue and return the queue entry id"""
+    c = conn.cursor()
+    c.execute("INSERT INTO job_queue (job_id, kind, payload, status, created_at) VALUES (?, ?, ?, 'queued', ?)",
+              (job_id, kind, json.dumps(payload), time.time()))
+    conn.commit()
+    return c.lastrowid
+
+def claim_queue_item(conn, worker_id, lease_seconds, queue_id=None):
+    """
+    Atomically claim the oldest runnable queue entry (or a specific one)
+    
+    Runnable means queued, or running with an expired lease (its worker died).
+    Returns the entry as a dict, or None if there is nothing to claim.
+    """
+    now = time.time()
+    c = conn.cursor()
+    # IMMEDIATE takes the write lock up front so two workers cannot claim the same row
+    c.execute("BEGIN IMMEDIATE")
+    try:
+        query = """SELECT id, job_id, kind, payload, attempts FROM job_queue 
+                   WHERE (status='queued' OR (status='running' AND lease_expires < ?))"""
+        params = [now]
+        if queue_id is not None:
+            query += " AND id=?"
+            params.append(queue_id)
+        row = c.execute(query + " ORDER BY id LIMIT 1", params).fetchone()
+        if row is None:
+            conn.commit()
+            return None
         
-        # Check if found_skills column exists, if not add it
-        try:
-            c.execute("SELECT found_skills FROM candidates LIMIT 1")
-        except sqlite3.OperationalError:
-            # Column doesn't exist, add it
-            c.execute("ALTER TABLE candidates ADD COLUMN found_skills TEXT")
+        item = dict(zip(("id", "job_id", "kind", "payload", "attempts"), row))
+        if item["attempts"] >= QUEUE_MAX_ATTEMPTS:
+            c.execute("""UPDATE job_queue SET status='failed', finished_at=?, error='Too many attempts' 
+                         WHERE id=?""", (now, item["id"]))
+            c.execute("UPDATE jobs SET status='Failed' WHERE id=?", (item["job_id"],))
+            conn.commit()
+            return None
         
+        c.execute("""UPDATE job_queue SET status='running', worker_id=?, lease_expires=?, heartbeat_at=?, 
+                     attempts=attempts+1 WHERE id=?""", (worker_id, now + lease_seconds, now, item["id"]))
         conn.commit()
-    finally:
-        conn.close()
\ No newline at end of file
+    except Exception:
+        conn.rollback()
+        raise
+    item["payload"] = json.loads(item["payload"])
+    item["attempts"] += 1
+    return item
+
+def heartbeat_queue_item(conn, queue_id, worker_id, lease_seconds):
+    """Extend the lease; returns False if another worker has taken the entry over"""
+    now = time.time()
+    c = conn.cursor()
+    c.execute("""UPDATE job_queue SET lease_expires=?, heartbeat_at=? 
+                 WHERE id=? AND worker_id=? AND status='running'""",
+              (now + lease_seconds, now, queue_id, worker_id))
+    conn.commit()
+    return c.rowcount == 1
+
+def finish_queue_item(conn, queue_id, worker_id, status, error=None):
+    """Mark a claimed entry done or failed"""
+    conn.execute("""UPDATE job_queue SET status=?, error=?, finished_at=?, lease_expires=NULL 
+                    WHERE id=? AND worker_id=?""", (status, error, time.time(), queue_id, worker_id))
+    conn.commit()
+
+def get_queue_depth(conn):
+    """Return {status: count} for the job queue"""
+    return dict(conn.execute("SELECT status, COUNT(*) FROM job_queue GROUP BY status").fetchall())
+
+
+# --- Job progress events ---
+def add_job_event(conn, job_id, event, data):
+    """Record a progress event (committed with the caller's chunk commit) and return its id"""
+    c = conn.cursor()
+    c.execute("INSERT INTO job_events (job_id, event, data, created_at) VALUES (?, ?, ?, ?)",
+              (job_id, event, json.dumps(data), time.time()))
+    return c.lastrowid
+
+def get_latest_job_event(conn, job_id, after_id=0):
+    """Return the newest event after `after_id` as (id, event, data), or None
+
+    Every event carries a full snapshot of the job, so a client that fell
+    behind only needs the latest one.
+    """
+    row = conn.execute("SELECT id, event, data FROM job_events WHERE job_id=? AND id>? ORDER BY id DESC LIMIT 1",
+                       (job_id, after_id)).fetchone()
+    return (row[0], row[1], json.loads(row[2])) if row else None
+
+def prune_job_events(conn, job_id, keep_id):
+    """Drop a finished run's intermediate events, keeping only its final one"""
+    conn.execute("DELETE FROM job_events WHERE job_id=? AND id<?", (job_id, keep_id))
+
+
+# --- Job metrics ---
+def record_job_metrics(conn, job_id, series):
+    """Add metrics.pop_metrics() series to a job and to the all-jobs totals (committed by the caller)"""
+    c = conn.cursor()
+    for (name, labels), values in series.items():
+        labels_json = json.dumps(labels)
+        for target in (job_id, 0):
+            # The upsert takes the write lock first, so the bucket read-modify-write
+            # below cannot interleave with another process
+            c.execute("""INSERT INTO job_metrics (job_id, name, labels, count, sum) VALUES (?, ?, ?, ?, ?)
+                         ON CONFLICT (job_id, name, labels) 
+                         DO UPDATE SET count=count+excluded.count, sum=sum+excluded.sum""",
+                      (target, name, labels_json, values['count'], values['sum']))
+            if 'buckets' in values:
+                row = c.execute("SELECT buckets FROM job_metrics WHERE job_id=? AND name=? AND labels=?",
+                                (target, name, labels_json)).fetchone()
+                buckets = values['buckets']
+                if row[0]:
+                    buckets = [a + b for a, b in zip(json.loads(row[0]), buckets)]
+                c.execute("UPDATE job_metrics SET buckets=? WHERE job_id=? AND name=? AND labels=?",
+                          (json.dumps(buckets), target, name, labels_json))
+
+def get_job_metrics(conn, job_id=0):
+    """Return {(name, labels): {'count', 'sum', ['buckets']}} for a job (0 = all jobs)"""
+    series = {}
+    for name, labels, count, total, buckets in conn.execute(
+            "SELECT name, labels, count, sum, buckets FROM job_metrics WHERE job_id=?", (job_id,)):
+        values = {'count': count, 'sum': total}
+        if buckets:
+            values['buckets'] = json.loads(buckets)
+        series[(name, tuple(tuple(pair) for pair in json.loads(labels)))] = values
+    return series
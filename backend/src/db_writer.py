@@ -0,0 +1,101 @@
+# db_writer.py
+import os, queue, threading, time
+from concurrent.futures import Future
+
+from database import connect
+
+# A flush commits every write queued so far, waiting up to DB_WRITER_FLUSH_MS for
+# more to arrive, but never more than DB_WRITER_MAX_BATCH writes per transaction
+DB_WRITER_FLUSH_MS = float(os.getenv('DB_WRITER_FLUSH_MS', 20))
+DB_WRITER_MAX_BATCH = max(1, int(os.getenv('DB_WRITER_MAX_BATCH', 64)))
+
+
+class DatabaseWriter:
+    """
+    The one thread of a process that writes job results
+
+    Jobs submit writes as functions of a connection. The writer runs them in
+    submission order on its own connection, coalescing whatever is queued into
+    one transaction, so concurrent jobs share a few large commits instead of
+    queueing on SQLite's write lock. Each write runs under a savepoint: one that
+    raises is rolled back alone and its caller gets the exception, while the
+    others in the transaction still commit.
+    """
+
+    def __init__(self, flush_ms=DB_WRITER_FLUSH_MS, max_batch=DB_WRITER_MAX_BATCH, on_commit=None):
+        self.flush_seconds = flush_ms / 1000
+        self.max_batch = max_batch
+        # Called after each commit (e.g. to wake progress streams)
+        self.on_commit = on_commit
+        self.transactions = 0
+        self.writes = 0
+        self._queue = queue.Queue()
+        self._lock = threading.Lock()
+        self._thread = None
+
+    def submit(self, write):
+        """
+        Queue write(conn) and return a Future of (its result, seconds until committed)
+
+        The write must not commit or roll back itself.
+        """
+        future = Future()
+        self._ensure_started()
+        self._queue.put((write, future, time.perf_counter()))
+        return future
+
+    def run(self, write):
+        """Run write(conn) through the writer and wait for its commit; returns its result"""
+        return self.submit(write).result()[0]
+
+    def _ensure_started(self):
+        # Started on first use, so pool worker processes importing the app never start one
+        with self._lock:
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(target=self._loop, name='db-writer', daemon=True)
+                self._thread.start()
+
+    def _next_batch(self):
+        batch = [self._queue.get()]
+        deadline = time.perf_counter() + self.flush_seconds
+        while len(batch) < self.max_batch:
+            try:
+                batch.append(self._queue.get(timeout=max(0.0, deadline - time.perf_counter())))
+            except queue.Empty:
+                break
+        return batch
+
+    def _loop(self):
+        conn = connect()
+        while True:
+            batch = self._next_batch()
+            done = []
+            try:
+                conn.execute("BEGIN IMMEDIATE")
+                for write, future, submitted in batch:
+                    conn.execute("SAVEPOINT write")
+                    try:
+                        result = write(conn)
+                    except BaseException as e:
+                        conn.execute("ROLLBACK TO write")
+                        conn.execute("RELEASE write")
+                        future.set_exception(e)
+                        continue
+                    conn.execute("RELEASE write")
+                    done.append((future, result, submitted))
+                conn.commit()
+            except Exception as e:
+                # The transaction itself failed (e.g. disk full): none of it was stored
+                if conn.in_transaction:
+                    conn.rollback()
+                for _, future, _ in batch:
+                    if not future.done():
+                        future.set_exception(e)
+                continue
+            self.transactions += 1
+            self.writes += len(done)
+            if self.on_commit:
+                self.on_commit()
+            committed = time.perf_counter()
+            for future, result, submitted in done:
+                future.set_result((result, committed - submitted))
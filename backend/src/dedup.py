@@ -0,0 +1,149 @@
+# dedup.py
+import os, collections, hashlib
+import numpy as np
+
+# Duplicate detection is opt-in: fingerprinting every resume costs more than
+# the refinement and writes it saves unless uploads repeat many resumes
+DEDUP_ENABLED = os.getenv('DEDUP_ENABLED', 'False').lower() == 'true'
+
+# Estimated Jaccard similarity of word shingles above which two resumes are near-duplicates
+DEDUP_SIMILARITY = float(os.getenv('DEDUP_SIMILARITY', 0.9))
+
+SHINGLE_WORDS = 3
+# 8 bands x 8 rows: resumes with similarity 0.9 share a band ~99% of the time,
+# while unrelated resumes almost never do
+NUM_PERM = 64
+BANDS = 8
+ROWS = NUM_PERM // BANDS
+
+# Permutations are fixed so signatures agree across pool worker processes.
+# Each one is a multiply-shift hash: (a*x + b) wraps around 2**64 and its
+# high 32 bits are kept, so no modulo is needed
+_rng = np.random.RandomState(20240601)
+_PERM_A = _rng.randint(1, 1 << 62, size=NUM_PERM, dtype=np.uint64) * np.uint64(2) + np.uint64(1)
+_PERM_B = _rng.randint(0, 1 << 62, size=NUM_PERM, dtype=np.uint64)
+
+# Shingles are hashed as polynomials in _HASH_BASE over their UTF-8 bytes (mod
+# 2**64), all at once from prefix sums. The base is odd, so it has an inverse
+_HASH_BASE = 0x100000001b3
+_HASH_BASE_INVERSE = pow(_HASH_BASE, -1, 1 << 64)
+_SPACE = ord(' ')
+
+# Signatures of recently fingerprinted texts by digest, so an exact copy skips MinHash
+RECENT_SIGNATURES = 4096
+_recent = collections.OrderedDict()
+
+
+def normalize(text):
+    """Collapse whitespace so the PDF and DOCX of one CV compare equal"""
+    return " ".join(text.split())
+
+def _powers(base, n):
+    """base**0 .. base**(n-1) mod 2**64"""
+    powers = np.ones(n, dtype=np.uint64)
+    np.cumprod(np.full(n - 1, base, dtype=np.uint64), out=powers[1:])
+    return powers
+
+def shingle_hashes(normalized):
+    """64-bit hashes of the SHINGLE_WORDS-word shingles of normalized text (repeats included)"""
+    data = np.frombuffer(normalized.encode('utf-8'), dtype=np.uint8)
+    n = len(data)
+    # prefix[i] = sum of data[j] * base**j for j < i; a shingle [s, e) is
+    # (prefix[e] - prefix[s]) / base**s, the same wherever it occurs
+    prefix = np.zeros(n + 1, dtype=np.uint64)
+    np.cumsum(data * _powers(_HASH_BASE, n), out=prefix[1:])
+    spaces = np.flatnonzero(data == _SPACE)
+    starts = np.concatenate(([0], spaces + 1))
+    ends = np.concatenate((spaces, [n]))
+    if len(starts) > SHINGLE_WORDS:
+        starts, ends = starts[:1 - SHINGLE_WORDS], ends[SHINGLE_WORDS - 1:]
+    else:
+        starts, ends = starts[:1], ends[-1:]
+    hashes = (prefix[ends] - prefix[starts]) * _powers(_HASH_BASE_INVERSE, n + 1)[starts]
+    # Mix the low bits, which a polynomial mod 2**64 leaves weak
+    hashes ^= hashes >> np.uint64(33)
+    hashes *= np.uint64(0xff51afd7ed558ccd)
+    hashes ^= hashes >> np.uint64(33)
+    return hashes
+
+def minhash_signature(normalized):
+    """MinHash of the word shingles of normalized text, as a NUM_PERM uint32 array"""
+    permuted = np.multiply.outer(shingle_hashes(normalized), _PERM_A)
+    permuted += _PERM_B
+    # Minimum per permutation (repeated shingles do not change it); the shift keeps the order
+    return (permuted.min(axis=0) >> np.uint64(32)).astype(np.uint32)
+
+def fingerprint(text):
+    """Digest of the normalized text followed by its MinHash signature, as bytes to store"""
+    normalized = normalize(text)
+    digest = hashlib.sha1(normalized.encode('utf-8')).digest()
+    signature = _recent.get(digest)
+    if signature is None:
+        signature = _recent[digest] = minhash_signature(normalized).tobytes()
+        if len(_recent) > RECENT_SIGNATURES:
+            _recent.popitem(last=False)
+    else:
+        _recent.move_to_end(digest)
+    return digest + signature
+
+
+class DedupIndex:
+    """
+    Exact and near-duplicate lookup over the resumes of one job
+
+    Exact duplicates share the hash of their normalized text. Near-duplicates
+    are found through MinHash locality-sensitive hashing: each signature is
+    split into bands, resumes sharing any band are candidates, and candidates
+    are confirmed by their estimated Jaccard similarity. Only representatives
+    are indexed, so every duplicate links to the first resume of its cluster.
+
+    With max_size set, the index stops adding representatives once it holds
+    that many (later resumes are still checked against the ones indexed), so
+    memory stays bounded on very large archives.
+    """
+
+    def __init__(self, similarity=DEDUP_SIMILARITY, max_size=None):
+        self.similarity = similarity
+        self.max_size = max_size
+        self._exact = {}
+        self._signatures = {}
+        self._bands = [{} for _ in range(BANDS)]
+
+    def __len__(self):
+        return len(self._signatures)
+
+    def check(self, key, text):
+        """
+        Return (representative key, 'exact' or 'near') if `text` duplicates a
+        representative seen before; otherwise index it under `key` and return None
+        """
+        return self.check_fingerprint(key, fingerprint(text))
+
+    def check_fingerprint(self, key, print_bytes):
+        """Same as check(), for a fingerprint() computed earlier (e.g. stored in the talent pool)"""
+        digest = print_bytes[:20]
+        if digest in self._exact:
+            return self._exact[digest], 'exact'
+
+        signature = np.frombuffer(print_bytes, dtype=np.uint32, offset=20)
+        band_keys = [signature[i * ROWS:(i + 1) * ROWS].tobytes() for i in range(BANDS)]
+
+        # Ordered and de-duplicated so the choice between equal matches is deterministic
+        candidates = dict.fromkeys(
+            candidate for band, band_key in zip(self._bands, band_keys) for candidate in band.get(band_key, ())
+        )
+        best, best_similarity = None, 0.0
+        for candidate in candidates:
+            similarity = np.count_nonzero(self._signatures[candidate] == signature) / NUM_PERM
+            if similarity >= self.similarity and similarity > best_similarity:
+                best, best_similarity = candidate, similarity
+        if best is not None:
+            return best, 'near'
+
+        if self.max_size is not None and len(self._signatures) >= self.max_size:
+            return None
+        self._exact[digest] = key
+        self._signatures[key] = signature
+        for band, band_key in zip(self._bands, band_keys):
+            band.setdefault(band_key, []).append(key)
+        return None
@@ -0,0 +1,103 @@
+# export.py
+import csv, io, json, zlib
+
+# Columns of an exported candidate row, in output order
+EXPORT_COLUMNS = ('id', 'filename', 'score', 'missing_skills', 'found_skills', 'is_shortlisted',
+                  'content_hash', 'version', 'duplicate_of', 'provisional')
+# Stored as JSON text, exported as lists (joined with "; " in CSV)
+LIST_COLUMNS = ('missing_skills', 'found_skills')
+
+EXPORT_FORMATS = {
+    'ndjson': ('application/x-ndjson', 'ndjson'),
+    'csv': ('text/csv', 'csv'),
+    'parquet': ('application/vnd.apache.parquet', 'parquet'),
+}
+
+
+def expand_row(row):
+    """Decode the JSON list columns of a candidate row (a tuple in EXPORT_COLUMNS order)"""
+    record = dict(zip(EXPORT_COLUMNS, row))
+    for column in LIST_COLUMNS:
+        record[column] = json.loads(record[column]) if record[column] else []
+    return record
+
+
+# --- Encoders: each turns an iterable of row batches into an iterable of bytes ---
+def ndjson_chunks(batches):
+    for batch in batches:
+        yield "".join(json.dumps(expand_row(row)) + "\n" for row in batch).encode('utf-8')
+
+def csv_chunks(batches):
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(EXPORT_COLUMNS)
+    for batch in batches:
+        for row in batch:
+            record = expand_row(row)
+            for column in LIST_COLUMNS:
+                record[column] = "; ".join(record[column])
+            writer.writerow(record[column] for column in EXPORT_COLUMNS)
+        yield buffer.getvalue().encode('utf-8')
+        buffer.seek(0)
+        buffer.truncate()
+    if buffer.tell():
+        yield buffer.getvalue().encode('utf-8')
+
+
+class _DrainableSink(io.RawIOBase):
+    """Write-only file that hands back what was written since the last drain()"""
+
+    def __init__(self):
+        self._parts = []
+        self._position = 0
+
+    def writable(self):
+        return True
+
+    def write(self, data):
+        self._parts.append(bytes(data))
+        self._position += len(data)
+        return len(data)
+
+    def tell(self):
+        return self._position
+
+    def drain(self):
+        data = b"".join(self._parts)
+        self._parts = []
+        return data
+
+def parquet_chunks(batches):
+    """One Parquet row group per batch; bytes are sent as each group is written"""
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+
+    schema = pa.schema([
+        ('id', pa.int64()), ('filename', pa.string()), ('score', pa.float64()),
+        ('missing_skills', pa.list_(pa.string())), ('found_skills', pa.list_(pa.string())),
+        ('is_shortlisted', pa.bool_()), ('content_hash', pa.string()), ('version', pa.int64()),
+        ('duplicate_of', pa.int64()), ('provisional', pa.bool_()),
+    ])
+    sink = _DrainableSink()
+    with pq.ParquetWriter(sink, schema, compression='zstd') as writer:
+        for batch in batches:
+            records = [expand_row(row) for row in batch]
+            for record in records:
+                record['is_shortlisted'] = bool(record['is_shortlisted'])
+                record['provisional'] = bool(record['provisional'])
+            writer.write_table(pa.Table.from_pylist(records, schema=schema))
+            yield sink.drain()
+    # Footer
+    yield sink.drain()
+
+ENCODERS = {'ndjson': ndjson_chunks, 'csv': csv_chunks, 'parquet': parquet_chunks}
+
+
+def gzip_chunks(chunks, level=6):
+    """Gzip a byte stream incrementally (one compressor, flushed per chunk so bytes keep flowing)"""
+    compressor = zlib.compressobj(level, zlib.DEFLATED, 31)
+    for chunk in chunks:
+        data = compressor.compress(chunk) + compressor.flush(zlib.Z_SYNC_FLUSH)
+        if data:
+            yield data
+    yield compressor.flush()
@@ -0,0 +1,148 @@
+# metrics.py
+import bisect, os, threading, time
+from contextlib import contextmanager
+
+# Histogram bucket upper bounds in seconds (Prometheus 'le' labels)
+LATENCY_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+# name -> (kind, help); every metric recorded must be listed here
+METRICS = {
+    'zip_list_seconds': ('histogram', "Time to list the CVs in an uploaded ZIP's central directory"),
+    'zip_read_seconds': ('histogram', "Time to read one CV out of the ZIP archive"),
+    'extract_seconds': ('histogram', "Per-file text extraction latency by file type"),
+    'tokenize_seconds': ('histogram', "Term counting time per chunk (counts are kept in the talent pool)"),
+    'tfidf_seconds': ('histogram', "TF-IDF fit and cosine scoring time per chunk"),
+    'skill_match_seconds': ('histogram', "Per-file dictionary skill scan latency"),
+    'must_have_seconds': ('histogram', "Per-file must-have check latency"),
+    'skill_score_seconds': ('histogram', "Vectorized skill, must-have and bonus scoring time per chunk"),
+    'dedup_seconds': ('histogram', "Resume fingerprinting time per chunk for duplicate detection"),
+    'db_write_seconds': ('histogram', "Time from queueing a chunk's writes to their commit by the database writer"),
+    'files_total': ('counter', "Files extracted, by file type"),
+    'file_errors_total': ('counter', "Files that failed, by file type and stage"),
+    'files_skipped_total': ('counter', "Files skipped for having no usable text, by file type"),
+    'text_cache_hits_total': ('counter', "Files served from the extracted-text cache"),
+    'must_have_short_circuits_total': ('counter', "Resumes rejected by a strict must-have check without being scored"),
+    'duplicates_total': ('counter', "Resumes linked to an earlier one instead of being scored, by kind"),
+}
+
+# Raw latencies per histogram, kept only when SMARTHIRE_METRICS_SAMPLES is set
+# (benchmark.py): buckets give percentiles to within a factor of about 2.
+# Shared by the threads of a process; pool workers hand theirs back with each chunk
+SAMPLE_LATENCIES = os.getenv('SMARTHIRE_METRICS_SAMPLES', '').lower() in ('1', 'true')
+_samples = {}
+_samples_lock = threading.Lock()
+
+# Series are recorded per thread: a job's chunks run in its own thread (or in a
+# pool process that hands its series back), so concurrent jobs never mix
+_local = threading.local()
+
+def _registry():
+    registry = getattr(_local, 'registry', None)
+    if registry is None:
+        registry = _local.registry = {}
+    return registry
+
+def _series(name, labels):
+    key = (name, tuple(sorted(labels.items())))
+    registry = _registry()
+    series = registry.get(key)
+    if series is None:
+        if METRICS[name][0] == 'histogram':
+            series = {'count': 0, 'sum': 0.0, 'buckets': [0] * (len(LATENCY_BUCKETS) + 1)}
+        else:
+            series = {'count': 0, 'sum': 0.0}
+        registry[key] = series
+    return series
+
+def inc(name, amount=1, **labels):
+    series = _series(name, labels)
+    series['count'] += amount
+    series['sum'] += amount
+
+def observe(name, seconds, **labels):
+    series = _series(name, labels)
+    series['count'] += 1
+    series['sum'] += seconds
+    series['buckets'][bisect.bisect_left(LATENCY_BUCKETS, seconds)] += 1
+    if SAMPLE_LATENCIES:
+        with _samples_lock:
+            _samples.setdefault(name, []).append(seconds)
+
+@contextmanager
+def timed(name, **labels):
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        observe(name, time.perf_counter() - start, **labels)
+
+def pop_metrics():
+    """Return and reset the series recorded by this thread since the last call"""
+    registry = _registry()
+    _local.registry = {}
+    return registry
+
+def merge_metrics(delta):
+    """Add series popped elsewhere (e.g. in a pool worker) to this thread's registry"""
+    for (name, labels), other in delta.items():
+        series = _series(name, dict(labels))
+        series['count'] += other['count']
+        series['sum'] += other['sum']
+        if 'buckets' in other:
+            series['buckets'] = [a + b for a, b in zip(series['buckets'], other['buckets'])]
+
+def pop_samples():
+    """Return and reset this process's raw latencies ({name: [seconds]}, empty unless SAMPLE_LATENCIES)"""
+    global _samples
+    with _samples_lock:
+        samples, _samples = _samples, {}
+    return samples
+
+def merge_samples(delta):
+    """Add raw latencies popped in a pool worker to this process's"""
+    with _samples_lock:
+        for name, values in delta.items():
+            _samples.setdefault(name, []).extend(values)
+
+
+# --- Prometheus text exposition ---
+def _format_labels(labels, **extra):
+    pairs = list(labels) + list(extra.items())
+    if not pairs:
+        return ''
+    return '{' + ','.join(f'{k}="{str(v)}"' for k, v in pairs) + '}'
+
+def render_prometheus(series, gauges=(), prefix='smarthire_'):
+    """
+    Render Prometheus text format
+
+    Args:
+        series: {(name, labels_tuple): {'count', 'sum', ['buckets']}}
+        gauges: (name, help, {labels_tuple: value}) triples
+    """
+    by_name = {}
+    for (name, labels), values in series.items():
+        by_name.setdefault(name, []).append((labels, values))
+
+    lines = []
+    for name in sorted(by_name):
+        kind, help_text = METRICS[name]
+        lines.append(f"# HELP {prefix}{name} {help_text}")
+        lines.append(f"# TYPE {prefix}{name} {kind}")
+        for labels, values in sorted(by_name[name]):
+            if kind == 'counter':
+                lines.append(f"{prefix}{name}{_format_labels(labels)} {values['count']:g}")
+                continue
+            cumulative = 0
+            for bound, count in zip(LATENCY_BUCKETS + ('+Inf',), values['buckets']):
+                cumulative += count
+                lines.append(f"{prefix}{name}_bucket{_format_labels(labels, le=bound)} {cumulative}")
+            lines.append(f"{prefix}{name}_sum{_format_labels(labels)} {values['sum']:.6f}")
+            lines.append(f"{prefix}{name}_count{_format_labels(labels)} {values['count']:g}")
+
+    for name, help_text, values in gauges:
+        lines.append(f"# HELP {prefix}{name} {help_text}")
+        lines.append(f"# TYPE {prefix}{name} gauge")
+        for labels, value in sorted(values.items()):
+            lines.append(f"{prefix}{name}{_format_labels(labels)} {value:g}")
+    return "\n".join(lines) + "\n"
@@ -0,0 +1,121 @@
+# pdf_engine.py
+import io, os, threading, time
+
+# Backend tried first; the others are used as fallbacks if it raises
+PDF_BACKEND = os.getenv('PDF_BACKEND', 'pdfium')
+
+# Optional caps: CVs rarely carry useful content past the first few pages
+PDF_MAX_PAGES = int(os.getenv('PDF_MAX_PAGES', 0))  # 0 = no page limit
+PDF_MAX_CHARS = int(os.getenv('PDF_MAX_CHARS', 0))  # 0 = no character limit
+
+
+# --- Backends: each yields the text of one page at a time ---
+def _pages_pdfplumber(data):
+    """pdfplumber layout extraction, one extract_text() call per page"""
+    import pdfplumber
+    with pdfplumber.open(io.BytesIO(data)) as pdf:
+        for page in pdf.pages:
+            text = page.extract_text()
+            # Drop the cached char/layout objects before moving on
+            page.close()
+            yield text
+
+# PDFium is not thread-safe; serialize calls within a process
+_pdfium_lock = threading.Lock()
+
+def _pages_pdfium(data):
+    """Fast text-only extraction through PDFium (no layout objects are built)"""
+    import pypdfium2
+    with _pdfium_lock:
+        pdf = pypdfium2.PdfDocument(data)
+        try:
+            for index in range(len(pdf)):
+                page = pdf[index]
+                textpage = page.get_textpage()
+                try:
+                    yield textpage.get_text_range()
+                finally:
+                    textpage.close()
+                    page.close()
+        finally:
+            pdf.close()
+
+def _pages_pypdf2(data):
+    """Pure-Python PyPDF2 extraction"""
+    import PyPDF2
+    reader = PyPDF2.PdfReader(io.BytesIO(data))
+    for page in reader.pages:
+        yield page.extract_text()
+
+BACKENDS = {
+    'pdfplumber': _pages_pdfplumber,
+    'pdfium': _pages_pdfium,
+    'pypdf2': _pages_pypdf2,
+}
+
+
+# --- Per-backend timing (accumulated in-process, drained by the caller) ---
+_timings_lock = threading.Lock()
+_timings = {}
+
+def _record_timing(backend, seconds, pages, failed):
+    with _timings_lock:
+        stats = _timings.setdefault(backend, {'calls': 0, 'failures': 0, 'pages': 0, 'seconds': 0.0})
+        stats['calls'] += 1
+        stats['failures'] += int(failed)
+        stats['pages'] += pages
+        stats['seconds'] += seconds
+
+def pop_backend_timings():
+    """Return and reset the timings accumulated since the last call"""
+    global _timings
+    with _timings_lock:
+        timings, _timings = _timings, {}
+    return timings
+
+
+def extract_pdf_text(data, backend=None, max_pages=None, max_chars=None):
+    """
+    Extract text from PDF bytes
+
+    Args:
+        data: PDF file contents
+        backend: 'pdfplumber', 'pdfium' or 'pypdf2' (default: PDF_BACKEND)
+        max_pages: Stop after this many pages (default: PDF_MAX_PAGES, 0 = all)
+        max_chars: Stop once this many characters are collected (default: PDF_MAX_CHARS, 0 = all)
+
+    The chosen backend is tried first and the remaining ones are fallbacks
+    if it raises. Every page is extracted exactly once.
+    """
+    backend = backend or PDF_BACKEND
+    max_pages = PDF_MAX_PAGES if max_pages is None else max_pages
+    max_chars = PDF_MAX_CHARS if max_chars is None else max_chars
+
+    order = [backend] + [name for name in BACKENDS if name != backend]
+    last_error = None
+    for name in order:
+        if name not in BACKENDS:
+            last_error = ValueError(f"Unknown PDF backend: {name}")
+            continue
+        start = time.perf_counter()
+        pages = []
+        page_count = 0
+        chars = 0
+        try:
+            for text in BACKENDS[name](data):
+                page_count += 1
+                if text:
+                    pages.append(text)
+                    chars += len(text)
+                if (max_pages and page_count >= max_pages) or (max_chars and chars >= max_chars):
+                    break
+        except Exception as e:
+            _record_timing(name, time.perf_counter() - start, page_count, True)
+            print(f"PDF backend {name} failed: {e}")
+            last_error = e
+            continue
+        _record_timing(name, time.perf_counter() - start, page_count, False)
+        text = " ".join(pages)
+        return text[:max_chars] if max_chars else text
+
+    raise last_error
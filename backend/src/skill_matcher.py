@@ -0,0 +1,109 @@
+# skill_matcher.py
+import re
+
+# Word-boundary guards that also work for skills that start or end with
+# punctuation ("c++", "c#", "rust (solana)"), where \b would never match.
+BOUNDARY_START = r'(?<!\w)'
+BOUNDARY_END = r'(?!\w)'
+
+
+def boundary_pattern(term):
+    """Regex source matching `term` as a whole token"""
+    return BOUNDARY_START + re.escape(term) + BOUNDARY_END
+
+
+def _trie_to_regex(node):
+    """Turn a character trie into a regex whose cost depends on term length, not term count"""
+    branches = [re.escape(ch) + _trie_to_regex(child) for ch, child in sorted(node.items()) if ch]
+    if not branches:
+        return ''
+    body = branches[0] if len(branches) == 1 else '(?:' + '|'.join(branches) + ')'
+    # '' marks the end of a term: the continuation is optional and greedy,
+    # so the longest term starting at a position is tried first
+    return '(?:' + body + ')?' if '' in node else body
+
+
+class SkillMatcher:
+    """
+    Finds every dictionary skill in a text with a single regex pass
+
+    All terms are compiled into one trie-shaped pattern wrapped in a
+    zero-width lookahead, so the scan visits each token start once and
+    reports the longest term found there. Shorter terms that are prefixes
+    of that match at a token boundary ("react" in "react native") are
+    resolved from a table built at compile time.
+
+    Aliases ({skill: [alias, ...]}, e.g. SKILL_CONTEXT_MAP) are compiled
+    into the same trie and reported as their canonical skill, so they add
+    no scanning cost.
+    """
+
+    def __init__(self, skills, aliases=None):
+        # Skill order defines the order of results (same as dict iteration)
+        self._order = {}
+        self._term_skills = {}
+        for skill in skills:
+            term = skill.strip().lower()
+            if len(term) <= 1:
+                continue
+            self._order.setdefault(skill, len(self._order))
+            self._term_skills.setdefault(term, []).append(skill)
+
+        # Skill vocabulary in dictionary order (columns of presence matrices)
+        self.skills = list(self._order)
+
+        canonical = {skill.strip().lower(): skill for skill in self._order}
+        self._canonical = set(canonical)
+        for skill, skill_aliases in (aliases or {}).items():
+            skill = canonical.get(skill.strip().lower())
+            if skill is None:
+                continue
+            for alias in skill_aliases:
+                term = alias.strip().lower()
+                if len(term) > 1 and skill not in self._term_skills.get(term, ()):
+                    self._term_skills.setdefault(term, []).append(skill)
+
+        trie = {}
+        for term in self._term_skills:
+            node = trie
+            for ch in term:
+                node = node.setdefault(ch, {})
+            node[''] = {}
+
+        self.pattern = re.compile(
+            BOUNDARY_START + '(?=(' + _trie_to_regex(trie) + ')' + BOUNDARY_END + ')'
+        )
+
+        # term -> skills for the term and every term that is a boundary prefix of it
+        self._expanded = {}
+        for term in self._term_skills:
+            hits = []
+            for other in self._term_skills:
+                if term.startswith(other) and (
+                    len(other) == len(term) or not re.match(r'\w', term[len(other)])
+                ):
+                    hits.extend(self._term_skills[other])
+            self._expanded[term] = hits
+
+    def find(self, text):
+        """Return matched skills in dictionary order (text must be lowercased)"""
+        found = set()
+        expanded = self._expanded
+        for match in self.pattern.finditer(text):
+            found.update(expanded[match.group(1)])
+        return sorted(found, key=self._order.__getitem__)
+
+    def covers(self, term):
+        """
+        True if `term` (lowercased) is a dictionary skill, so find() alone tells
+        whether a text mentions it and no separate search of the text is needed
+        """
+        return term in self._canonical
+
+    def terms_for(self, term):
+        """Dictionary terms (the skill itself and its aliases) reported as skill `term` (lowercased)"""
+        return [t for t, skills in self._term_skills.items() if any(s.strip().lower() == term for s in skills)]
+
+    def find_set(self, text):
+        """Return matched skills, lowercased, as a set (used for job descriptions)"""
+        return {skill.lower() for skill in self.find(text)}
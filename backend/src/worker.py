@@ -0,0 +1,56 @@
+# worker.py
+"""
+Standalone job worker for SmartHire 2.0
+
+Consumes the durable job queue in smarthire.db. Run from backend/src:
+
+    python -m worker
+
+Set SMARTHIRE_EXECUTION=queue on the web tier so uploads are only queued.
+Jobs interrupted by a crash or restart are picked up again once their
+lease expires and resume from their last committed chunk.
+"""
+import os, socket, threading, time
+from app import get_db_connection, run_queue_item, QUEUE_LEASE_SECONDS
+from database import claim_queue_item
+
+# Jobs processed at the same time by this worker (each may use SMARTHIRE_WORKERS processes)
+WORKER_CONCURRENCY = max(1, int(os.getenv('WORKER_CONCURRENCY', 2)))
+WORKER_POLL_INTERVAL = float(os.getenv('WORKER_POLL_INTERVAL', 2.0))
+
+
+def _run(item, worker_id, slots):
+    try:
+        run_queue_item(item, worker_id)
+    finally:
+        slots.release()
+
+
+def main():
+    worker_id = f"{socket.gethostname()}:{os.getpid()}"
+    slots = threading.Semaphore(WORKER_CONCURRENCY)
+
+    print(f"SmartHire worker {worker_id} started (concurrency {WORKER_CONCURRENCY})")
+    while True:
+        slots.acquire()
+        try:
+            with get_db_connection() as conn:
+                item = claim_queue_item(conn, worker_id, QUEUE_LEASE_SECONDS)
+        except Exception as e:
+            print(f"Failed to claim from queue: {e}")
+            item = None
+
+        if item is None:
+            slots.release()
+            time.sleep(WORKER_POLL_INTERVAL)
+            continue
+
+        print(f"Claimed queue entry {item['id']} ({item['kind']} job {item['job_id']}, attempt {item['attempts']})")
+        threading.Thread(target=_run, args=(item, worker_id, slots)).start()
+
+
+if __name__ == '__main__':
+    try:
+        main()
+    except KeyboardInterrupt:
+        print("Worker stopped")
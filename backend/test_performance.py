@@ -7,7 +7,23 @@ Tests the key optimization improvements made
 import sys
 import os
 import time
+import atexit
+import shutil
 import tempfile
+import sqlite3
+import numpy as np
+
+# Tests use their own database and upload folder, removed when they finish,
+# so the app's data is untouched and nothing is left in the working tree.
+# Pool workers re-import this module and must use the same ones.
+if 'SMARTHIRE_TEST_DIR' not in os.environ:
+    os.environ['SMARTHIRE_TEST_DIR'] = tempfile.mkdtemp(prefix='smarthire-test-')
+    atexit.register(shutil.rmtree, os.environ['SMARTHIRE_TEST_DIR'], ignore_errors=True)
+TEST_DIR = os.environ['SMARTHIRE_TEST_DIR']
+os.environ['DB_PATH'] = os.path.join(TEST_DIR, 'test.db')
+os.environ['UPLOAD_FOLDER'] = os.path.join(TEST_DIR, 'uploads')
+# Duplicate detection is opt-in; the tests cover it
+os.environ['DEDUP_ENABLED'] = 'True'
 
 # Add src to path
 sys.path.insert(0, os.path.join(os.path.dirname(__file__), 'src'))
@@ -16,8 +32,41 @@ from app import (
     get_compiled_pattern, 
     score_candidate, 
     extract_text,
-    get_db_connection
+    get_db_connection,
+    skill_matcher,
+    batch_cosine_scores,
+    extract_texts_cached,
+    pop_text_cache_activity,
+    db_writer,
+    record_text_cache_activity,
+    build_job_context,
+    build_chunk_context,
+    score_text_chunk,
+    text_features,
+    score_feature_chunk,
+    score_pool_chunk,
+    skill_presence_matrix,
+    score_skill_batch,
+    term_counts,
+    cosine_matrix_from_counts,
+    document_frequencies,
+    TermWeights,
+    stream_cv_chunks,
+    close_archive,
+    create_screen_jobs,
+    process_job_thread,
+    process_jobs_thread,
+    run_queue_item,
+    list_zip_cvs,
+    ZipLimitError,
+    publish_job_event,
+    finish_job_events,
+    watch_job_events,
+    app
 )
+from database import get_text_cache_stats, claim_queue_item, heartbeat_queue_item, MIGRATIONS
+from pdf_engine import BACKENDS as PDF_BACKENDS, extract_pdf_text, pop_backend_timings
+from dedup import DedupIndex
 from skills_master import SKILLS
 
 def test_regex_pattern_caching():
@@ -43,6 +92,42 @@ def test_regex_pattern_caching():
     
     return True
 
+def test_single_pass_skill_matcher():
+    """Test that the combined matcher agrees with per-skill patterns"""
+    print("\n=== Testing Single-Pass Skill Matcher ===")
+    
+    resume_text = """
+    senior engineer: c++, c#, asp.net and node.js.
+    react native developer, spring boot microservices, docker/kubernetes
+    """.lower()
+    
+    expected = [
+        skill for skill in SKILLS
+        if len(skill.strip()) > 1 and get_compiled_pattern(skill.lower()).search(resume_text)
+    ]
+    
+    start = time.time()
+    found = skill_matcher.find(resume_text)
+    elapsed = time.time() - start
+    
+    print(f"Matched {len(found)} skills in {elapsed*1000:.4f}ms: {found}")
+    
+    assert found == expected, "Matcher should agree with per-skill patterns"
+    for skill in ("c++", "c#", "asp.net", "node.js", "react", "react native", "spring boot", "spring"):
+        assert skill in found, f"Should find {skill}"
+    assert "java" not in skill_matcher.find("javascript developer"), "Should respect token boundaries"
+    
+    # Aliases from SKILL_CONTEXT_MAP are reported as their canonical skill
+    aliased = skill_matcher.find("springboot and nextjs apis, ue5 tooling, machine learning engineer")
+    for skill in ("spring boot", "next.js", "unreal engine", "ml engineer"):
+        assert skill in aliased, f"Should map alias to {skill}"
+    _, missing_alias, _ = score_candidate("spring boot developer", "springboot microservices", ["spring boot"])
+    assert not missing_alias, "A must-have found through an alias should not be missing"
+    
+    print("✓ Single-pass skill matcher working correctly")
+    
+    return True
+
 def test_job_desc_preprocessing():
     """Test that job description preprocessing optimization works"""
     print("\n=== Testing Job Description Preprocessing ===")
@@ -96,6 +181,38 @@ def test_job_desc_preprocessing():
     
     return True
 
+def test_batch_cosine_scoring():
+    """Test that batch TF-IDF scoring matches per-resume scoring"""
+    print("\n=== Testing Batch TF-IDF Scoring ===")
+    
+    job_desc_lower = "senior python developer with django, postgresql and docker experience"
+    resumes = [
+        "python django developer 7 years postgresql react docker aws expert",
+        "java spring boot developer kubernetes microservices",
+        "react frontend developer javascript typescript node.js",
+    ]
+    
+    # A single-resume batch is the same fit as the old per-pair vectorizer
+    single = batch_cosine_scores(job_desc_lower, resumes[:1])[0]
+    score1, _, _ = score_candidate(job_desc_lower, resumes[0], [])
+    score2, _, _ = score_candidate(job_desc_lower, resumes[0], [], cosine_sim=single)
+    assert score1 == score2, "Batch and pairwise scores should match for one resume"
+    
+    start = time.time()
+    scores = batch_cosine_scores(job_desc_lower, resumes)
+    elapsed = time.time() - start
+    
+    print(f"Scored {len(resumes)} resumes in one fit: {elapsed*1000:.2f}ms")
+    print(f"Cosine scores: {[round(s, 1) for s in scores]}")
+    
+    assert len(scores) == len(resumes), "Should return one score per resume"
+    assert scores[0] == max(scores), "Most similar resume should score highest"
+    assert batch_cosine_scores(job_desc_lower, []) == [], "Empty batch should return no scores"
+    
+    print("✓ Batch TF-IDF scoring working correctly")
+    
+    return True
+
 def test_text_extraction_optimization():
     """Test optimized text extraction"""
     print("\n=== Testing Text Extraction Optimization ===")
@@ -123,6 +240,1215 @@ def test_text_extraction_optimization():
     finally:
         os.unlink(temp_file)
 
+def make_test_pdf(pages):
+    """Minimal PDF with one line of Helvetica text per page"""
+    objects = ["<< /Type /Catalog /Pages 2 0 R >>",
+               "<< /Type /Pages /Kids [%s] /Count %d >>" % (" ".join(f"{4 + 2 * i} 0 R" for i in range(len(pages))),
+                                                            len(pages)),
+               "<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica >>"]
+    for i, line in enumerate(pages):
+        stream = f"BT /F1 12 Tf 50 750 Td ({line}) Tj ET"
+        objects.append(f"<< /Type /Page /Parent 2 0 R /MediaBox [0 0 612 792] "
+                       f"/Resources << /Font << /F1 3 0 R >> >> /Contents {5 + 2 * i} 0 R >>")
+        objects.append(f"<< /Length {len(stream)} >>\nstream\n{stream}\nendstream")
+    out, offsets = b"%PDF-1.4\n", []
+    for number, body in enumerate(objects, 1):
+        offsets.append(len(out))
+        out += f"{number} 0 obj\n{body}\nendobj\n".encode('latin-1')
+    xref = len(out)
+    out += f"xref\n0 {len(objects) + 1}\n0000000000 65535 f \n".encode()
+    out += b"".join(f"{offset:010d} 00000 n \n".encode() for offset in offsets)
+    out += f"trailer\n<< /Size {len(objects) + 1} /Root 1 0 R >>\nstartxref\n{xref}\n%%EOF\n".encode()
+    return out
+
+def test_pdf_engine():
+    """Test every PDF backend reads each page once, honours the page and character caps, and falls back"""
+    print("\n=== Testing PDF Engine ===")
+    
+    pages = ["Page one Python developer", "Page two Django and PostgreSQL", "Page three publications"]
+    data = make_test_pdf(pages)
+    pop_backend_timings()
+    
+    texts, capped = {}, {}
+    for backend in PDF_BACKENDS:
+        start = time.time()
+        texts[backend] = extract_pdf_text(data, backend=backend, max_pages=0, max_chars=0)
+        elapsed = time.time() - start
+        capped[backend] = (extract_pdf_text(data, backend=backend, max_pages=1, max_chars=0),
+                           extract_pdf_text(data, backend=backend, max_pages=0, max_chars=10))
+        print(f"{backend}: {elapsed*1000:.2f}ms")
+    timings = pop_backend_timings()
+    fallback = extract_pdf_text(data, backend='no-such-backend', max_pages=0, max_chars=0)
+    try:
+        extract_pdf_text(b"%PDF-1.4 not really", max_pages=0, max_chars=0)
+        corrupt_raised = False
+    except Exception:
+        corrupt_raised = True
+    failures = pop_backend_timings()
+    
+    for backend, text in texts.items():
+        assert all(" ".join(page.split()) in " ".join(text.split()) for page in pages), f"{backend} lost text"
+        first_page, first_chars = capped[backend]
+        assert "one" in first_page and "two" not in first_page, f"{backend} should stop after max_pages"
+        assert len(first_chars) == 10, f"{backend} should stop at max_chars"
+        # Every page once for the full read, one page for each capped read
+        assert timings[backend]['calls'] == 3 and timings[backend]['pages'] == len(pages) + 2
+        assert timings[backend]['failures'] == 0
+    assert "Python" in fallback, "An unknown backend should fall back to the others"
+    assert corrupt_raised and all(stats['failures'] == 1 for stats in failures.values()), \
+        "A file no backend can read should raise, with each backend's failure timed"
+    
+    print("✓ PDF engine working correctly")
+    
+    return True
+
+def test_text_cache():
+    """Test that repeated extraction of the same bytes is served from the cache"""
+    print("\n=== Testing Extracted Text Cache ===")
+    
+    # Unique content so earlier runs cannot pre-populate the cache
+    content = f"Python developer with Django and React experience {time.time()}".encode('utf-8')
+    files = [("first.txt", content), ("renamed_copy.txt", content)]
+    
+    with get_db_connection() as conn:
+        before = get_text_cache_stats(conn)
+    
+    def extract():
+        start = time.time()
+        texts = [text for _, text in extract_texts_cached(files)]
+        elapsed = time.time() - start
+        # Chunks hand their cache activity to the database writer
+        activity = pop_text_cache_activity()
+        db_writer.run(lambda conn: record_text_cache_activity(conn, activity))
+        return texts, elapsed
+    
+    texts1, time1 = extract()
+    texts2, time2 = extract()
+    
+    with get_db_connection() as conn:
+        after = get_text_cache_stats(conn)
+    
+    print(f"Cold extraction: {time1*1000:.2f}ms, warm extraction: {time2*1000:.2f}ms")
+    print(f"Cache: {after['entries']} entries, {after['hits']} hits, {after['misses']} misses")
+    
+    assert texts1 == texts2, "Cached text should match extracted text"
+    assert "django" in texts1[0], "Should contain django"
+    assert after['misses'] - before['misses'] == 1, "Identical files should be parsed once"
+    assert after['hits'] - before['hits'] == 1, "Second lookup should hit the cache"
+    assert after['entries'] - before['entries'] == 1
+    assert after['bytes'] - before['bytes'] == len(texts1[0].encode('utf-8')), "Cache size should be kept as a running count"
+    
+    print("✓ Text cache working correctly")
+    
+    return True
+
+def test_zip_streaming():
+    """Test CVs are found in the central directory and read from the ZIP without extracting it, within its limits"""
+    print("\n=== Testing ZIP Streaming ===")
+    import io, zipfile
+    import docx
+    
+    document = docx.Document()
+    document.add_paragraph("Python developer with Django, PostgreSQL and AWS experience building services")
+    docx_bytes = io.BytesIO()
+    document.save(docx_bytes)
+    app_module = sys.modules['app']
+    
+    with tempfile.TemporaryDirectory() as tmpdir:
+        zip_path = os.path.join(tmpdir, "cvs.zip")
+        with zipfile.ZipFile(zip_path, 'w', zipfile.ZIP_DEFLATED) as zip_ref:
+            zip_ref.writestr("cvs/", "")
+            zip_ref.writestr("cvs/a.txt", "python developer with django and postgresql experience building apis")
+            zip_ref.writestr("cvs/B.TXT", "java developer with spring boot, kafka and postgresql in production")
+            zip_ref.writestr("cvs/c.docx", docx_bytes.getvalue())
+            zip_ref.writestr("__MACOSX/cvs/._a.txt", "resource fork")
+            zip_ref.writestr("notes.md", "not a cv")
+        
+        start = time.time()
+        members = list_zip_cvs(zip_path)
+        list_time = time.time() - start
+        
+        job_id, = create_screen_jobs([("Python developer", ["python"], False)], title="ZIP streaming test")
+        process_job_thread(job_id, "Python developer", zip_path, members, ["python"])
+        close_archive()
+        written = sorted(os.listdir(tmpdir))
+        with get_db_connection() as conn:
+            stored = sorted(row[0] for row in conn.execute("SELECT filename FROM candidates WHERE job_id=?", (job_id,)))
+        
+        # A bomb: a few KB on disk declaring far more than the limit once expanded
+        bomb_path = os.path.join(tmpdir, "bomb.zip")
+        with zipfile.ZipFile(bomb_path, 'w', zipfile.ZIP_DEFLATED) as zip_ref:
+            zip_ref.writestr("big.txt", b"0" * (4 * 1024 * 1024))
+            for i in range(5):
+                zip_ref.writestr(f"cv_{i}.txt", "python developer")
+        limits = app_module.MAX_ZIP_MEMBERS, app_module.MAX_ZIP_UNCOMPRESSED_BYTES, app_module.MAX_ZIP_MEMBER_BYTES
+        errors = []
+        try:
+            for limit in ((1000, 1024 * 1024, 10 * 1024 * 1024), (3, 10 * 1024 * 1024, 10 * 1024 * 1024),
+                          (1000, 10 * 1024 * 1024, 1024 * 1024)):
+                app_module.MAX_ZIP_MEMBERS, app_module.MAX_ZIP_UNCOMPRESSED_BYTES, app_module.MAX_ZIP_MEMBER_BYTES = limit
+                try:
+                    list_zip_cvs(bomb_path)
+                except ZipLimitError as e:
+                    errors.append(str(e))
+        finally:
+            app_module.MAX_ZIP_MEMBERS, app_module.MAX_ZIP_UNCOMPRESSED_BYTES, app_module.MAX_ZIP_MEMBER_BYTES = limits
+    
+    print(f"Listed {len(members)} CVs in {list_time*1000:.2f}ms; limits: {errors}")
+    
+    assert members == ["cvs/a.txt", "cvs/B.TXT", "cvs/c.docx"], "Only CV members, in archive order"
+    assert written == ["cvs.zip"], "Members should be read from the archive, not extracted to disk"
+    assert stored == ["B.TXT", "a.txt", "c.docx"]
+    assert len(errors) == 3 and "bytes of CVs" in errors[0] and "entries" in errors[1], "Both limits should stop a bomb"
+    assert errors[2].startswith("big.txt") and "per CV" in errors[2], "One oversized CV fails within the total"
+    
+    print("✓ ZIP streaming working correctly")
+    
+    return True
+
+def test_multi_job_scoring():
+    """Test one chunk pass scores every resume against every job description"""
+    print("\n=== Testing Multi-Job Scoring ===")
+    
+    jobs = [
+        build_job_context("Backend engineer: Python, Django, PostgreSQL", ["python"]),
+        build_job_context("Frontend engineer: React, TypeScript, CSS", ["react"]),
+    ]
+    chunk_texts = [
+        ("py.txt", "h1", "python developer with django and postgresql experience building apis"),
+        ("js.txt", "h2", "react developer with typescript and css experience building interfaces"),
+    ]
+    
+    start = time.time()
+    job_results, _ = score_text_chunk(chunk_texts, build_chunk_context(jobs))
+    elapsed = time.time() - start
+    
+    print(f"Scored {len(chunk_texts)} resumes x {len(jobs)} jobs in {elapsed*1000:.2f}ms")
+    
+    assert len(job_results) == len(jobs), "One result list per job"
+    backend = {filename: (score, missing) for filename, _, score, missing, _ in job_results[0]}
+    frontend = {filename: (score, missing) for filename, _, score, missing, _ in job_results[1]}
+    assert backend["py.txt"][0] > backend["js.txt"][0], "Python resume should rank first for the backend job"
+    assert frontend["js.txt"][0] > frontend["py.txt"][0], "React resume should rank first for the frontend job"
+    assert backend["js.txt"][1] == ["python"] and frontend["py.txt"][1] == ["react"], "Must-haves are per job"
+    
+    print("✓ Multi-job scoring working correctly")
+    
+    return True
+
+def test_streaming_mode():
+    """Test streaming chunks respect the byte budget and hashed scores match exact ones"""
+    print("\n=== Testing Streaming Mode ===")
+    import zipfile
+    
+    with tempfile.TemporaryDirectory() as tmpdir:
+        zip_path = os.path.join(tmpdir, "cvs.zip")
+        with zipfile.ZipFile(zip_path, 'w') as zip_ref:
+            for i in range(10):
+                zip_ref.writestr(f"cv_{i}.txt", "python developer " * (50 if i == 3 else 5))
+            zip_ref.writestr("__MACOSX/._cv_0.txt", "ignored")
+        
+        try:
+            chunks = list(stream_cv_chunks(zip_path, skip=2, chunk_files=4, chunk_bytes=300))
+        finally:
+            close_archive()
+    
+    # The large CV closes its chunk early; the first two CVs are skipped as already processed
+    print(f"Chunks: {[len(chunk) for chunk in chunks]}")
+    assert chunks == [["cv_2.txt", "cv_3.txt"], ["cv_4.txt", "cv_5.txt", "cv_6.txt", "cv_7.txt"],
+                      ["cv_8.txt", "cv_9.txt"]]
+    
+    job_counts = [term_counts("Python developer with Django and AWS")]
+    resume_counts = [term_counts(text) for text in (
+        "python developer with django experience",
+        "aws cloud engineer",
+        "graphic designer",
+    )]
+    exact = cosine_matrix_from_counts(job_counts, resume_counts)
+    hashed = cosine_matrix_from_counts(job_counts, resume_counts, hashed=True)
+    print(f"Exact: {exact[:, 0].round(2).tolist()}  Hashed: {hashed[:, 0].round(2).tolist()}")
+    assert np.allclose(exact, hashed), "Hashed term counts should score like the fitted vocabulary"
+    
+    print("✓ Streaming mode working correctly")
+    
+    return True
+
+def test_cascade_ranking():
+    """Test a cascade fully scores only the top candidates and ranks them above the provisional ones"""
+    print("\n=== Testing Cascade Ranking ===")
+    import zipfile
+    
+    job_desc = "Python developer: Django, PostgreSQL and AWS"
+    resumes = [
+        "senior python developer with django, postgresql and aws, building rest apis for a fintech team",
+        "python and django developer for five years, some aws deployments and docker based tooling",
+        "java developer with spring boot and aws, microservices and kafka messaging in production",
+        "graphic designer with photoshop and illustrator, brand identity and print layout work",
+        "python scripting for data analysis with pandas and jupyter notebooks in a research lab",
+    ]
+    with tempfile.TemporaryDirectory() as tmpdir:
+        zip_path = os.path.join(tmpdir, "cvs.zip")
+        with zipfile.ZipFile(zip_path, 'w') as zip_ref:
+            for i, text in enumerate(resumes):
+                zip_ref.writestr(f"cv_{i}.txt", text)
+        cv_members = [f"cv_{i}.txt" for i in range(len(resumes))]
+        
+        full_id, cascade_id = create_screen_jobs([(job_desc, [], False)] * 2, title="Cascade test")
+        process_job_thread(full_id, job_desc, zip_path, cv_members, [])
+        start = time.time()
+        process_job_thread(cascade_id, job_desc, zip_path, cv_members, [], cascade_top="2")
+        elapsed = time.time() - start
+        
+        # Without dedup, two candidates share the best CV's content hash; both are refined
+        close_archive()
+        with zipfile.ZipFile(zip_path, 'a') as zip_ref:
+            zip_ref.writestr("copy.txt", resumes[0])
+        app_module = sys.modules['app']
+        dedup_enabled, app_module.DEDUP_ENABLED = app_module.DEDUP_ENABLED, False
+        try:
+            copies_id, = create_screen_jobs([(job_desc, [], False)], title="Cascade test")
+            process_job_thread(copies_id, job_desc, zip_path, cv_members + ["copy.txt"], [], cascade_top="2")
+        finally:
+            app_module.DEDUP_ENABLED = dedup_enabled
+    
+    with get_db_connection() as conn:
+        def scores(job_id):
+            return {row[0]: row[1:] for row in conn.execute(
+                "SELECT filename, score, provisional FROM candidates WHERE job_id=?", (job_id,))}
+        full, cascade = scores(full_id), scores(cascade_id)
+        refined = conn.execute("SELECT cascade_top, cascade_refined FROM jobs WHERE id=?", (cascade_id,)).fetchone()
+        copies = scores(copies_id)
+    
+    print(f"Cascade job scored {len(cascade)} CVs in {elapsed*1000:.2f}ms, refined {refined[1]}")
+    
+    top = sorted(full, key=lambda filename: full[filename][0], reverse=True)[:2]
+    assert tuple(refined) == (2, 2)
+    assert sorted(f for f, (_, provisional) in cascade.items() if not provisional) == sorted(top), \
+        "The best two candidates should be fully scored"
+    # IDF is fitted over the refined candidates rather than a whole chunk, so similarity differs a little
+    for filename in top:
+        assert abs(cascade[filename][0] - full[filename][0]) < 5, "Refined scores should be full scores"
+    for filename, (score, provisional) in cascade.items():
+        if provisional:
+            assert score <= full[filename][0] + 1e-9, "Provisional scores should be lower bounds"
+            assert score < min(cascade[f][0] for f in top), "Provisional candidates should rank below refined ones"
+    assert not copies["cv_0.txt"][1] and not copies["copy.txt"][1], "Candidates sharing a hash should both be refined"
+    assert copies["cv_0.txt"][0] == copies["copy.txt"][0]
+    
+    print("✓ Cascade ranking working correctly")
+    
+    return True
+
+def test_job_wide_idf():
+    """Test a resume scores the same in any chunk, as with one TF-IDF fit over the whole archive"""
+    print("\n=== Testing Job-Wide IDF ===")
+    import zipfile
+    
+    job_desc = "Python developer: Django, PostgreSQL and AWS"
+    resumes = [
+        "senior python developer with django, postgresql and aws, building rest apis for a fintech team",
+        "java developer with spring boot and aws, microservices and kafka messaging in production",
+        "python and django developer for five years, some aws deployments and docker based tooling",
+        "graphic designer with photoshop and illustrator, brand identity and print layout work",
+        "python scripting for data analysis with pandas and jupyter notebooks in a research lab",
+        "devops engineer running postgresql and aws infrastructure with terraform and ansible",
+    ]
+    members = [f"cv_{i}.txt" for i in range(len(resumes))]
+    app_module = sys.modules['app']
+    with tempfile.TemporaryDirectory() as tmpdir:
+        zip_path = os.path.join(tmpdir, "cvs.zip")
+        with zipfile.ZipFile(zip_path, 'w') as zip_ref:
+            for member, text in zip(members, resumes):
+                zip_ref.writestr(member, text)
+        
+        job_ids = create_screen_jobs([(job_desc, [], False)] * 2, title="IDF test")
+        chunk_size, app_module.TFIDF_CHUNK_SIZE = app_module.TFIDF_CHUNK_SIZE, 2
+        start = time.time()
+        try:
+            # Reversed, every resume lands in a chunk with different neighbours
+            for job_id, order in zip(job_ids, (members, members[::-1])):
+                process_job_thread(job_id, job_desc, zip_path, order, [])
+        finally:
+            app_module.TFIDF_CHUNK_SIZE = chunk_size
+            close_archive()
+        elapsed = time.time() - start
+    
+    with get_db_connection() as conn:
+        forward, backward = [dict(conn.execute(
+            "SELECT filename, score FROM candidates WHERE job_id=? AND provisional=0", (job_id,)).fetchall())
+            for job_id in job_ids]
+    
+    job = build_job_context(job_desc, [])
+    texts = [text.lower() for text in resumes]
+    cosine = cosine_matrix_from_counts([job['job_counts']], [term_counts(text) for text in texts])[:, 0]
+    expected = score_skill_batch(job, skill_presence_matrix([skill_matcher.find(text) for text in texts]), cosine, texts)
+    
+    print(f"Scored {len(resumes)} CVs twice in chunks of 2 in {elapsed*1000:.2f}ms")
+    
+    assert len(forward) == len(backward) == len(resumes), "Every candidate should be fully scored"
+    for member, (score, _) in zip(members, expected):
+        assert np.isclose(forward[member], backward[member]), f"{member} should score the same in any chunk"
+        assert np.isclose(forward[member], score), f"{member} should score as with one fit over the archive"
+    
+    print("✓ Job-wide IDF working correctly")
+    
+    return True
+
+def test_vectorized_skill_scoring():
+    """Test batch skill scoring gives score_candidate's scores and missing lists"""
+    print("\n=== Testing Vectorized Skill Scoring ===")
+    
+    job_desc = "Full stack developer: React, Node.js and AWS"
+    must_haves = ["react", "kubernetes-operator"]
+    texts = [
+        "full stack developer with react, node.js, mongodb and express",
+        "python developer with django and aws, some kubernetes-operator work",
+        "react native mobile developer with typescript",
+        "short text without skills",
+    ]
+    job = build_job_context(job_desc, must_haves)
+    cosine = batch_cosine_scores(job['job_desc_lower'], texts)
+    found = [skill_matcher.find(text) for text in texts]
+    
+    start = time.time()
+    batch = score_skill_batch(job, skill_presence_matrix(found), np.array(cosine), texts)
+    elapsed = time.time() - start
+    
+    print(f"Scored {len(texts)} resumes in {elapsed*1000:.2f}ms")
+    
+    for text, cosine_sim, (score, missing) in zip(texts, cosine, batch):
+        expected_score, expected_missing, _ = score_candidate(job_desc, text, must_haves, cosine_sim=cosine_sim)
+        assert (score, missing) == (expected_score, expected_missing), f"Mismatch for: {text}"
+    
+    print("✓ Vectorized skill scoring working correctly")
+    
+    return True
+
+def test_strict_must_haves():
+    """Test strict jobs reject the same resumes full scoring penalizes, without scoring them"""
+    print("\n=== Testing Strict Must-Haves ===")
+    
+    chunk_texts = [
+        ("a.txt", "h1", "python developer with django, docker and kubernetes in production"),
+        ("b.txt", "h2", "java developer with springboot microservices and docker"),
+        ("c.txt", "h3", "frontend developer with react and typescript"),
+    ]
+    must_haves = ["docker", "Spring Boot"]
+    
+    def score(strict):
+        context = build_chunk_context([build_job_context("Backend developer", must_haves, strict)])
+        context['dedup'] = True
+        (results,), fingerprints = score_text_chunk(chunk_texts, context)
+        return {filename: (score, missing, found) for filename, _, score, missing, found in results}, fingerprints
+    
+    full, _ = score(False)
+    start = time.time()
+    strict, fingerprints = score(True)
+    elapsed = time.time() - start
+    
+    print(f"Strict check over {len(chunk_texts)} resumes in {elapsed*1000:.2f}ms")
+    
+    for filename, (_, missing, _) in full.items():
+        assert strict[filename][1] == missing, f"{filename}: strict verdict should match full scoring"
+    assert strict["b.txt"][2] is not None, "An alias (springboot) satisfies the must-have"
+    assert strict["a.txt"][:3:2] == (0.0, None) and strict["c.txt"][:3:2] == (0.0, None), \
+        "Rejected resumes are stored unscored"
+    assert fingerprints[0] is None and fingerprints[2] is None and fingerprints[1] is not None, \
+        "Only resumes some job scores are fingerprinted for dedup"
+    
+    print("✓ Strict must-haves working correctly")
+    
+    return True
+
+def test_talent_pool_features():
+    """Test scoring stored talent pool features matches scoring the extracted text"""
+    print("\n=== Testing Talent Pool Features ===")
+    
+    chunk_texts = [
+        ("a.txt", "h1", "senior python developer, django and postgresql on aws, team lead"),
+        ("b.txt", "h2", "react and typescript frontend developer with some python scripting"),
+        ("c.txt", "h3", "python developer with django and postgresql experience building apis"),
+    ]
+    
+    job = build_job_context("Python Django developer", ["python", "django"])
+    features, entries, _ = text_features(chunk_texts, build_chunk_context([job]))
+    provisional = score_feature_chunk(features, build_chunk_context([job]))
+    weights = TermWeights([job['job_counts']]).add(*document_frequencies([feature[4] for feature in features])).fit()
+    
+    def context():
+        return build_chunk_context([dict(job, weights=weights)])
+    
+    expected = score_feature_chunk(features, context())
+    
+    # Rows as selected from talent_pool when every must-have is a dictionary skill (no text)
+    rows = [(filename, content_hash, None, skills, terms, print_bytes)
+            for content_hash, filename, _, skills, terms, print_bytes in entries]
+    start = time.time()
+    job_results, backfill, fingerprints = score_pool_chunk(rows, context())
+    elapsed = time.time() - start
+    
+    print(f"Scored {len(rows)} stored CVs in {elapsed*1000:.2f}ms")
+    
+    assert job_results == expected, "Stored features should give the same scores as the text"
+    assert all(full[2] > partial[2] for full, partial in zip(expected[0], provisional[0])), \
+        "Job-wide weights add the similarity to provisional scores"
+    assert not backfill and fingerprints == [entry[5] for entry in entries], "Stored fingerprints are used as they are"
+    assert not context()['jobs'][0]['must_haves_need_text']
+    assert build_job_context("", ["weird-tool"])['must_haves_need_text'], "Unknown must-haves need the text"
+    
+    print("✓ Talent pool features working correctly")
+    
+    return True
+
+def test_duplicate_detection():
+    """Test exact and near-duplicate resumes are linked to the first copy"""
+    print("\n=== Testing Duplicate Detection ===")
+    
+    words = [f"word{i}" for i in range(400)]
+    resume = " ".join(words)
+    near = " ".join(words[:200] + ["changed"] + words[201:])
+    other = " ".join(reversed(words))
+    
+    index = DedupIndex()
+    start = time.time()
+    assert index.check("a.pdf", resume) is None, "First copy is a representative"
+    assert index.check("a.docx", resume.replace(" ", "\n  ")) == ("a.pdf", "exact"), "Whitespace differences are exact duplicates"
+    assert index.check("b.txt", near) == ("a.pdf", "near"), "One changed word is a near-duplicate"
+    assert index.check("c.txt", other) is None, "Unrelated text is a new representative"
+    elapsed = time.time() - start
+    
+    print(f"4 lookups in {elapsed*1000:.2f}ms, {len(index)} representatives")
+    assert len(index) == 2
+    
+    print("✓ Duplicate detection working correctly")
+    
+    return True
+
+def test_pool_duplicates():
+    """Test copies of a CV scored by different pool workers are still linked to the first one"""
+    print("\n=== Testing Duplicates Across Pool Workers ===")
+    import zipfile
+    
+    words = [f"word{i}" for i in range(400)]
+    resume = "python developer " + " ".join(words)
+    texts = {f"cv_{i}.txt": f"python developer {i} with django, postgresql and aws experience" for i in range(8)}
+    texts.update({f"copy_{i}.txt": resume for i in range(4)})
+    texts.update({"cv.txt": resume, "near.txt": resume.replace("word200", "changed")})
+    # Chunks of two, each with a copy: the copies are spread over both workers
+    members = ["cv.txt", "cv_0.txt"] + [name for i in range(4) for name in (f"copy_{i}.txt", f"cv_{i + 1}.txt")]
+    members += ["near.txt", "cv_5.txt"]
+    app_module = sys.modules['app']
+    with tempfile.TemporaryDirectory() as tmpdir:
+        zip_path = os.path.join(tmpdir, "cvs.zip")
+        with zipfile.ZipFile(zip_path, 'w') as zip_ref:
+            for member in members:
+                zip_ref.writestr(member, texts[member])
+        
+        job_id, = create_screen_jobs([("Python developer", [], False)], title="Pool dedup test")
+        settings = app_module.SMARTHIRE_WORKERS, app_module.TFIDF_CHUNK_SIZE
+        app_module.SMARTHIRE_WORKERS, app_module.TFIDF_CHUNK_SIZE = 2, 2
+        start = time.time()
+        try:
+            process_job_thread(job_id, "Python developer", zip_path, members, [])
+        finally:
+            app_module.SMARTHIRE_WORKERS, app_module.TFIDF_CHUNK_SIZE = settings
+            close_archive()
+        elapsed = time.time() - start
+    
+    with get_db_connection() as conn:
+        rows = {filename: (candidate_id, duplicate_of, score) for candidate_id, filename, duplicate_of, score in conn.execute(
+            "SELECT id, filename, duplicate_of, score FROM candidates WHERE job_id=?", (job_id,))}
+    
+    print(f"Screened {len(members)} CVs on 2 workers in {elapsed*1000:.2f}ms")
+    
+    first_id = rows["cv.txt"][0]
+    assert rows["cv.txt"][1] is None
+    for i in range(4):
+        assert rows[f"copy_{i}.txt"][1] == first_id, "Exact copies on any worker should be linked"
+        assert rows[f"copy_{i}.txt"][2] == rows["cv.txt"][2], "Duplicates share the score of the first copy"
+    assert rows["near.txt"][1] == first_id, "A near-duplicate on any worker should be linked"
+    assert all(rows[f"cv_{i}.txt"][1] is None for i in range(6))
+    
+    print("✓ Duplicates across pool workers working correctly")
+    
+    return True
+
+def test_process_pool_mode():
+    """Test pool workers give the same candidates as the job thread, from one pool kept across jobs"""
+    print("\n=== Testing Process Pool Mode ===")
+    import zipfile
+    
+    words = [f"word{i}" for i in range(300)]
+    texts = {f"cv_{i}.txt": f"{title} with {skills} experience, {i} years building services" for i, (title, skills) in
+             enumerate([("python developer", "django, postgresql and aws"), ("java developer", "spring boot and kafka"),
+                        ("data engineer", "python, spark and airflow"), ("frontend developer", "react and typescript"),
+                        ("devops engineer", "docker, kubernetes and aws"), ("python developer", "flask and redis")] * 2)}
+    texts.update({"long.txt": "python developer " + " ".join(words), "copy.txt": "python developer " + " ".join(words)})
+    members = sorted(texts)
+    job_desc, must_haves = "Python developer: Django, PostgreSQL and AWS", ["python"]
+    app_module = sys.modules['app']
+    
+    def screen(workers):
+        job_id, = create_screen_jobs([(job_desc, must_haves, True)], title="Pool mode test")
+        settings = app_module.SMARTHIRE_WORKERS, app_module.TFIDF_CHUNK_SIZE
+        app_module.SMARTHIRE_WORKERS, app_module.TFIDF_CHUNK_SIZE = workers, 3
+        start = time.time()
+        try:
+            process_job_thread(job_id, job_desc, zip_path, members, must_haves, strict=True)
+        finally:
+            app_module.SMARTHIRE_WORKERS, app_module.TFIDF_CHUNK_SIZE = settings
+            close_archive()
+        with get_db_connection() as conn:
+            rows = conn.execute("""SELECT cand.filename, cand.score, cand.missing_skills, cand.provisional, rep.filename 
+                                   FROM candidates cand LEFT JOIN candidates rep ON rep.id = cand.duplicate_of 
+                                   WHERE cand.job_id=?""", (job_id,)).fetchall()
+        return {row[0]: row[1:] for row in rows}, time.time() - start
+    
+    with tempfile.TemporaryDirectory() as tmpdir:
+        zip_path = os.path.join(tmpdir, "cvs.zip")
+        with zipfile.ZipFile(zip_path, 'w') as zip_ref:
+            for member in members:
+                zip_ref.writestr(member, texts[member])
+        
+        thread, thread_time = screen(1)
+        pooled, first_time = screen(2)
+        executor = app_module.chunk_executor()
+        with get_db_connection() as conn:
+            cache_before = get_text_cache_stats(conn)
+        pooled_again, second_time = screen(2)
+        with get_db_connection() as conn:
+            cache_after = get_text_cache_stats(conn)
+    
+    print(f"Thread mode {thread_time*1000:.2f}ms; pool mode {first_time*1000:.2f}ms, then {second_time*1000:.2f}ms")
+    
+    assert len(thread) == len(members)
+    assert pooled == thread and pooled_again == thread, "Pool and thread mode should store the same candidates"
+    assert thread["long.txt"][3] == "copy.txt"
+    assert app_module.chunk_executor() is executor, "The pool should be kept across jobs"
+    
+    # Screening the talent pool these jobs filled is queued like an upload
+    client = app.test_client()
+    screen_pool = client.post('/pool/screen', json={'description': job_desc, 'must_haves': must_haves})
+    pool_job_id = screen_pool.get_json()['job_id']
+    for _ in range(200):
+        if client.get(f"/job-status/{pool_job_id}").get_json()['status'] in ('Completed', 'Failed'):
+            break
+        time.sleep(0.05)
+    assert screen_pool.status_code == 202
+    assert client.get(f"/job-status/{pool_job_id}").get_json()['status'] == 'Completed'
+    # Workers hand their cache activity back for the database writer to store
+    assert cache_after["hits"] > cache_before['hits'] and cache_after['misses'] == cache_before['misses']
+    
+    print("✓ Process pool mode working correctly")
+    
+    return True
+
+def test_rescore():
+    """Test a rescore stores the same candidates as screening the archive again, without extracting it"""
+    print("\n=== Testing Rescore ===")
+    import zipfile
+    
+    texts = {f"cv_{i}.txt": f"{title} with {skills}, {i} years building services" for i, (title, skills) in
+             enumerate([("python developer", "django, postgresql and aws"), ("java developer", "spring boot and kafka"),
+                        ("data engineer", "python, spark and airflow"), ("frontend developer", "react and typescript"),
+                        ("java engineer", "spring, hibernate and docker"), ("python developer", "flask and redis")])}
+    texts["copy.txt"] = texts["cv_0.txt"]
+    members = sorted(texts)
+    client = app.test_client()
+    
+    def screen(job_desc, must_haves):
+        job_id, = create_screen_jobs([(job_desc, must_haves, False)], title="Rescore test")
+        process_job_thread(job_id, job_desc, zip_path, members, must_haves)
+        close_archive()
+        return job_id
+    
+    def candidates(job_id, version):
+        with get_db_connection() as conn:
+            rows = conn.execute("""SELECT cand.filename, cand.score, cand.missing_skills, cand.provisional, rep.filename 
+                                   FROM candidates cand LEFT JOIN candidates rep ON rep.id = cand.duplicate_of 
+                                   WHERE cand.job_id=? AND cand.version=?""", (job_id, version)).fetchall()
+        return {row[0]: row[1:] for row in rows}
+    
+    with tempfile.TemporaryDirectory() as tmpdir:
+        zip_path = os.path.join(tmpdir, "cvs.zip")
+        with zipfile.ZipFile(zip_path, 'w') as zip_ref:
+            for member in members:
+                zip_ref.writestr(member, texts[member])
+        
+        job_id = screen("Java developer: Spring Boot and Kafka", ["java"])
+        with get_db_connection() as conn:
+            cache_before = get_text_cache_stats(conn)
+        start = time.time()
+        response = client.post(f"/jobs/{job_id}/rescore",
+                               json={'description': "Python developer: Django, PostgreSQL and AWS", 'must_haves': "python"})
+        for _ in range(200):
+            if client.get(f"/job-status/{job_id}").get_json()['status'] in ('Completed', 'Failed'):
+                break
+            time.sleep(0.05)
+        elapsed = time.time() - start
+        with get_db_connection() as conn:
+            cache_after = get_text_cache_stats(conn)
+        fresh_id = screen("Python developer: Django, PostgreSQL and AWS", ["python"])
+    
+    rescored, fresh, original = candidates(job_id, 2), candidates(fresh_id, 1), candidates(job_id, 1)
+    shortlist = client.get(f"/shortlist/{job_id}").get_json()
+    previous = client.get(f"/shortlist/{job_id}?version=1").get_json()
+    
+    # Rescores requested together (a double-click) queue one run
+    import threading
+    app_module = sys.modules['app']
+    execution, app_module.SMARTHIRE_EXECUTION = app_module.SMARTHIRE_EXECUTION, 'queue'
+    barrier, statuses = threading.Barrier(4), []
+    
+    def request_rescore():
+        request_client = app.test_client()
+        barrier.wait()
+        statuses.append(request_client.post(f"/jobs/{job_id}/rescore", json={'must_haves': "java"}).status_code)
+    
+    try:
+        threads = [threading.Thread(target=request_rescore) for _ in range(4)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+    finally:
+        app_module.SMARTHIRE_EXECUTION = execution
+    with get_db_connection() as conn:
+        queued = conn.execute("SELECT id, payload FROM job_queue WHERE job_id=? AND kind='rescore' AND status='queued'",
+                              (job_id,)).fetchall()
+        item = claim_queue_item(conn, 'test-worker', 60, queue_id=queued[0][0])
+    run_queue_item(item, 'test-worker')
+    
+    print(f"Rescored {len(rescored)} candidates in {elapsed*1000:.2f}ms; concurrent requests: {sorted(statuses)}")
+    
+    assert response.status_code == 202 and response.get_json()['version'] == 2
+    assert rescored == fresh, "A rescore should store what screening the archive again stores"
+    assert rescored != original and rescored["cv_0.txt"][3] == "copy.txt"
+    assert cache_after['misses'] == cache_before['misses'] and cache_after['hits'] == cache_before['hits'], \
+        "A rescore should not read or extract any file"
+    assert shortlist['version'] == 2 and shortlist['top_5'][0]['filename'] in ("copy.txt", "cv_5.txt")
+    assert previous['version'] == 1 and previous['top_5'][0]['filename'] in ("cv_1.txt", "cv_4.txt")
+    assert sorted(statuses) == [202, 409, 409, 409] and len(queued) == 1
+    assert client.get(f"/job-status/{job_id}").get_json()['status'] == 'Completed'
+    
+    print("✓ Rescore working correctly")
+    
+    return True
+
+def test_candidates_pagination():
+    """Test that keyset pages cover every candidate once, in score order"""
+    print("\n=== Testing Paginated Candidate Listing ===")
+    
+    with get_db_connection() as conn:
+        c = conn.cursor()
+        c.execute("INSERT INTO jobs (title, description, status) VALUES ('Pagination test', '', 'Completed')")
+        job_id = c.lastrowid
+        # Repeated scores so pages must break ties on id
+        c.executemany("INSERT INTO candidates (job_id, filename, score, version) VALUES (?, ?, ?, 1)",
+                      [(job_id, f"cv{i}.txt", float(i % 7) * 10) for i in range(120)])
+        conn.commit()
+    
+    client = app.test_client()
+    seen = []
+    cursor = None
+    pages = 0
+    while True:
+        url = f"/jobs/{job_id}/candidates?limit=25&fields=filename" + (f"&cursor={cursor}" if cursor else "")
+        page = client.get(url).get_json()
+        seen.extend(page['candidates'])
+        pages += 1
+        cursor = page['next_cursor']
+        if not cursor:
+            break
+    
+    print(f"Read {len(seen)} candidates in {pages} pages")
+    
+    assert len(seen) == 120, "Every candidate should be listed"
+    assert len({row['id'] for row in seen}) == 120, "No candidate should repeat across pages"
+    assert [(r['score'], r['id']) for r in seen] == sorted(((r['score'], r['id']) for r in seen), reverse=True)
+    assert set(seen[0]) == {'id', 'score', 'filename'}, "Only requested fields should be returned"
+    
+    filtered = client.get(f"/jobs/{job_id}/candidates?min_score=50&limit=500").get_json()
+    assert len(filtered['candidates']) == sum(1 for i in range(120) if i % 7 >= 5)
+    assert client.get(f"/jobs/{job_id}/candidates?cursor=bogus").status_code == 400
+    
+    print("✓ Candidate pagination working correctly")
+    
+    return True
+
+def test_candidates_export():
+    """Test that exports stream every candidate across batches with list columns expanded"""
+    print("\n=== Testing Candidate Export ===")
+    import csv, gzip, io, json
+    import app as app_module
+    
+    with get_db_connection() as conn:
+        c = conn.cursor()
+        c.execute("INSERT INTO jobs (title, description, status) VALUES ('Export test', '', 'Completed')")
+        job_id = c.lastrowid
+        c.executemany("""INSERT INTO candidates (job_id, filename, score, missing_skills, found_skills, version)
+                         VALUES (?, ?, ?, ?, ?, 1)""",
+                      [(job_id, f"cv{i}.txt", float(i % 5) * 10, json.dumps(["go"] if i % 2 else []),
+                        json.dumps(["python", "sql"])) for i in range(25)])
+        conn.commit()
+    
+    client = app.test_client()
+    batch_size, app_module.EXPORT_BATCH_SIZE = app_module.EXPORT_BATCH_SIZE, 10
+    try:
+        ndjson = [json.loads(line) for line in client.get(f"/jobs/{job_id}/export").data.splitlines()]
+        response = client.get(f"/jobs/{job_id}/export?format=csv&gzip=true")
+        rows = list(csv.DictReader(io.StringIO(gzip.decompress(response.data).decode('utf-8'))))
+    finally:
+        app_module.EXPORT_BATCH_SIZE = batch_size
+    
+    print(f"Exported {len(ndjson)} NDJSON rows and {len(rows)} CSV rows")
+    
+    assert len({row['id'] for row in ndjson}) == 25, "Every candidate should be exported once"
+    assert [(r['score'], r['id']) for r in ndjson] == sorted(((r['score'], r['id']) for r in ndjson), reverse=True)
+    assert ndjson[0]['found_skills'] == ["python", "sql"], "JSON columns should be expanded to lists"
+    assert response.headers['Content-Disposition'].endswith('.csv.gz"')
+    assert len(rows) == 25 and rows[0]['found_skills'] == "python; sql"
+    assert client.get(f"/jobs/{job_id}/export?format=xml").status_code == 400
+    
+    print("✓ Candidate export working correctly")
+    
+    return True
+
+def test_async_upload():
+    """Test /upload-zip returns 202 before the archive is read, and listing failures surface in the job status"""
+    print("\n=== Testing Asynchronous Upload ===")
+    import io, zipfile
+    
+    def archive(members):
+        buffer = io.BytesIO()
+        with zipfile.ZipFile(buffer, 'w') as zip_ref:
+            for name, text in members.items():
+                zip_ref.writestr(name, text)
+        return buffer.getvalue()
+    
+    def wait(client, job_id):
+        for _ in range(200):
+            status = client.get(f"/job-status/{job_id}").get_json()
+            if status['status'] in ('Completed', 'Failed'):
+                return status
+            time.sleep(0.05)
+        raise AssertionError("Job did not finish")
+    
+    client = app.test_client()
+    resumes = {f"cv_{i}.txt": f"python developer {i} with django, postgresql and aws experience" for i in range(20)}
+    start = time.time()
+    response = client.post('/upload-zip', data={'zip_file': (io.BytesIO(archive(resumes)), 'cvs.zip'),
+                                                'description': 'Python developer'})
+    elapsed = time.time() - start
+    completed = wait(client, response.get_json()['job_id'])
+    
+    empty = client.post('/upload-zip', data={'zip_file': (io.BytesIO(archive({"notes.md": "no cvs"})), 'cvs.zip')})
+    failed = wait(client, empty.get_json()['job_id'])
+    invalid = client.post('/upload-zip', data={'zip_file': (io.BytesIO(b"not a zip"), 'cvs.zip')})
+    
+    app_module = sys.modules['app']
+    saved = os.path.join(app_module.UPLOAD_FOLDER, str(response.get_json()['job_id']), "cv_archive.zip")
+    mode = os.stat(saved).st_mode & 0o777
+    # Spools left by a crash are swept once idle, those of requests in flight are kept
+    stale, fresh = (os.path.join(app_module.UPLOAD_FOLDER, name) for name in ('.upload-stale', '.upload-fresh'))
+    for path in (stale, fresh):
+        open(path, 'wb').close()
+    old = time.time() - app_module.SPOOL_MAX_IDLE_SECONDS - 60
+    os.utime(stale, (old, old))
+    swept = app_module.sweep_upload_spools()
+    spools = sorted(name for name in os.listdir(app_module.UPLOAD_FOLDER) if name.startswith('.upload-'))
+    os.remove(fresh)
+    
+    print(f"Upload answered in {elapsed*1000:.2f}ms; job {completed['status']}, empty archive: {failed.get('error')}")
+    
+    assert response.status_code == 202 and response.get_json()['status'] == 'Queued'
+    assert completed['status'] == 'Completed' and completed['total'] == 20
+    assert empty.status_code == 202, "Archives are listed by the job, after the response"
+    assert failed == dict(failed, status='Failed', error="No CV files found in ZIP")
+    assert invalid.status_code == 400, "Files that are not ZIP archives are still rejected right away"
+    assert mode == app_module.UPLOAD_FILE_MODE, f"Saved archives should not keep the spool's mode (got {oct(mode)})"
+    assert swept == 1 and spools == ['.upload-fresh']
+    
+    print("✓ Asynchronous upload working correctly")
+    
+    return True
+
+def test_queue_lease_resume():
+    """Test a job whose worker died is claimed again once its lease expires and resumes without duplicate candidates"""
+    print("\n=== Testing Queue Lease Resume ===")
+    import io, zipfile
+    
+    class WorkerDied(Exception):
+        pass
+    
+    app_module = sys.modules['app']
+    buffer = io.BytesIO()
+    with zipfile.ZipFile(buffer, 'w') as zip_ref:
+        for i in range(20):
+            # cv_15 repeats cv_02, which the dead worker stores before the crash
+            n = 2 if i == 15 else i
+            zip_ref.writestr(f"cv_{i:02d}.txt", f"python developer {n} with {n * 3} years of django and aws experience")
+    
+    execution, chunk_size, link_duplicates = app_module.SMARTHIRE_EXECUTION, app_module.TFIDF_CHUNK_SIZE, app_module.link_duplicates
+    chunks_linked = []
+    
+    def dying_link_duplicates(*args):
+        # The worker dies after committing two chunks, before its lease runs out
+        if len(chunks_linked) == 2:
+            raise WorkerDied()
+        chunks_linked.append(True)
+        return link_duplicates(*args)
+    
+    app_module.SMARTHIRE_EXECUTION, app_module.TFIDF_CHUNK_SIZE = 'queue', 5
+    try:
+        response = app.test_client().post('/upload-zip', data={'zip_file': (io.BytesIO(buffer.getvalue()), 'cvs.zip'),
+                                                               'description': 'Python developer'})
+        job_id = response.get_json()['job_id']
+        with get_db_connection() as conn:
+            queue_id = conn.execute("SELECT id FROM job_queue WHERE job_id=?", (job_id,)).fetchone()[0]
+            item = claim_queue_item(conn, 'dead-worker', 60, queue_id=queue_id)
+        
+        app_module.link_duplicates = dying_link_duplicates
+        try:
+            cv_members = app_module.extract_job_archive([job_id], item['payload']['zip_path'])
+            process_jobs_thread([(job_id, 'Python developer', [], False)], item['payload']['zip_path'], cv_members)
+        except WorkerDied:
+            pass
+        finally:
+            app_module.link_duplicates = link_duplicates
+            close_archive()
+        
+        with get_db_connection() as conn:
+            leased = claim_queue_item(conn, 'live-worker', 60, queue_id=queue_id)
+            checkpoint = conn.execute("SELECT processed_files FROM jobs WHERE id=?", (job_id,)).fetchone()[0]
+            conn.execute("UPDATE job_queue SET lease_expires=? WHERE id=?", (time.time() - 1, queue_id))
+            conn.commit()
+            resumed = claim_queue_item(conn, 'live-worker', 60, queue_id=queue_id)
+            dead_heartbeat = heartbeat_queue_item(conn, queue_id, 'dead-worker', 60)
+        run_queue_item(resumed, 'live-worker')
+    finally:
+        app_module.SMARTHIRE_EXECUTION, app_module.TFIDF_CHUNK_SIZE = execution, chunk_size
+    
+    with get_db_connection() as conn:
+        status, processed = conn.execute("SELECT status, processed_files FROM jobs WHERE id=?", (job_id,)).fetchone()
+        candidates = conn.execute("SELECT filename, duplicate_of FROM candidates WHERE job_id=?", (job_id,)).fetchall()
+        filenames = [filename for filename, _ in candidates]
+        copies = [filename for filename, duplicate_of in candidates if duplicate_of is not None]
+        queue_row = conn.execute("SELECT status, worker_id, attempts FROM job_queue WHERE id=?", (queue_id,)).fetchone()
+    
+    print(f"Worker died after {checkpoint} files; resumed job {status} with {len(filenames)} candidates, queue entry {queue_row}")
+    
+    assert response.status_code == 202 and item['attempts'] == 1
+    assert leased is None, "An entry whose lease has not expired must not be claimed again"
+    assert checkpoint == 10, "Chunks committed before the crash are kept as the checkpoint"
+    assert resumed is not None and resumed['attempts'] == 2
+    assert not dead_heartbeat, "The dead worker must find its lease taken over"
+    assert status == 'Completed' and processed == 20
+    assert sorted(filenames) == [f"cv_{i:02d}.txt" for i in range(20)], "Resumed jobs must not store candidates twice"
+    assert copies == ["cv_15.txt"], "Copies of resumes stored before the crash are still linked"
+    assert queue_row == ('done', 'live-worker', 2)
+    
+    print("✓ Queue lease resume working correctly")
+    
+    return True
+
+def test_chunked_upload():
+    """Test a chunked upload accepts chunks in any order, rejects bad checksums, resumes and finalizes once"""
+    print("\n=== Testing Chunked Upload ===")
+    import hashlib, io, random, zipfile
+    
+    buffer = io.BytesIO()
+    with zipfile.ZipFile(buffer, 'w') as zip_ref:
+        rng = random.Random(7)
+        for i in range(10):
+            # Incompressible padding, so the archive spans several chunks
+            padding = "".join(rng.choice("abcdefghijklmnopqrstuvwxyz ") for _ in range(20000))
+            zip_ref.writestr(f"cv_{i}.txt", f"python developer {i} with django and aws. {padding}")
+    data = buffer.getvalue()
+    chunk_size = 64 * 1024
+    chunks = [data[i:i + chunk_size] for i in range(0, len(data), chunk_size)]
+    
+    def put(upload_id, index, body, checksum=None):
+        return client.put(f"/uploads/{upload_id}/chunks/{index}", data=body,
+                          headers={'X-Chunk-SHA256': checksum or hashlib.sha256(body).hexdigest(),
+                                   'Content-Type': 'application/octet-stream'})
+    
+    app_module = sys.modules['app']
+    client = app.test_client()
+    session = client.post('/uploads', json={'filename': 'cvs.zip', 'size': len(data), 'chunk_size': chunk_size})
+    upload_id = session.get_json()['upload_id']
+    
+    start = time.time()
+    # The last chunk first, then a corrupted one, as a flaky client might send them
+    assert put(upload_id, len(chunks) - 1, chunks[-1]).status_code == 200
+    assert put(upload_id, 0, chunks[0], checksum=hashlib.sha256(b"other").hexdigest()).status_code == 400
+    missing = client.get(f"/uploads/{upload_id}").get_json()['missing']
+    early = client.post(f"/uploads/{upload_id}/finalize", json={'description': 'Python developer'})
+    for index in missing:
+        assert put(upload_id, index, chunks[index]).status_code == 200
+    finalized = client.post(f"/uploads/{upload_id}/finalize", json={'description': 'Python developer'})
+    retried = client.post(f"/uploads/{upload_id}/finalize", json={'description': 'Python developer'})
+    elapsed = time.time() - start
+    
+    job_id = finalized.get_json()['job_id']
+    for _ in range(200):
+        status = client.get(f"/job-status/{job_id}").get_json()
+        if status['status'] in ('Completed', 'Failed'):
+            break
+        time.sleep(0.05)
+    
+    print(f"Uploaded {len(data)} bytes in {len(chunks)} chunks in {elapsed*1000:.2f}ms; job {status['status']}")
+    
+    assert session.status_code == 201 and session.get_json()['total_chunks'] == len(chunks)
+    assert missing == list(range(len(chunks) - 1)), "A chunk with a bad checksum should not count as received"
+    assert early.status_code == 409 and early.get_json()['missing'] == missing
+    assert finalized.status_code == 202
+    assert retried.status_code == 200 and retried.get_json()['job_id'] == job_id, "Finalize should be idempotent"
+    assert put(upload_id, 0, chunks[0]).status_code == 409, "A finalized upload takes no more chunks"
+    assert status['status'] == 'Completed' and status['total'] == 10
+    assert client.post('/uploads', json={'filename': 'cvs.zip', 'size': 1, 'chunk_size': 10}).status_code == 400
+    
+    # A bad resend after every chunk arrived must not leave chunk 1 counted over its new bytes
+    upload_id = client.post('/uploads', json={'filename': 'cvs.zip', 'size': len(data),
+                                              'chunk_size': chunk_size}).get_json()['upload_id']
+    for index, chunk in enumerate(chunks):
+        assert put(upload_id, index, chunk).status_code == 200
+    garbled = bytes(reversed(chunks[1]))
+    assert put(upload_id, 1, garbled, checksum=hashlib.sha256(chunks[1]).hexdigest()).status_code == 400
+    resent = client.get(f"/uploads/{upload_id}").get_json()['missing']
+    refused = client.post(f"/uploads/{upload_id}/finalize", json={'description': 'Python developer'})
+    assert resent == [1] and refused.status_code == 409 and refused.get_json()['missing'] == [1]
+    
+    # Bytes changed behind a recorded chunk are caught when finalizing
+    assert put(upload_id, 1, chunks[1]).status_code == 200
+    with open(app_module.upload_part_path(upload_id), 'r+b') as f:
+        f.seek(2 * chunk_size)
+        f.write(b"tampered")
+    refused = client.post(f"/uploads/{upload_id}/finalize", json={'description': 'Python developer'})
+    assert refused.status_code == 409 and refused.get_json()['missing'] == [2]
+    assert client.get(f"/uploads/{upload_id}").get_json()['status'] == 'open'
+    
+    # A finalize that fails part way leaves the upload open with its archive
+    assert put(upload_id, 2, chunks[2]).status_code == 200
+    create_screen_jobs = app_module.create_screen_jobs
+    app_module.create_screen_jobs = lambda jobs: 1 / 0
+    try:
+        failed = client.post(f"/uploads/{upload_id}/finalize", json={'description': 'Python developer'})
+    finally:
+        app_module.create_screen_jobs = create_screen_jobs
+    after_failure = client.get(f"/uploads/{upload_id}").get_json()
+    recovered = client.post(f"/uploads/{upload_id}/finalize", json={'description': 'Python developer'})
+    assert failed.status_code == 500 and after_failure['status'] == 'open' and not after_failure['missing']
+    assert recovered.status_code == 202
+    
+    print("✓ Chunked upload working correctly")
+    
+    return True
+
+def test_prometheus_metrics():
+    """Test /metrics renders stage histograms, file counters and queue gauges, and /jobs/<id>/metrics holds the job's series"""
+    print("\n=== Testing Prometheus Metrics ===")
+    import io, zipfile
+    from metrics import render_prometheus, observe, inc, pop_metrics
+    
+    # Cumulative buckets, sum and count of a histogram, plain totals for counters
+    pop_metrics()
+    for seconds in (0.0003, 0.002, 0.002, 45.0):
+        observe('extract_seconds', seconds, type='txt')
+    inc('files_total', 4, type='txt')
+    text = render_prometheus(pop_metrics(), [("queue_entries", "Job queue entries by status", {(("status", "queued"),): 3})])
+    
+    buffer = io.BytesIO()
+    with zipfile.ZipFile(buffer, 'w') as zip_ref:
+        for i in range(4):
+            zip_ref.writestr(f"cv_{i}.txt", f"metrics test resume {i}: python developer with flask and docker")
+    client = app.test_client()
+    job_id = client.post('/upload-zip', data={'zip_file': (io.BytesIO(buffer.getvalue()), 'cvs.zip'),
+                                              'description': 'Python developer'}).get_json()['job_id']
+    for _ in range(200):
+        if client.get(f"/job-status/{job_id}").get_json()['status'] in ('Completed', 'Failed'):
+            break
+        time.sleep(0.05)
+    
+    scrape = client.get('/metrics')
+    lines = scrape.get_data(as_text=True).splitlines()
+    samples = dict(line.rsplit(' ', 1) for line in lines if not line.startswith('#'))
+    job = client.get(f"/jobs/{job_id}/metrics").get_json()['metrics']
+    with get_db_connection() as conn:
+        completed = conn.execute("SELECT COUNT(*) FROM jobs WHERE status='Completed'").fetchone()[0]
+    
+    print(f"Scrape: {len(samples)} samples; job {job_id}: {sorted(job)}")
+    
+    assert 'smarthire_extract_seconds_bucket{type="txt",le="0.0005"} 1' in text
+    assert 'smarthire_extract_seconds_bucket{type="txt",le="0.0025"} 3' in text
+    assert 'smarthire_extract_seconds_bucket{type="txt",le="30.0"} 3' in text
+    assert 'smarthire_extract_seconds_bucket{type="txt",le="+Inf"} 4' in text, "Observations past the last bound land in +Inf"
+    assert 'smarthire_extract_seconds_sum{type="txt"} 45.004300' in text
+    assert 'smarthire_files_total{type="txt"} 4' in text and '# TYPE smarthire_files_total counter' in text
+    assert '# TYPE smarthire_queue_entries gauge' in text and 'smarthire_queue_entries{status="queued"} 3' in text
+    
+    assert scrape.status_code == 200 and scrape.mimetype == 'text/plain'
+    for name in ('extract_seconds', 'tfidf_seconds', 'db_write_seconds'):
+        assert f"# TYPE smarthire_{name} histogram" in lines, f"{name} should be exported as a histogram"
+    assert float(samples['smarthire_files_total{type="txt"}']) >= 4, "Counters cover every job"
+    assert samples['smarthire_extract_seconds_count{type="txt"}'] == samples['smarthire_extract_seconds_bucket{type="txt",le="+Inf"}']
+    assert samples['smarthire_jobs{status="Completed"}'] == str(completed)
+    assert 'smarthire_jobs_in_flight' in samples and 'smarthire_queue_entries{status="done"}' in samples
+    
+    assert job['files_total'] == [{"labels": {"type": "txt"}, "count": 4}], "Job series only count the job's own files"
+    assert job['extract_seconds'][0]['count'] == 4 and job['extract_seconds'][0]['labels'] == {"type": "txt"}
+    assert client.get('/jobs/999999/metrics').get_json()['metrics'] == {}
+    
+    print("✓ Prometheus metrics working correctly")
+    
+    return True
+
+def test_job_event_stream():
+    """Test progress streams get a job's events in order, woken by its commits, resume from Last-Event-ID and share one poll"""
+    print("\n=== Testing Job Event Stream ===")
+    import json, queue, threading
+    
+    app_module = sys.modules['app']
+    client = app.test_client()
+    job_id, other_id = create_screen_jobs([("Python developer", [], False)] * 2, title="Event stream test")
+    
+    def parse(text):
+        fields = dict(line.split(": ", 1) for line in text.splitlines() if not line.startswith(":"))
+        return int(fields['id']) if 'id' in fields else None, fields['event'], json.loads(fields['data'])
+    
+    def read(response, received):
+        buffer = ""
+        for chunk in response.response:
+            buffer += chunk.decode() if isinstance(chunk, bytes) else chunk
+            while "\n\n" in buffer:
+                message, buffer = buffer.split("\n\n", 1)
+                if not message.startswith(":"):
+                    received.put((time.time(), parse(message)))
+        received.put(None)
+    
+    def publish(processed):
+        db_writer.run(lambda conn: publish_job_event(conn, job_id, 'progress', {"processed": processed}))
+        return time.time()
+    
+    def complete(conn):
+        conn.execute("UPDATE jobs SET status='Completed' WHERE id=?", (job_id,))
+        finish_job_events(conn, job_id)
+    
+    # Long enough that only a notify can deliver the events in time
+    poll_interval = app_module.SSE_POLL_INTERVAL
+    app_module.SSE_POLL_INTERVAL = 30
+    try:
+        received = queue.Queue()
+        response = client.get(f"/jobs/{job_id}/events", buffered=False)
+        reader = threading.Thread(target=read, args=(response, received), daemon=True)
+        reader.start()
+        events = [received.get(timeout=5)[1]]
+        
+        with watch_job_events(other_id) as other:
+            delays = []
+            for processed in (1, 2):
+                sent = publish(processed)
+                arrived, event = received.get(timeout=5)
+                events.append(event)
+                delays.append(arrived - sent)
+            db_writer.run(complete)
+            events.append(received.get(timeout=5)[1])
+            closed = received.get(timeout=5)
+            other_woken = other.latest
+        reader.join(timeout=5)
+    finally:
+        app_module.SSE_POLL_INTERVAL = poll_interval
+    
+    # Events a queue worker commits are found by one query per poll, shared by every stream of the job
+    worker_job_id, = create_screen_jobs([("Python developer", [], False)], title="Event fan-out test")
+    latest_event, queries = app_module.get_latest_job_event, []
+    
+    def counting_latest_event(conn, job, after_id=0):
+        if threading.current_thread().name == 'job-events-poller':
+            queries.append(job)
+        return latest_event(conn, job, after_id)
+    
+    app_module.SSE_POLL_INTERVAL, app_module.get_latest_job_event = 0.05, counting_latest_event
+    try:
+        streams = []
+        for _ in range(3):
+            stream_received = queue.Queue()
+            threading.Thread(target=read, args=(client.get(f"/jobs/{worker_job_id}/events", buffered=False),
+                                                stream_received), daemon=True).start()
+            stream_received.get(timeout=5)
+            streams.append(stream_received)
+        time.sleep(0.5)
+        polled = len(queries)
+        time.sleep(0.5)
+        idle_queries = len(queries) - polled
+        with get_db_connection() as conn:
+            # Committed on another connection without notify_job_events, as a worker process does
+            app_module.add_job_event(conn, worker_job_id, 'failed', {"status": "Failed"})
+            conn.commit()
+        fanned_out = [stream_received.get(timeout=5)[1][1] for stream_received in streams]
+        time.sleep(0.2)
+        fan_out_queries = len(queries) - polled
+    finally:
+        app_module.SSE_POLL_INTERVAL, app_module.get_latest_job_event = poll_interval, latest_event
+    
+    first_id, last_id = events[1][0], events[-1][0]
+    reconnect = client.get(f"/jobs/{job_id}/events", headers={'Last-Event-ID': str(first_id)})
+    finished = client.get(f"/jobs/{job_id}/events", headers={'Last-Event-ID': str(last_id)})
+    
+    print(f"Events: {[event for _, event, _ in events]}; delivered {max(delays)*1000:.2f}ms after commit at worst")
+    
+    assert events[0][:2] == (None, 'progress') and events[0][2]['status'] == 'Queued'
+    assert [(event, data.get('processed')) for _, event, data in events[1:3]] == [('progress', 1), ('progress', 2)]
+    assert events[1][0] < events[2][0] < events[3][0] and events[3][1] == 'complete'
+    assert closed is None and not reader.is_alive(), "The terminal event should close the stream"
+    assert max(delays) < 5, "A commit should wake the job's streams without waiting for the poll"
+    assert other_woken is None, "Another job's streams should not be woken"
+    assert idle_queries == 0, "Polls should not query while no other connection has committed"
+    assert fanned_out == ['failed'] * 3
+    assert fan_out_queries == 1, f"Streams of one job should share one query per poll ({fan_out_queries} for 3 streams)"
+    reconnected = [parse(message) for message in reconnect.get_data(as_text=True).split("\n\n") if message]
+    assert [(event_id, event) for event_id, event, _ in reconnected] == [(last_id, 'complete')]
+    assert finished.status_code == 204, "A client that saw the terminal event should be told to stop"
+    
+    print("✓ Job event stream working correctly")
+    
+    return True
+
+def test_database_writer():
+    """Test that queued writes coalesce into one transaction and a failing write rolls back alone"""
+    print("\n=== Testing Database Writer ===")
+    from db_writer import DatabaseWriter
+    
+    writer = DatabaseWriter(flush_ms=200)
+    
+    def insert(title):
+        return lambda conn: conn.execute("INSERT INTO jobs (title, status) VALUES (?, 'Queued')", (title,)).lastrowid
+    
+    def failing(conn):
+        conn.execute("INSERT INTO jobs (title, status) VALUES ('Writer test', 'Failed')")
+        raise ValueError("bad chunk")
+    
+    futures = [writer.submit(insert('Writer test')), writer.submit(failing), writer.submit(insert('Writer test'))]
+    ids = [futures[0].result()[0], futures[2].result()[0]]
+    try:
+        futures[1].result()
+        assert False, "The failing write should raise in its caller"
+    except ValueError:
+        pass
+    
+    with get_db_connection() as conn:
+        statuses = conn.execute("SELECT status FROM jobs WHERE title='Writer test'").fetchall()
+    
+    print(f"{writer.writes} writes committed in {writer.transactions} transaction(s)")
+    
+    assert writer.transactions == 1, "Writes queued within the flush window should share a commit"
+    assert statuses == [('Queued',), ('Queued',)], "Only the failing write should be rolled back"
+    assert ids[1] > ids[0]
+    
+    print("✓ Database writer working correctly")
+    
+    return True
+
 def test_db_connection_context_manager():
     """Test database connection context manager"""
     print("\n=== Testing Database Connection Context Manager ===")
@@ -133,6 +1459,17 @@ def test_db_connection_context_manager():
             cursor.execute("SELECT 1")
             result = cursor.fetchone()
             assert result[0] == 1, "Should return 1"
+            conn.row_factory = sqlite3.Row
+            conn.execute("INSERT INTO jobs (title, status) VALUES ('Rolled back', 'Queued')")
+        
+        # The pooled connection comes back clean: uncommitted work rolled back, tuples again
+        with get_db_connection() as reused:
+            assert reused is conn, "The thread's connection should be reused"
+            assert reused.execute("SELECT COUNT(*) FROM jobs WHERE title='Rolled back'").fetchone() == (0,)
+            with get_db_connection() as nested:
+                assert nested is not reused, "Nested borrows should get their own connection"
+            assert reused.execute("PRAGMA journal_mode").fetchone()[0] == 'wal'
+            assert reused.execute("PRAGMA user_version").fetchone()[0] == len(MIGRATIONS)
         
         print("✓ Database context manager working correctly")
         return True
@@ -207,8 +1544,32 @@ def main():
     
     tests = [
         ("Regex Pattern Caching", test_regex_pattern_caching),
+        ("Single-Pass Skill Matcher", test_single_pass_skill_matcher),
         ("Job Description Preprocessing", test_job_desc_preprocessing),
+        ("Batch TF-IDF Scoring", test_batch_cosine_scoring),
         ("Text Extraction", test_text_extraction_optimization),
+        ("PDF Engine", test_pdf_engine),
+        ("Text Cache", test_text_cache),
+        ("ZIP Streaming", test_zip_streaming),
+        ("Multi-Job Scoring", test_multi_job_scoring),
+        ("Streaming Mode", test_streaming_mode),
+        ("Cascade Ranking", test_cascade_ranking),
+        ("Job-Wide IDF", test_job_wide_idf),
+        ("Vectorized Skill Scoring", test_vectorized_skill_scoring),
+        ("Strict Must-Haves", test_strict_must_haves),
+        ("Talent Pool Features", test_talent_pool_features),
+        ("Duplicate Detection", test_duplicate_detection),
+        ("Duplicates Across Pool Workers", test_pool_duplicates),
+        ("Process Pool Mode", test_process_pool_mode),
+        ("Rescore", test_rescore),
+        ("Candidate Pagination", test_candidates_pagination),
+        ("Candidate Export", test_candidates_export),
+        ("Asynchronous Upload", test_async_upload),
+        ("Queue Lease Resume", test_queue_lease_resume),
+        ("Chunked Upload", test_chunked_upload),
+        ("Prometheus Metrics", test_prometheus_metrics),
+        ("Job Event Stream", test_job_event_stream),
+        ("Database Writer", test_database_writer),
         ("DB Connection Manager", test_db_connection_context_manager),
         ("Scoring Speed Benchmark", benchmark_scoring_speed),
     ]
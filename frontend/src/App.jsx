@@ -3,10 +3,61 @@ import axios from 'axios';
 import './App.css';
 
 const API_URL = import.meta.env.VITE_API_URL || 'http://localhost:5000';
+const CHUNK_ATTEMPTS = 5;
+
+const sha256Hex = async (buffer) => {
+  const digest = await crypto.subtle.digest('SHA-256', buffer);
+  return Array.from(new Uint8Array(digest), (b) => b.toString(16).padStart(2, '0')).join('');
+};
+
+// Resumable upload (/uploads): the archive goes up in checksummed chunks, each
+// retried with backoff, and a session left by an interrupted attempt at the same
+// file is picked up where it stopped instead of starting from byte zero
+const uploadInChunks = async (file, onProgress) => {
+  const key = `upload:${file.name}:${file.size}:${file.lastModified}`;
+  let session = null;
+  const savedId = localStorage.getItem(key);
+  if (savedId) {
+    try {
+      session = (await axios.get(`${API_URL}/uploads/${savedId}`)).data;
+    } catch {
+      // Expired or deleted: start over
+    }
+  }
+  if (!session) {
+    session = (await axios.post(`${API_URL}/uploads`, { filename: file.name, size: file.size })).data;
+    localStorage.setItem(key, session.upload_id);
+  }
+
+  let received = session.received.length;
+  onProgress(Math.round((received * 100) / session.total_chunks));
+  for (const index of session.missing) {
+    const body = await file.slice(index * session.chunk_size, (index + 1) * session.chunk_size).arrayBuffer();
+    const checksum = await sha256Hex(body);
+    for (let attempt = 1; ; attempt++) {
+      try {
+        await axios.put(`${API_URL}/uploads/${session.upload_id}/chunks/${index}`, body, {
+          headers: { 'Content-Type': 'application/octet-stream', 'X-Chunk-SHA256': checksum },
+        });
+        break;
+      } catch (err) {
+        // Not found / no longer open will not get better with retries
+        const status = err.response?.status;
+        if (attempt >= CHUNK_ATTEMPTS || status === 404 || status === 409) throw err;
+        await new Promise((resolve) => setTimeout(resolve, 1000 * 2 ** attempt));
+      }
+    }
+    received += 1;
+    onProgress(Math.round((received * 100) / session.total_chunks));
+  }
+  return { uploadId: session.upload_id, key };
+};
 
 function App() {
   const [jobDescription, setJobDescription] = useState('');
   const [mustHaves, setMustHaves] = useState('');
+  const [strictMustHaves, setStrictMustHaves] = useState(false);
+  const [cascade, setCascade] = useState(false);
   const [zipFile, setZipFile] = useState(null);
   const [jobId, setJobId] = useState(null);
   const [status, setStatus] = useState(null);
@@ -15,27 +66,33 @@ function App() {
   const [error, setError] = useState(null);
   const [uploadProgress, setUploadProgress] = useState(0);
 
-  // Poll for job status
+  // Follow job progress over Server-Sent Events
+  // (EventSource reconnects on its own and resumes with Last-Event-ID)
   useEffect(() => {
     if (!jobId) return;
 
-    const interval = setInterval(async () => {
-      try {
-        const statusRes = await axios.get(`${API_URL}/job-status/${jobId}`);
-        setStatus(statusRes.data);
+    const source = new EventSource(`${API_URL}/jobs/${jobId}/events`);
 
-        if (statusRes.data.status === 'Completed') {
-          const shortlistRes = await axios.get(`${API_URL}/shortlist/${jobId}`);
-          setCandidates(shortlistRes.data.top_5 || []);
-          clearInterval(interval);
-          setLoading(false);
-        }
-      } catch (err) {
-        console.error('Error fetching status:', err);
-      }
-    }, 2000);
+    const handleUpdate = (e) => {
+      const data = JSON.parse(e.data);
+      setStatus(data);
+      setCandidates(data.top_5 || []);
+    };
+
+    const handleDone = (e) => {
+      handleUpdate(e);
+      source.close();
+      setLoading(false);
+    };
 
-    return () => clearInterval(interval);
+    source.addEventListener('progress', handleUpdate);
+    source.addEventListener('complete', handleDone);
+    source.addEventListener('failed', (e) => {
+      handleDone(e);
+      setError(JSON.parse(e.data).error || 'Processing failed. Please try again.');
+    });
+
+    return () => source.close();
   }, [jobId]);
 
   const handleFileChange = (e) => {
@@ -69,28 +126,20 @@ function App() {
     setCandidates([]);
     setUploadProgress(0);
 
-    const formData = new FormData();
-    formData.append('zip_file', zipFile);
-    formData.append('description', jobDescription);
-    formData.append('must_haves', mustHaves);
-
     try {
-      const response = await axios.post(`${API_URL}/upload-zip`, formData, {
-        headers: {
-          'Content-Type': 'multipart/form-data',
-        },
-        onUploadProgress: (progressEvent) => {
-          const percentCompleted = Math.round(
-            (progressEvent.loaded * 100) / progressEvent.total
-          );
-          setUploadProgress(percentCompleted);
-        },
+      const { uploadId, key } = await uploadInChunks(zipFile, setUploadProgress);
+      const response = await axios.post(`${API_URL}/uploads/${uploadId}/finalize`, {
+        description: jobDescription,
+        must_haves: mustHaves,
+        strict_must_haves: strictMustHaves,
+        cascade,
       });
+      localStorage.removeItem(key);
 
       setJobId(response.data.job_id);
       setUploadProgress(100);
     } catch (err) {
-      setError(err.response?.data?.error || 'Error uploading file. Please try again.');
+      setError(err.response?.data?.error || 'Upload interrupted. Submit again to resume where it stopped.');
       setLoading(false);
     }
   };
@@ -98,6 +147,7 @@ function App() {
   const handleReset = () => {
     setJobDescription('');
     setMustHaves('');
+    setStrictMustHaves(false);
     setZipFile(null);
     setJobId(null);
     setStatus(null);
@@ -147,6 +197,22 @@ function App() {
                 <small className="help-text">
                   Candidates without these skills will receive significantly lower scores
                 </small>
+                <label className="checkbox-label">
+                  <input
+                    type="checkbox"
+                    checked={strictMustHaves}
+                    onChange={(e) => setStrictMustHaves(e.target.checked)}
+                  />
+                  Strict: reject candidates missing a must-have without scoring them (faster for large batches)
+                </label>
+                <label className="checkbox-label">
+                  <input
+                    type="checkbox"
+                    checked={cascade}
+                    onChange={(e) => setCascade(e.target.checked)}
+                  />
+                  Fast ranking: fully score only the top candidates (the rest keep a provisional score)
+                </label>
               </div>
 
               <div className="form-group">
@@ -207,7 +273,11 @@ function App() {
                   {status.status === 'Processing' && (
                     <div className="progress-container">
                       <div className="progress-label">
-                        Analyzing Resumes: {status.processed} / {status.total}
+                        {status.phase === 'Extracting'
+                          ? 'Reading archive...'
+                          : `${status.phase === 'Refining' ? 'Refining Top Candidates' : 'Analyzing Resumes'}: ${status.processed} / ${status.total}`}
+                        {status.throughput > 0 && ` (${Math.round(status.throughput)}/s)`}
+                        {status.short_circuited > 0 && `, ${status.short_circuited} rejected by must-haves`}
                       </div>
                       <div className="progress-bar">
                         <div 
@@ -222,6 +292,7 @@ function App() {
                   {status.status === 'Completed' && (
                     <div className="completion-message">
                       ✅ Analysis complete! Processed {status.total} resumes.
+                      {status.short_circuited > 0 && ` ${status.short_circuited} were rejected by strict must-haves.`}
                     </div>
                   )}
                 </div>
@@ -235,7 +306,7 @@ function App() {
                 <h2>🏆 Top 5 Candidates</h2>
                 <div className="candidates-list">
                   {candidates.map((candidate, index) => (
-                    <div key={candidate.id} className="candidate-card">
+                    <div key={candidate.id ?? candidate.filename} className="candidate-card">
                       <div className="candidate-rank">#{index + 1}</div>
                       <div className="candidate-info">
                         <h3 className="candidate-name">{candidate.filename}</h3>